@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark the overlay of differential expression on a PPI network.
+
+Run with ``python scripts/benchmark_network_annotation.py``.
+"""
+
+import time
+
+import click
+import numpy as np
+import pandas as pd
+from igraph import Graph
+
+from guiltytargets.ppi_network_annotation.model import GeneTable, Network
+
+
+def _make_graph(num_vertices: int, num_edges: int, rng: np.random.Generator) -> Graph:
+    graph = Graph(n=num_vertices, edges=rng.integers(0, num_vertices, size=(num_edges, 2)))
+    graph.vs['name'] = [str(1000 + i) for i in range(num_vertices)]
+    graph.es['weight'] = rng.random(num_edges).tolist()
+    graph.simplify()
+    return graph
+
+
+def _make_genes(num_genes: int, num_vertices: int, rng: np.random.Generator) -> GeneTable:
+    return GeneTable(pd.DataFrame({
+        'entrez_id': (1000 + rng.integers(0, 2 * num_vertices, size=num_genes)).astype(str),
+        'log2_fold_change': rng.normal(size=num_genes),
+        'padj': rng.random(num_genes),
+    }))
+
+
+def _add_vertex_attributes_by_genes_per_vertex(network: Network, genes: GeneTable) -> None:
+    """Annotate the vertices one gene at a time, as before the bulk overlay."""
+    for gene in genes:
+        try:
+            vertex = network.graph.vs.find(name=str(gene.entrez_id)).index
+            network.graph.vs[vertex]['l2fc'] = gene.log2_fold_change
+            network.graph.vs[vertex]['symbol'] = gene.symbol
+            network.graph.vs[vertex]['padj'] = gene.padj
+        except ValueError:
+            pass
+
+
+@click.command()
+@click.option('--num-vertices', type=int, default=20_000, show_default=True)
+@click.option('--num-edges', type=int, default=300_000, show_default=True)
+@click.option('--num-genes', type=int, default=20_000, show_default=True)
+@click.option('--seed', type=int, default=0, show_default=True)
+def main(num_vertices: int, num_edges: int, num_genes: int, seed: int) -> None:
+    """Compare the per-vertex and the bulk overlay of differential expression."""
+    rng = np.random.default_rng(seed)
+    graph = _make_graph(num_vertices, num_edges, rng)
+    genes = _make_genes(num_genes, num_vertices, rng)
+    genes.genes  # build the Gene objects outside of the timed region
+
+    results = {}
+    for label, overlay in (
+        ('per-vertex', _add_vertex_attributes_by_genes_per_vertex),
+        ('bulk', Network._add_vertex_attributes_by_genes),
+    ):
+        network = Network(graph)
+        network._set_default_vertex_attributes()
+        start = time.perf_counter()
+        overlay(network, genes)
+        results[label] = (time.perf_counter() - start, network.graph.vs['l2fc'], network.graph.vs['padj'])
+        click.echo(f'{label:>10}: {results[label][0]:.3f} s')
+
+    assert results['per-vertex'][1:] == results['bulk'][1:]  # noqa: S101
+    click.echo(f'speedup: {results["per-vertex"][0] / results["bulk"][0]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
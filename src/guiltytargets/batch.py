@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+"""Run GuiltyTargets on many differential expression datasets against the same PPI network.
+
+A batch is described by a tab-separated manifest with one job per row and the columns ``dge_path``, ``targets_path``
+and ``output_directory``. The PPI graph is parsed and simplified once and the walks on its structural graph are
+generated once, since neither depends on the differential expression. Both are written to memory-mappable files that
+the worker processes share, so every job only overlays the attributes of its dataset and learns its embedding.
+"""
+
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from igraph import Graph
+
+from .constants import gat2vec_config
+from .pipeline import rank_targets_in_memory, write_results
+from .ppi_network_annotation import GeneIndex, Network, parse_dge
+from .ppi_network_annotation.array_io import allocate_array, read_arrays
+from .ppi_network_annotation.csr import CSRGraph
+from .ppi_network_annotation.parsers import parse_gene_list, parse_ppi_graph
+from .utils import log_memory_usage
+from .walks import Adjacency, iter_random_walks
+
+__all__ = [
+    'BatchJob',
+    'parse_manifest',
+    'run_batch',
+]
+
+logger = logging.getLogger(__name__)
+
+#: The columns of a batch manifest
+MANIFEST_COLUMNS = ['dge_path', 'targets_path', 'output_directory']
+
+_worker_graph: Optional[Graph] = None
+_worker_structure_walks: Optional[np.ndarray] = None
+_worker_gene_index: Optional[GeneIndex] = None
+
+
+@dataclass
+class BatchJob:
+    """Encapsulate the files of one dataset of a batch."""
+
+    #: The path of the differential expression file
+    dge_path: str
+
+    #: The path of the file with the known targets
+    targets_path: str
+
+    #: The directory of the AUC and ranking output files
+    output_directory: str
+
+
+def parse_manifest(
+    path: str,
+    input_directory: Optional[str] = None,
+    output_directory: Optional[str] = None,
+) -> List[BatchJob]:
+    """Parse a batch manifest.
+
+    :param path: The path of a tab-separated file with the columns in :data:`MANIFEST_COLUMNS`.
+    :param input_directory: The directory that relative input paths are relative to. Defaults to the directory of
+     the manifest.
+    :param output_directory: The directory that relative output directories are relative to. Defaults to the
+     directory of the manifest.
+    :return: The jobs of the batch, in the order of the manifest.
+    """
+    df = pd.read_csv(path, sep='\t', dtype=str, comment='#')
+    missing_columns = set(MANIFEST_COLUMNS).difference(df.columns)
+    if missing_columns:
+        raise ValueError(f'Missing columns in batch manifest {path}: {", ".join(sorted(missing_columns))}')
+
+    manifest_directory = os.path.dirname(os.path.abspath(path))
+    input_directory = input_directory or manifest_directory
+    output_directory = output_directory or manifest_directory
+
+    return [
+        BatchJob(
+            dge_path=os.path.join(input_directory, os.path.expanduser(dge_path)),
+            targets_path=os.path.join(input_directory, os.path.expanduser(targets_path)),
+            output_directory=os.path.join(output_directory, os.path.expanduser(job_output_directory)),
+        )
+        for dge_path, targets_path, job_output_directory in df[MANIFEST_COLUMNS].itertuples(index=False)
+    ]
+
+
+def run_batch(
+    jobs: Iterable[BatchJob],
+    ppi_graph_path: str,
+    max_adj_p: float,
+    max_log2_fold_change: float,
+    min_log2_fold_change: float,
+    entrez_id_header: str,
+    log2_fold_change_header: str,
+    adj_p_header: str,
+    base_mean_header: Optional[str],
+    entrez_delimiter: str,
+    ppi_edge_min_confidence: float,
+    use_ppi_graph_cache: bool = False,
+    gene_index_path: Optional[str] = None,
+    auc_output_file_name: str = 'auc_g2v.tsv',
+    ranked_targets_output_file_name: str = 'rankings.tsv',
+    num_processes: int = 1,
+) -> List[Tuple[BatchJob, BaseException]]:
+    """Run the GuiltyTargets pipeline on every job of a batch, with a shared PPI network.
+
+    The targets are always ranked in memory, since the shared walks on the structural graph are handed to the
+    embedding as arrays. A job that fails is logged and does not stop the others.
+
+    :param jobs: The jobs of the batch.
+    :param gene_index_path: The path of a gene index to map the gene identifiers of the jobs to Entrez identifiers.
+    :param num_processes: The number of worker processes that run jobs at the same time. Each of them can also use
+     ``num_workers`` processes of the Gat2Vec configuration for its random walks.
+    :return: The jobs that failed, with their exception.
+    """
+    jobs = list(jobs)
+    options = dict(
+        dge_options=dict(
+            entrez_id_header=entrez_id_header,
+            log2_fold_change_header=log2_fold_change_header,
+            adj_p_header=adj_p_header,
+            entrez_delimiter=entrez_delimiter,
+            base_mean_header=base_mean_header,
+        ),
+        max_adj_p=max_adj_p,
+        max_l2fc=max_log2_fold_change,
+        min_l2fc=min_log2_fold_change,
+        auc_output_file_name=auc_output_file_name,
+        ranked_targets_output_file_name=ranked_targets_output_file_name,
+    )
+
+    graph = parse_ppi_graph(ppi_graph_path, ppi_edge_min_confidence, simplify=True, use_cache=use_ppi_graph_cache)
+    csr_graph = CSRGraph.from_graph(graph)
+
+    with tempfile.TemporaryDirectory(prefix='guiltytargets-batch-') as directory:
+        walks_path = os.path.join(directory, 'structure_walks.gtarray')
+        _write_structure_walks(walks_path, Adjacency.from_csr_graph(csr_graph))
+        logger.info(f'Prepared the shared PPI network for {len(jobs)} jobs')
+        log_memory_usage('after preparing the shared PPI network')
+
+        if num_processes <= 1:
+            # The jobs run in this process, so they share the parsed graph instead of loading it again
+            _set_batch_worker_state(graph, read_arrays(walks_path)[0]['walks'], gene_index_path)
+            try:
+                errors = [_run_batch_job(job, options) for job in jobs]
+            finally:
+                _set_batch_worker_state(None, None, None)
+        else:
+            graph_path = os.path.join(directory, 'ppi.gtgraph')
+            csr_graph.save(graph_path)
+            with ProcessPoolExecutor(
+                max_workers=num_processes,
+                initializer=_initialize_batch_worker,
+                initargs=(graph_path, walks_path, gene_index_path),
+            ) as executor:
+                errors = list(executor.map(_run_batch_job, jobs, [options] * len(jobs)))
+
+    return [(job, error) for job, error in zip(jobs, errors) if error is not None]
+
+
+def _write_structure_walks(path: str, structure: Adjacency) -> None:
+    """Write the walks on the structural graph, with the same parameters as :func:`pipeline.get_embedding`.
+
+    The walks are written chunk by chunk to a memory-mapped file of their final size, so only one chunk of walks is in
+    memory at a time.
+    """
+    logger.info('Random walks on the shared structural graph')
+    walks = allocate_array(
+        path,
+        'walks',
+        shape=(structure.num_nodes * gat2vec_config.num_walks, gat2vec_config.walk_length),
+        dtype=np.int64,
+    )
+    start = 0
+    for chunk in iter_random_walks(
+        structure,
+        num_walks=gat2vec_config.num_walks,
+        walk_length=gat2vec_config.walk_length,
+        seed=gat2vec_config.seed,
+        engine=gat2vec_config.walk_engine,
+        num_workers=gat2vec_config.num_workers,
+        chunk_size=gat2vec_config.walk_chunk_size,
+    ):
+        walks[start:start + len(chunk)] = chunk
+        start += len(chunk)
+
+    if isinstance(walks, np.memmap):
+        walks.flush()
+    del walks
+
+
+def _initialize_batch_worker(graph_path: str, walks_path: str, gene_index_path: Optional[str]) -> None:
+    """Memory-map the shared PPI graph and structural walks and open the gene index in a worker process."""
+    csr_graph, _ = CSRGraph.load(graph_path)
+    arrays, _ = read_arrays(walks_path)
+    _set_batch_worker_state(csr_graph.to_graph(), arrays['walks'], gene_index_path)
+
+
+def _set_batch_worker_state(
+    graph: Optional[Graph],
+    structure_walks: Optional[np.ndarray],
+    gene_index_path: Optional[str],
+) -> None:
+    """Set the shared PPI graph, structural walks and gene index of the jobs that run in this process."""
+    global _worker_graph, _worker_structure_walks, _worker_gene_index
+
+    if _worker_gene_index is not None:
+        _worker_gene_index.close()
+    _worker_gene_index = None if gene_index_path is None else GeneIndex(gene_index_path)
+
+    _worker_graph = graph
+    _worker_structure_walks = structure_walks
+
+
+def _run_batch_job(job: BatchJob, options: Mapping[str, Any]) -> Optional[BaseException]:
+    """Run one job on the shared PPI graph of the worker.
+
+    :return: The exception raised by the job, or None if it succeeded.
+    """
+    logger.info(f'Running batch job on {job.dge_path}')
+    try:
+        genes = parse_dge(job.dge_path, gene_index=_worker_gene_index, **options['dge_options'])
+
+        network = Network(
+            _worker_graph,
+            max_adj_p=options['max_adj_p'],
+            max_l2fc=options['max_l2fc'],
+            min_l2fc=options['min_l2fc'],
+        )
+        network.set_up_network(genes)
+        log_memory_usage(f'after annotating the network of {job.dge_path}')
+
+        targets = parse_gene_list(job.targets_path, network.graph, gene_index=_worker_gene_index)
+        auc_df, probs_df = rank_targets_in_memory(network, targets, structure_walks=_worker_structure_walks)
+
+        os.makedirs(job.output_directory, exist_ok=True)
+        write_results(
+            auc_df,
+            probs_df,
+            auc_output_path=os.path.join(job.output_directory, options['auc_output_file_name']),
+            probs_output_path=os.path.join(job.output_directory, options['ranked_targets_output_file_name']),
+        )
+    except Exception as error:
+        logger.exception(f'Batch job on {job.dge_path} failed')
+        return error
+
+    return None
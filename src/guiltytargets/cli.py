@@ -10,10 +10,14 @@ import click
 from easy_config.contrib.click import args_from_config
 from sklearn.exceptions import UndefinedMetricWarning
 
+from .batch import parse_manifest, run_batch
 from .constants import EMOJI, GuiltyTargetsConfig
-from .pipeline import run
+from .pipeline import run as run_pipeline
+from .ppi_network_annotation import GeneIndex
 
 __all__ = [
+    'batch',
+    'build_gene_index',
     'main',
 ]
 
@@ -41,6 +45,8 @@ def main(
     base_mean_header,
     entrez_delimiter,
     ppi_edge_min_confidence,
+    use_ppi_graph_cache,
+    gene_index_path,
     auc_output_file_name,
     ranked_targets_output_file_name,
 ) -> None:
@@ -57,7 +63,7 @@ def main(
     probs_output_path = os.path.join(output_directory, ranked_targets_output_file_name)
 
     click.echo(f'{EMOJI} starting GuiltyTargets')
-    run(
+    run_pipeline(
         input_directory,
         targets_path,
         ppi_graph_path,
@@ -73,9 +79,87 @@ def main(
         base_mean_header,
         entrez_delimiter,
         ppi_edge_min_confidence,
+        use_ppi_graph_cache=use_ppi_graph_cache,
+        gene_index_path=gene_index_path,
     )
 
 
+@click.command()
+@click.argument('manifest_path', type=click.Path(exists=True, dir_okay=False))
+@args_from_config(GuiltyTargetsConfig)
+@click.option('--num-processes', type=int, default=1, show_default=True, help='Number of jobs run at the same time')
+def batch(
+    manifest_path,
+    input_directory,
+    output_directory,
+    targets_file_name,
+    ppi_graph_file_name,
+    dge_file_name,
+    max_adj_p,
+    max_log2_fold_change,
+    min_log2_fold_change,
+    entrez_id_header,
+    log2_fold_change_header,
+    adj_p_header,
+    base_mean_header,
+    entrez_delimiter,
+    ppi_edge_min_confidence,
+    use_ppi_graph_cache,
+    gene_index_path,
+    auc_output_file_name,
+    ranked_targets_output_file_name,
+    num_processes,
+) -> None:
+    """Run the GuiltyTargets pipeline on the datasets of a manifest, with a shared PPI network.
+
+    The manifest is a tab-separated file with the columns dge_path, targets_path and output_directory. Relative
+    input paths are relative to INPUT_DIRECTORY, which also contains the PPI network, and relative output
+    directories are relative to OUTPUT_DIRECTORY. The dge and targets file names are not used.
+    """
+    if not os.path.exists(input_directory):
+        raise FileNotFoundError(input_directory)
+
+    jobs = parse_manifest(manifest_path, input_directory=input_directory, output_directory=output_directory)
+
+    click.echo(f'{EMOJI} starting GuiltyTargets on {len(jobs)} datasets')
+    failures = run_batch(
+        jobs,
+        ppi_graph_path=os.path.join(input_directory, ppi_graph_file_name),
+        max_adj_p=max_adj_p,
+        max_log2_fold_change=max_log2_fold_change,
+        min_log2_fold_change=min_log2_fold_change,
+        entrez_id_header=entrez_id_header,
+        log2_fold_change_header=log2_fold_change_header,
+        adj_p_header=adj_p_header,
+        base_mean_header=base_mean_header,
+        entrez_delimiter=entrez_delimiter,
+        ppi_edge_min_confidence=ppi_edge_min_confidence,
+        use_ppi_graph_cache=use_ppi_graph_cache,
+        gene_index_path=gene_index_path,
+        auc_output_file_name=auc_output_file_name,
+        ranked_targets_output_file_name=ranked_targets_output_file_name,
+        num_processes=num_processes,
+    )
+
+    for job, error in failures:
+        click.secho(f'Failed on {job.dge_path}: {error}', fg='red')
+    if failures:
+        raise click.ClickException(f'{len(failures)} of {len(jobs)} datasets failed')
+
+
+@click.command()
+@click.argument('hgnc_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('gene_index_path', type=click.Path(dir_okay=False))
+def build_gene_index(hgnc_path, gene_index_path) -> None:
+    """Build a gene identifier index from the HGNC complete set.
+
+    The index maps HGNC symbols, HGNC, Ensembl and UniProt identifiers to Entrez identifiers without network
+    requests. Pass it to guiltytargets and guiltytargets-batch with --gene_index_path.
+    """
+    GeneIndex.build(hgnc_path, gene_index_path).close()
+    click.echo(f'{EMOJI} built the gene index {gene_index_path}')
+
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     main()
@@ -48,6 +48,13 @@ class GuiltyTargetsConfig(EasyConfig):
 
     ppi_edge_min_confidence: float = 0.0
 
+    #: Compile the parsed PPI graph to a binary cache next to the edgelist and reuse it
+    use_ppi_graph_cache: bool = False
+
+    #: Path to a gene identifier index built with ``guiltytargets build-gene-index``. If given, the genes of the
+    #: differential expression and targets files can be HGNC symbols, HGNC, Ensembl or UniProt identifiers
+    gene_index_path: str = None
+
     max_adj_p: float = 0.05
 
     max_log2_fold_change: float = -1.0
@@ -111,5 +118,35 @@ class Gat2VecConfig(EasyConfig):
     #:
     training_ratio: Tuple[float] = (0.1, 0.3, 0.5)
 
+    #: Hand the graphs and labels to the embedding and classification as arrays instead of GAT2VEC input files
+    in_memory: bool = False
+
+    #: Engine that generates the random walks of the in-memory mode: python, numpy or numba
+    walk_engine: str = 'numpy'
+
+    #: Number of worker processes that generate the random walks and of threads of the skip-gram model
+    num_workers: int = 1
+
+    #: Maximum number of random walks that are generated at once while they are streamed to the skip-gram model
+    walk_chunk_size: int = 10_000
+
+    #: Seed of the random walks, the skip-gram model and the evaluation splits of the in-memory mode
+    seed: int = 1
+
+    #: Number of processes that evaluate the cross-validation splits of the in-memory mode. -1 uses all processors.
+    evaluation_num_jobs: int = 1
+
+    #: Number of most likely targets in the rankings of the in-memory mode. All vertices are ranked if None.
+    ranking_top_k: int = None
+
+    #: Maximum number of vertices scored at once for the rankings of the in-memory mode
+    ranking_chunk_size: int = 100_000
+
+    #: Directory of the embedding cache of the in-memory mode. Embeddings are not cached if None.
+    embedding_cache_directory: str = None
+
+    #: Maximum total size of the embedding cache in bytes, after which the least recently used embeddings are removed
+    embedding_cache_max_size: int = 2 ** 30
+
 
 gat2vec_config = Gat2VecConfig.load()
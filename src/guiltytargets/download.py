@@ -2,32 +2,328 @@
 
 """Utilities for GuiltyTargets-Results."""
 
+import glob
+import hashlib
+import http.client
+import json
+import logging
 import os
-from typing import Optional, TextIO
+import shutil
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterable, List, Mapping, Optional, TextIO
 
 import pandas as pd
 from mygene import MyGeneInfo
-from opentargets import OpenTargetsClient
+
+try:
+    from opentargets import OpenTargetsClient
+except ImportError:  # pragma: no cover
+    OpenTargetsClient = None
+
+from .ppi_network_annotation.compression import get_compression
+from .ppi_network_annotation.parsers import PPI_GRAPH_CACHE_EXTENSION, parse_ppi_graph
+from .target_cache import TargetCache
 
 __all__ = [
+    'HIPPIE_COLUMNS',
+    'download_file',
     'download_hippie',
     'download_targets_for_disease',
+    'download_targets_for_diseases',
 ]
 
+logger = logging.getLogger(__name__)
+
+#: Columns of the HIPPIE file
+HIPPIE_COLUMNS = ['symbol1', 'entrez1', 'symbol2', 'entrez2', 'confidence', 'description']
+
+#: Columns of the HIPPIE file that are kept as the PPI edgelist
+HIPPIE_PPI_COLUMNS = ['entrez1', 'entrez2', 'confidence']
+
+#: Number of bytes of a download that are read at once
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+#: Number of lines of a downloaded HIPPIE file that are projected at once
+HIPPIE_CHUNK_SIZE = 100_000
+
+#: Maximum number of genes looked up in one MyGene request
+MYGENE_BATCH_SIZE = 1000
+
+#: File extension of the metadata of a download, next to the downloaded file
+DOWNLOAD_METADATA_EXTENSION = '.download.json'
+
+#: File extension of a partial download, next to the downloaded file
+PARTIAL_DOWNLOAD_EXTENSION = '.part'
+
+
+def download_hippie(
+    *,
+    url: str,
+    path: str,
+    sha256: Optional[str] = None,
+    min_edge_weight: Optional[float] = None,
+    simplify: bool = True,
+    timeout: float = 60,
+) -> str:
+    """Download HIPPIE data and return the path where it is.
+
+    The file is streamed to disk and only the Entrez identifiers and the confidence are kept, chunk by chunk. The
+    validators of the server (ETag and Last-Modified) are stored next to ``path``, so that later calls only download
+    the file again if it changed on the server, and an interrupted download is resumed where it stopped. If the
+    server can not be reached, a previous complete download of the same URL is used.
 
-def download_hippie(*, url: str, path: str) -> str:
-    """Download HIPPIE data and return the path where it is."""
-    if os.path.exists(path):
-        return path
-    cols = ['symbol1', 'entrez1', 'symbol2', 'entrez2', 'confidence', 'description']
-    df = pd.read_csv(url, sep='\t', header=None, names=cols)
-    df[['entrez1', 'entrez2', 'confidence']].to_csv(path, sep='\t', header=False, index=False)
+    The size and the SHA-256 digest of the edgelist are stored with the validators, so that an edgelist that was
+    truncated or changed since it was written is downloaded again.
+
+    :param url: The URL of the HIPPIE file.
+    :param path: The path of the PPI edgelist that is written.
+    :param sha256: The expected SHA-256 digest of the downloaded file, which is checked if given.
+    :param min_edge_weight: If given, the compiled cache of the PPI graph with this cutoff is written straight away,
+     as with ``parse_ppi_graph(path, min_edge_weight, simplify=simplify, use_cache=True)``. Compiled caches of a
+     previous edgelist are removed when it is replaced.
+    :param simplify: Whether the compiled cache is of the graph without self-loops and multiple edges, as read by
+     :func:`guiltytargets.ppi_network_annotation.generate_ppi_network`.
+    :param timeout: Timeout of the requests, in seconds.
+    :return: The path of the PPI edgelist.
+    """
+    path = os.path.expanduser(path)
+    if sha256 is not None:
+        sha256 = sha256.lower()
+    metadata_path = f'{path}{DOWNLOAD_METADATA_EXTENSION}'
+    partial_path = f'{path}{PARTIAL_DOWNLOAD_EXTENSION}'
+
+    metadata = _read_metadata(metadata_path) if os.path.exists(path) else None
+    if metadata is not None and (metadata.get('url') != url or (sha256 is not None and metadata.get('sha256') != sha256)):
+        metadata = None
+    if metadata is not None and not _is_valid_edgelist(path, metadata):
+        metadata = None
+
+    try:
+        download_metadata = download_file(url, partial_path, validators=metadata, sha256=sha256, timeout=timeout)
+    except (OSError, http.client.HTTPException) as error:
+        # Connection errors and timeouts, but not error responses of the server
+        if metadata is None or isinstance(error, urllib.error.HTTPError):
+            raise
+        logger.warning(f'Could not check {url} for updates ({error}). Using the previous download {path}')
+        return _compile_ppi_graph(path, min_edge_weight, simplify)
+
+    if download_metadata is None:
+        logger.info(f'{path} is up to date with {url}')
+        _remove(partial_path, f'{partial_path}{DOWNLOAD_METADATA_EXTENSION}')
+    else:
+        _remove(*glob.glob(f'{glob.escape(path)}.*{PPI_GRAPH_CACHE_EXTENSION}'))
+        _project_hippie(partial_path, path, compression=get_compression(urllib.parse.urlparse(url).path))
+        download_metadata['edgelist_size'] = os.path.getsize(path)
+        download_metadata['edgelist_sha256'] = _get_sha256(path)
+        _write_metadata(metadata_path, download_metadata)
+        _remove(partial_path, f'{partial_path}{DOWNLOAD_METADATA_EXTENSION}')
+        logger.info(f'Downloaded {url} to {path}')
+
+    return _compile_ppi_graph(path, min_edge_weight, simplify)
+
+
+def _is_valid_edgelist(path: str, metadata: Mapping[str, Any]) -> bool:
+    """Check that an edgelist has the size and the SHA-256 digest it had when it was written."""
+    if os.path.getsize(path) != metadata.get('edgelist_size'):
+        logger.warning(f'{path} does not have the size it was written with. Downloading it again')
+        return False
+    if _get_sha256(path) != metadata.get('edgelist_sha256'):
+        logger.warning(f'{path} changed since it was written. Downloading it again')
+        return False
+    return True
+
+
+def _compile_ppi_graph(path: str, min_edge_weight: Optional[float], simplify: bool) -> str:
+    """Write the compiled cache of a PPI graph if a cutoff is given, and return the path of its edgelist."""
+    if min_edge_weight is not None:
+        parse_ppi_graph(path, min_edge_weight, simplify=simplify, use_cache=True)
     return path
 
 
+def download_file(
+    url: str,
+    path: str,
+    validators: Optional[Mapping[str, Any]] = None,
+    sha256: Optional[str] = None,
+    timeout: float = 60,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> Optional[Dict[str, Any]]:
+    """Download a file in chunks, resuming a previous partial download of it.
+
+    The validators of the response are written next to ``path`` before the content, so that a download that is
+    interrupted can be resumed with a range request, as long as the file did not change on the server.
+
+    :param url: The URL of the file.
+    :param path: The path the file is written to.
+    :param validators: The metadata of a previous complete download. If given, the file is only downloaded if it
+     changed on the server since.
+    :param sha256: The expected SHA-256 digest of the file, which is checked if given.
+    :param timeout: Timeout of the requests, in seconds.
+    :param chunk_size: The number of bytes that are read at once.
+    :return: The metadata of the download, with the URL, the validators, the size and the SHA-256 digest of the file,
+     or None if the file did not change since the download of ``validators``.
+    :raises ValueError: If the URL is not an HTTP(S) URL, or if the SHA-256 digest of the file is not the expected one.
+    """
+    if urllib.parse.urlparse(url).scheme not in {'http', 'https'}:
+        raise ValueError(f'Invalid URL: {url}. Only HTTP and HTTPS URLs can be downloaded')
+
+    partial_metadata_path = f'{path}{DOWNLOAD_METADATA_EXTENSION}'
+    partial_metadata = _read_partial_metadata(url, path)
+
+    request = urllib.request.Request(url, headers=_get_request_headers(validators, partial_metadata, path))
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)  # noqa: S310
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return None
+        if error.code == 416 and partial_metadata is not None:
+            return _restart_download(url, path, validators, sha256, timeout, chunk_size)
+        raise
+
+    with response:
+        metadata = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        if response.status == 206:
+            if _get_range_start(response.headers.get('Content-Range')) != os.path.getsize(path):
+                return _restart_download(url, path, validators, sha256, timeout, chunk_size)
+            logger.info(f'Resuming the download of {url} from byte {os.path.getsize(path)}')
+            mode = 'ab'
+        else:
+            mode = 'wb'
+            _write_metadata(partial_metadata_path, metadata)
+
+        with open(path, mode) as file:
+            shutil.copyfileobj(response, file, chunk_size)
+
+    metadata['sha256'] = _get_sha256(path, chunk_size)
+    if sha256 is not None and metadata['sha256'] != sha256.lower():
+        _remove(path, partial_metadata_path)
+        raise ValueError(f'Invalid SHA-256 digest of {url}: {metadata["sha256"]}. Expected {sha256}')
+
+    metadata['size'] = os.path.getsize(path)
+    return metadata
+
+
+def _read_partial_metadata(url: str, path: str) -> Optional[Dict[str, Any]]:
+    """Read the metadata of a partial download of a URL, or return None if there is none."""
+    if not os.path.exists(path):
+        return None
+    metadata = _read_metadata(f'{path}{DOWNLOAD_METADATA_EXTENSION}')
+    if metadata is None or metadata.get('url') != url:
+        return None
+    return metadata
+
+
+def _get_sha256(path: str, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> str:
+    """Get the SHA-256 digest of a file, reading it in chunks."""
+    content_hash = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(chunk_size), b''):
+            content_hash.update(block)
+    return content_hash.hexdigest()
+
+
+def _restart_download(
+    url: str,
+    path: str,
+    validators: Optional[Mapping[str, Any]],
+    sha256: Optional[str],
+    timeout: float,
+    chunk_size: int,
+) -> Optional[Dict[str, Any]]:
+    """Remove a partial download that cannot be resumed and download the file from the start."""
+    logger.warning(f'Could not resume the download of {url}. Starting over')
+    _remove(path, f'{path}{DOWNLOAD_METADATA_EXTENSION}')
+    return download_file(url, path, validators=validators, sha256=sha256, timeout=timeout, chunk_size=chunk_size)
+
+
+def _get_request_headers(
+    validators: Optional[Mapping[str, Any]],
+    partial_metadata: Optional[Mapping[str, Any]],
+    path: str,
+) -> Dict[str, str]:
+    """Get the headers of a conditional request and of a range request that resumes a partial download."""
+    headers = {'Accept-Encoding': 'identity'}
+
+    if validators is not None:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    if partial_metadata is not None:
+        validator = partial_metadata.get('etag') or partial_metadata.get('last_modified')
+        if validator is not None and os.path.getsize(path) > 0:
+            headers['Range'] = f'bytes={os.path.getsize(path)}-'
+            headers['If-Range'] = validator
+
+    return headers
+
+
+def _get_range_start(content_range: Optional[str]) -> Optional[int]:
+    """Get the first byte of a Content-Range header such as ``bytes 100-199/200``."""
+    if content_range is None or not content_range.startswith('bytes '):
+        return None
+    try:
+        return int(content_range[len('bytes '):].split('-', 1)[0])
+    except ValueError:
+        return None
+
+
+def _project_hippie(source_path: str, path: str, compression: Optional[str] = None) -> None:
+    """Write the Entrez identifiers and the confidence of a HIPPIE file as a PPI edgelist, chunk by chunk."""
+    tmp_path = f'{path}.tmp'
+    chunks = pd.read_csv(
+        source_path,
+        sep='\t',
+        header=None,
+        names=HIPPIE_COLUMNS,
+        usecols=HIPPIE_PPI_COLUMNS,
+        dtype=str,
+        keep_default_na=False,
+        compression=compression,
+        chunksize=HIPPIE_CHUNK_SIZE,
+    )
+    with open(tmp_path, 'w') as file:
+        for chunk in chunks:
+            chunk[HIPPIE_PPI_COLUMNS].to_csv(file, sep='\t', header=False, index=False)
+    os.replace(tmp_path, path)
+
+
+def _read_metadata(path: str) -> Optional[Dict[str, Any]]:
+    """Read the metadata of a download, or return None if there is none."""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_metadata(path: str, metadata: Mapping[str, Any]) -> None:
+    """Write the metadata of a download atomically."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(metadata, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _remove(*paths: str) -> None:
+    """Remove files, if they exist."""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
 def download_targets_for_disease(
     disease_efo_id: str,
-    open_targets_client: Optional[OpenTargetsClient] = None,
+    open_targets_client: Optional['OpenTargetsClient'] = None,
     my_gene_info: Optional[MyGeneInfo] = None,
     file: Optional[TextIO] = None,
 ) -> None:
@@ -38,8 +334,124 @@ def download_targets_for_disease(
     :param my_gene_info: A MyGeneInfo client
     :param file: Place to output targets for disease
     """
+    download_targets_for_diseases(
+        [disease_efo_id],
+        open_targets_client=open_targets_client,
+        my_gene_info=my_gene_info,
+        file=file,
+    )
+
+
+def download_targets_for_diseases(
+    disease_efo_ids: Iterable[str],
+    open_targets_client: Optional['OpenTargetsClient'] = None,
+    my_gene_info: Optional[MyGeneInfo] = None,
+    file: Optional[TextIO] = None,
+    cache: Optional[TargetCache] = None,
+    max_workers: int = 4,
+    batch_size: int = MYGENE_BATCH_SIZE,
+) -> Dict[str, List[str]]:
+    """Download the targets of many diseases.
+
+    The known drug targets of the diseases are queried concurrently, and the Entrez identifiers of all of their
+    Ensembl identifiers are looked up together, in batches. If a cache is given, only the diseases and genes that are
+    not in it, or have expired, are looked up.
+
+    :param disease_efo_ids: EFO identifiers of diseases
+    :param open_targets_client: An OpenTargetsClient
+    :param my_gene_info: A MyGeneInfo client
+    :param file: Place to output targets for the diseases
+    :param cache: A cache of the targets of diseases and of their Entrez identifiers
+    :param max_workers: The maximum number of concurrent requests
+    :param batch_size: The maximum number of genes looked up in one MyGene request
+    :return: The Entrez identifiers of the targets by EFO identifier
+    """
+    disease_efo_ids = list(dict.fromkeys(disease_efo_ids))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        disease_targets = _get_disease_targets(executor, disease_efo_ids, open_targets_client, cache)
+        ensembl_ids = list(dict.fromkeys(
+            ensembl_id
+            for disease_id in disease_efo_ids
+            for ensembl_id in disease_targets[disease_id]
+        ))
+        entrez_ids = _get_all_entrez_ids(executor, ensembl_ids, my_gene_info, cache, batch_size)
+
+    rv = {
+        disease_id: [
+            entrez_id
+            for ensembl_id in disease_targets[disease_id]
+            for entrez_id in entrez_ids[ensembl_id]
+        ]
+        for disease_id in disease_efo_ids
+    }
+
+    print('efo', 'ncbigene', file=file, sep='\t')
+    for disease_id, disease_entrez_ids in rv.items():
+        for entrez_id in disease_entrez_ids:
+            print(disease_id, entrez_id, file=file, sep='\t')
+
+    return rv
+
+
+def _get_disease_targets(
+    executor: Executor,
+    disease_efo_ids: List[str],
+    open_targets_client: Optional['OpenTargetsClient'],
+    cache: Optional[TargetCache],
+) -> Dict[str, List[str]]:
+    """Get the Ensembl identifiers of the known drug targets of diseases, querying the uncached ones concurrently."""
+    disease_targets = {} if cache is None else cache.get_disease_targets(disease_efo_ids)
+    missing_disease_ids = [disease_id for disease_id in disease_efo_ids if disease_id not in disease_targets]
+    if not missing_disease_ids:
+        return disease_targets
+
     if open_targets_client is None:
+        if OpenTargetsClient is None:
+            raise ImportError('opentargets is required to download the targets of a disease')
         open_targets_client = OpenTargetsClient()
+
+    downloaded_targets = dict(zip(missing_disease_ids, executor.map(
+        partial(_get_known_drug_targets, open_targets_client),
+        missing_disease_ids,
+    )))
+    if cache is not None:
+        cache.put_disease_targets(downloaded_targets)
+
+    disease_targets.update(downloaded_targets)
+    return disease_targets
+
+
+def _get_all_entrez_ids(
+    executor: Executor,
+    ensembl_ids: List[str],
+    my_gene_info: Optional[MyGeneInfo],
+    cache: Optional[TargetCache],
+    batch_size: int,
+) -> Dict[str, List[str]]:
+    """Get the Entrez identifiers of Ensembl genes, looking up the uncached ones in concurrent batches."""
+    entrez_ids = {} if cache is None else cache.get_entrez_ids(ensembl_ids)
+    missing_ensembl_ids = [ensembl_id for ensembl_id in ensembl_ids if ensembl_id not in entrez_ids]
+    if not missing_ensembl_ids:
+        return entrez_ids
+
+    if my_gene_info is None:
+        my_gene_info = MyGeneInfo()
+
+    batches = [
+        missing_ensembl_ids[start:start + batch_size]
+        for start in range(0, len(missing_ensembl_ids), batch_size)
+    ]
+    for batch_entrez_ids in executor.map(partial(_get_entrez_ids, my_gene_info), batches):
+        entrez_ids.update(batch_entrez_ids)
+        if cache is not None:
+            cache.put_entrez_ids(batch_entrez_ids)
+
+    return entrez_ids
+
+
+def _get_known_drug_targets(open_targets_client: 'OpenTargetsClient', disease_efo_id: str) -> List[str]:
+    """Get the Ensembl identifiers of the known drug targets of a disease."""
     associations = open_targets_client.get_associations_for_disease(
         disease_efo_id,
         fields=[
@@ -49,18 +461,17 @@ def download_targets_for_disease(
     ).filter(
         datatype='known_drug',
     )
-    ensembl_list = [
+    return [
         association['target']['id']
         for association in associations
     ]
 
-    if my_gene_info is None:
-        my_gene_info = MyGeneInfo()
 
-    id_mappings = my_gene_info.getgenes(ensembl_list, fields="entrezgene")
-
-    print('efo', 'ncbigene', file=file, sep='\t')
-    for mapping in id_mappings:
+def _get_entrez_ids(my_gene_info: MyGeneInfo, ensembl_ids: List[str]) -> Dict[str, List[str]]:
+    """Get the Entrez identifiers of Ensembl genes with one MyGene request."""
+    rv = {ensembl_id: [] for ensembl_id in ensembl_ids}
+    for mapping in my_gene_info.getgenes(ensembl_ids, fields="entrezgene"):
         entrez_gene_id = mapping.get('entrezgene')
         if entrez_gene_id is not None:
-            print(disease_efo_id, entrez_gene_id, file=file, sep='\t')
+            rv[mapping['query']].append(str(entrez_gene_id))
+    return rv
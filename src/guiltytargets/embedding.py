@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+
+"""In-memory embedding of annotated networks with the GAT2VEC method.
+
+This is the zero-disk counterpart of :func:`guiltytargets.pipeline.write_gat2vec_input_files` followed by
+:class:`GAT2VEC.gat2vec.Gat2Vec`: the structural graph, the bipartite attribute graph and the labels are handed over
+as arrays instead of being written to and parsed back from adjacency list files.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from gensim.models import Word2Vec
+
+from .ppi_network_annotation import AttributeNetwork, LabeledNetwork, Network
+from .ppi_network_annotation.csr import CSRGraph
+from .walks import Adjacency, DEFAULT_CHUNK_SIZE, iter_random_walks, iter_walks
+
+__all__ = [
+    'Gat2VecInput',
+    'WalkCorpus',
+    'get_gat2vec_input',
+    'train_gat2vec',
+]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Gat2VecInput:
+    """Encapsulate the inputs of GAT2VEC as arrays."""
+
+    #: The structural graph, with one node per vertex of the network
+    structure: Adjacency
+
+    #: The bipartite graph between the vertices and their enumerated attributes
+    attributes: Adjacency
+
+    #: The labels (known target or not) in vertex order
+    labels: np.ndarray
+
+    @property
+    def num_vertices(self) -> int:
+        """Get the number of vertices of the network."""
+        return self.structure.num_nodes
+
+
+def get_gat2vec_input(network: Network, targets: List[str]) -> Gat2VecInput:
+    """Get the inputs of GAT2VEC for an annotated network.
+
+    :param network: Network object with attributes overlayed on it.
+    :param targets: A list of known targets.
+    :return: The structural graph, the attribute graph and the labels.
+    """
+    structure = Adjacency.from_csr_graph(CSRGraph.from_graph(network.graph))
+
+    vertices, attribute_ids = AttributeNetwork(network).get_attribute_edges()
+    num_nodes = max(structure.num_nodes, int(attribute_ids.max(initial=-1)) + 1)
+    attributes = Adjacency.from_edges(num_nodes, vertices, attribute_ids)
+
+    labels = LabeledNetwork(network).get_index_label_array(targets)
+
+    return Gat2VecInput(structure=structure, attributes=attributes, labels=labels)
+
+
+class WalkCorpus:
+    """Stream the random walks on the structural and the attribute graph as lists of tokens.
+
+    The walks are generated chunk by chunk while they are consumed, instead of being materialized all at once, so the
+    memory used by the corpus does not depend on ``num_walks``. Every iteration generates the same walks again from the
+    seed, so iterating several times also costs the generation of the walks several times. :meth:`WalkCorpus.materialize`
+    generates them once into integer arrays in memory, from which every later iteration streams the tokens instead.
+
+    Walks on the attribute graph are twice as long and only keep the vertices, so that they relate vertices that
+    share attributes. The walks on the structural graph do not depend on the attributes, so they can also be generated
+    once with :func:`guiltytargets.walks.random_walks` and shared by the corpora of several annotations of a network.
+    """
+
+    def __init__(
+        self,
+        inputs: Gat2VecInput,
+        num_walks: int,
+        walk_length: int,
+        seed: Optional[int] = None,
+        engine: str = 'numpy',
+        num_workers: int = 1,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        structure_walks: Optional[np.ndarray] = None,
+        attribute_walks: Optional[np.ndarray] = None,
+    ) -> None:
+        """Initialize the corpus.
+
+        :param inputs: The inputs of GAT2VEC.
+        :param num_walks: The number of walks started from every vertex on each graph.
+        :param walk_length: The length of the walks on the structural graph.
+        :param seed: Seed of the random walks. A random seed is drawn once if None.
+        :param engine: The engine that generates the walks, one of :data:`guiltytargets.walks.WALK_ENGINES`.
+        :param num_workers: The number of worker processes that generate the walks.
+        :param chunk_size: The maximum number of walks generated at once.
+        :param structure_walks: Precomputed walks on the structural graph, for example a memory-mapped array. They
+         are generated from the seed if None.
+        :param attribute_walks: Precomputed walks on the attribute graph. They are generated from the seed if None.
+        """
+        self.inputs = inputs
+        self.num_walks = num_walks
+        self.walk_length = walk_length
+        self.seed = np.random.SeedSequence().entropy if seed is None else seed
+        self.engine = engine
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self.structure_walks = structure_walks
+        self.attribute_walks = attribute_walks
+
+    def __len__(self) -> int:  # noqa: D105
+        return 2 * self.num_walks * self.inputs.num_vertices
+
+    def _iter_random_walks(self, adjacency: Adjacency, walk_length: int, **kwargs) -> Iterable[np.ndarray]:
+        return iter_random_walks(
+            adjacency,
+            self.num_walks,
+            walk_length,
+            engine=self.engine,
+            num_workers=self.num_workers,
+            chunk_size=self.chunk_size,
+            **kwargs,
+        )
+
+    def _iter_chunks(self, walks: np.ndarray) -> Iterable[np.ndarray]:
+        return (walks[start:start + self.chunk_size] for start in range(0, len(walks), self.chunk_size))
+
+    def _iter_structure_walks(self) -> Iterable[np.ndarray]:
+        if self.structure_walks is None:
+            return self._iter_random_walks(self.inputs.structure, self.walk_length, seed=self.seed)
+        return self._iter_chunks(self.structure_walks)
+
+    def _iter_attribute_walks(self) -> Iterable[np.ndarray]:
+        if self.attribute_walks is None:
+            return self._iter_random_walks(
+                self.inputs.attributes,
+                2 * self.walk_length,
+                start_nodes=np.arange(self.inputs.num_vertices),
+                seed=self.seed + 1,
+            )
+        return self._iter_chunks(self.attribute_walks)
+
+    def __iter__(self) -> Iterator[List[str]]:  # noqa: D105
+        num_vertices = self.inputs.num_vertices
+
+        logger.info('Random walks on the structural graph')
+        for walks in self._iter_structure_walks():
+            yield from iter_walks(walks)
+
+        logger.info('Random walks on the attribute graph')
+        for walks in self._iter_attribute_walks():
+            yield from iter_walks(walks, max_node=num_vertices)
+
+    def materialize(self) -> 'WalkCorpus':
+        """Generate the walks that are not precomputed once, into arrays of 32-bit integers.
+
+        :return: A corpus with the same walks, which streams them from the arrays instead of generating them again.
+        """
+        num_rows = self.num_walks * self.inputs.num_vertices
+        structure_walks = self.structure_walks
+        if structure_walks is None:
+            structure_walks = _collect_walks(self._iter_structure_walks(), (num_rows, self.walk_length))
+        attribute_walks = self.attribute_walks
+        if attribute_walks is None:
+            attribute_walks = _collect_walks(self._iter_attribute_walks(), (num_rows, 2 * self.walk_length))
+
+        return WalkCorpus(
+            self.inputs,
+            self.num_walks,
+            self.walk_length,
+            seed=self.seed,
+            engine=self.engine,
+            num_workers=self.num_workers,
+            chunk_size=self.chunk_size,
+            structure_walks=structure_walks,
+            attribute_walks=attribute_walks,
+        )
+
+    def get_token_counts(self) -> Dict[str, int]:
+        """Count how often every vertex occurs in the walks, as needed to build the vocabulary of the skip-gram model.
+
+        :return: The number of occurrences by token, for the vertices that occur in the walks.
+        """
+        num_vertices = self.inputs.num_vertices
+        counts = np.zeros(num_vertices, dtype=np.int64)
+        for walks in self._iter_structure_walks():
+            counts += np.bincount(walks[walks >= 0], minlength=num_vertices)
+        for walks in self._iter_attribute_walks():
+            counts += np.bincount(walks[(walks >= 0) & (walks < num_vertices)], minlength=num_vertices)
+        return {str(vertex): int(count) for vertex, count in enumerate(counts.tolist()) if count > 0}
+
+
+def _collect_walks(chunks: Iterable[np.ndarray], shape) -> np.ndarray:
+    """Copy chunks of walks into one array of 32-bit integers."""
+    walks = np.empty(shape, dtype=np.int32)
+    start = 0
+    for chunk in chunks:
+        walks[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    return walks[:start]
+
+
+def train_gat2vec(
+    inputs: Gat2VecInput,
+    num_walks: int,
+    walk_length: int,
+    dimension: int,
+    window_size: int,
+    seed: Optional[int] = None,
+    engine: str = 'numpy',
+    num_workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    structure_walks: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Learn an embedding of the vertices with a skip-gram model over the random walks.
+
+    The walks of a :class:`WalkCorpus` are generated once into integer arrays in memory, without writing them to
+    disk. The vocabulary of the skip-gram model is built from the counts of the vertices in the arrays, and every
+    epoch streams the tokens from the arrays, so the walks are not generated again.
+
+    :param inputs: The inputs of GAT2VEC.
+    :param num_walks: The number of walks started from every vertex on each graph.
+    :param walk_length: The length of the walks on the structural graph.
+    :param dimension: The dimension of the embedding.
+    :param window_size: The window size of the skip-gram model.
+    :param seed: Seed of the random walks and the skip-gram model.
+    :param engine: The engine that generates the walks, one of :data:`guiltytargets.walks.WALK_ENGINES`.
+    :param num_workers: The number of worker processes that generate the walks and of threads of the skip-gram model.
+    :param chunk_size: The maximum number of walks generated at once.
+    :param structure_walks: Precomputed walks on the structural graph. They are generated from the seed if None.
+    :return: The embedding, with one row per vertex in vertex order.
+    """
+    corpus = WalkCorpus(
+        inputs,
+        num_walks,
+        walk_length,
+        seed=seed,
+        engine=engine,
+        num_workers=num_workers,
+        chunk_size=chunk_size,
+        structure_walks=structure_walks,
+    ).materialize()
+
+    logger.info('Learning representation')
+    model = Word2Vec(
+        vector_size=dimension,
+        window=window_size,
+        min_count=0,
+        sg=1,
+        workers=num_workers,
+        seed=1 if seed is None else seed,
+    )
+    model.build_vocab_from_freq(corpus.get_token_counts(), corpus_count=len(corpus))
+    model.train(corpus, total_examples=model.corpus_count, epochs=model.epochs)
+
+    return get_embedding_matrix(model, inputs.num_vertices)
+
+
+def get_embedding_matrix(model: Word2Vec, num_vertices: int) -> np.ndarray:
+    """Get the vectors of the vertices from a trained skip-gram model.
+
+    :param model: A skip-gram model trained on walks with the vertex indices as tokens.
+    :param num_vertices: The number of vertices.
+    :return: The embedding, with one row per vertex in vertex order.
+    """
+    rows = [model.wv.key_to_index[str(vertex)] for vertex in range(num_vertices)]
+    return np.asarray(model.wv.vectors[rows])
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""An on-disk cache of node embeddings, addressed by the content of their inputs.
+
+The embedding of an annotated network only depends on its structural graph, its attribute graph and the parameters of
+the random walks and the skip-gram model. It does not depend on the known targets, so ranking a new list of targets
+on the same network can reuse it. Every embedding is stored in its own file, named after a hash of these inputs, and
+the least recently used files are removed when the cache grows over its size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .embedding import Gat2VecInput
+from .ppi_network_annotation.array_io import read_arrays, write_arrays
+
+__all__ = [
+    'EmbeddingCache',
+    'get_embedding_cache_key',
+]
+
+logger = logging.getLogger(__name__)
+
+#: File extension of cached embeddings
+EMBEDDING_CACHE_EXTENSION = '.gtembedding'
+
+#: Version of the embedding cache, part of the cache key
+EMBEDDING_CACHE_VERSION = 1
+
+
+def get_embedding_cache_key(inputs: Gat2VecInput, parameters: Mapping[str, Any]) -> str:
+    """Get the key of the embedding of the given inputs.
+
+    :param inputs: The inputs of GAT2VEC. The labels are not part of the key.
+    :param parameters: The JSON-serializable parameters of the random walks and the skip-gram model.
+    :return: A hexadecimal digest of the structural graph, the attribute graph and the parameters.
+    """
+    sha256 = hashlib.sha256()
+    sha256.update(json.dumps(
+        {'version': EMBEDDING_CACHE_VERSION, 'parameters': dict(parameters)},
+        sort_keys=True,
+    ).encode('utf-8'))
+    for adjacency in (inputs.structure, inputs.attributes):
+        for array in (adjacency.indptr, adjacency.indices):
+            array = np.ascontiguousarray(array, dtype=np.int64)
+            sha256.update(str(len(array)).encode('utf-8'))
+            sha256.update(array.tobytes())
+    return sha256.hexdigest()
+
+
+class EmbeddingCache:
+    """Store embeddings in a directory, with least recently used eviction."""
+
+    def __init__(self, directory: str, max_size: Optional[int] = None) -> None:
+        """Initialize the cache.
+
+        :param directory: The directory of the cached embeddings. It is created if it does not exist.
+        :param max_size: The maximum total size of the cached embeddings in bytes. Unlimited if None.
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_path(self, key: str) -> str:
+        """Get the path of the cached embedding with the given key."""
+        return os.path.join(self.directory, f'{key}{EMBEDDING_CACHE_EXTENSION}')
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Get a cached embedding and mark it as recently used.
+
+        :param key: The key of the embedding, from :func:`get_embedding_cache_key`.
+        :return: The embedding, or None if it is not in the cache or can not be read.
+        """
+        path = self.get_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            arrays, metadata = read_arrays(path, mmap=False)
+        except (OSError, ValueError):
+            logger.warning(f'Could not read cached embedding {path}')
+            return None
+
+        if metadata.get('key') != key or 'embedding' not in arrays:
+            logger.warning(f'Ignoring invalid cached embedding {path}')
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:  # a read-only cache is still usable, without least recently used eviction
+            pass
+        logger.info(f'Loaded cached embedding {path}')
+        return arrays['embedding']
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        """Add an embedding to the cache, then evict the least recently used embeddings over the size limit.
+
+        Failures to write are logged, since the cache is only an optimization.
+
+        :param key: The key of the embedding, from :func:`get_embedding_cache_key`.
+        :param embedding: The embedding, with one row per vertex.
+        """
+        path = self.get_path(key)
+        try:
+            write_arrays(path, {'embedding': embedding}, {'key': key})
+        except OSError:
+            logger.warning(f'Could not write cached embedding {path}')
+            return
+
+        logger.info(f'Cached embedding {path}')
+        self.evict(keep=path)
+
+    def _get_entries(self) -> List[Tuple[float, int, str]]:
+        """Get the last use time, size and path of the cached embeddings."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(EMBEDDING_CACHE_EXTENSION):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:  # removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove the least recently used embeddings until the cache is within its size limit.
+
+        :param keep: The path of an embedding that is never removed, such as the one that was just added.
+        """
+        if self.max_size is None:
+            return
+
+        entries = self._get_entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            logger.info(f'Evicted cached embedding {path}')
+            total_size -= size
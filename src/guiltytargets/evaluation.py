@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""Evaluation of target prioritization on an in-memory embedding.
+
+This is the counterpart of :class:`GAT2VEC.evaluation.classification.Classification` for embeddings and labels that
+are handed over as arrays.
+"""
+
+import heapq
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.model_selection import StratifiedShuffleSplit
+
+__all__ = [
+    'evaluate_cv',
+    'get_prediction_probs',
+    'get_top_prediction_probs',
+]
+
+logger = logging.getLogger(__name__)
+
+#: The default maximum number of vertices scored at once
+DEFAULT_SCORING_CHUNK_SIZE = 100_000
+
+
+def _get_classifier() -> LogisticRegression:
+    return LogisticRegression(solver='lbfgs')
+
+
+def evaluate_cv(
+    embedding: np.ndarray,
+    labels: np.ndarray,
+    training_ratios: Sequence[float],
+    n_splits: int = 5,
+    seed: Optional[int] = None,
+    n_jobs: int = 1,
+    return_timings: bool = False,
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Evaluate a classifier of known targets with repeated stratified splits.
+
+    The splits of all training ratios are drawn up front and evaluated independently, so they can be fanned out over
+    several processes with :mod:`joblib`. Large embeddings are then memory-mapped read-only by the workers instead of
+    being copied to each of them. The results do not depend on ``n_jobs``.
+
+    :param embedding: The embedding, with one row per vertex.
+    :param labels: The labels (known target or not) of the vertices.
+    :param training_ratios: The ratios of vertices used for training.
+    :param n_splits: The number of splits for each training ratio.
+    :param seed: Seed of the splits.
+    :param n_jobs: The number of processes that evaluate splits at the same time. -1 uses all processors.
+    :param return_timings: Also returns the time spent fitting and scoring each split if True.
+    :return: A data frame with one row per training ratio and split and, if ``return_timings`` is true, a data frame
+     of the timings with the columns TR, split, fit_time and score_time in seconds.
+    """
+    tasks = [
+        (training_ratio, split, train_index, test_index)
+        for training_ratio in training_ratios
+        for split, (train_index, test_index) in enumerate(
+            StratifiedShuffleSplit(
+                n_splits=n_splits,
+                train_size=training_ratio,
+                random_state=seed,
+            ).split(embedding, labels),
+        )
+    ]
+
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_split)(embedding, labels, train_index, test_index)
+        for _, _, train_index, test_index in tasks
+    )
+
+    results = defaultdict(list)
+    timings = defaultdict(list)
+    for (training_ratio, split, _, _), (scores, fit_time, score_time) in zip(tasks, rows):
+        results['TR'].append(training_ratio)
+        for key, value in scores.items():
+            results[key].append(value)
+
+        timings['TR'].append(training_ratio)
+        timings['split'].append(split)
+        timings['fit_time'].append(fit_time)
+        timings['score_time'].append(score_time)
+
+    auc_df = pd.DataFrame(results, columns=['TR', 'accuracy', 'f1micro', 'f1macro', 'auc'])
+    if return_timings:
+        return auc_df, pd.DataFrame(timings, columns=['TR', 'split', 'fit_time', 'score_time'])
+    return auc_df
+
+
+def _evaluate_split(
+    embedding: np.ndarray,
+    labels: np.ndarray,
+    train_index: np.ndarray,
+    test_index: np.ndarray,
+) -> Tuple[Dict[str, float], float, float]:
+    """Fit a classifier on one split and score it.
+
+    :return: A 3-tuple of the scores, the time spent fitting and the time spent scoring in seconds.
+    """
+    start = time.perf_counter()
+    classifier = _get_classifier()
+    classifier.fit(embedding[train_index], labels[train_index])
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = classifier.predict(embedding[test_index])
+    probs = classifier.predict_proba(embedding[test_index])
+    scores = {
+        'accuracy': accuracy_score(labels[test_index], predictions),
+        'f1micro': f1_score(labels[test_index], predictions, average='micro'),
+        'f1macro': f1_score(labels[test_index], predictions, average='macro'),
+        'auc': roc_auc_score(labels[test_index], probs[:, 1]),
+    }
+    score_time = time.perf_counter() - start
+
+    return scores, fit_time, score_time
+
+
+def get_prediction_probs(
+    embedding: np.ndarray,
+    labels: np.ndarray,
+    chunk_size: int = DEFAULT_SCORING_CHUNK_SIZE,
+) -> np.ndarray:
+    """Train a classifier on all vertices and get the class probabilities of every vertex.
+
+    :param embedding: The embedding, with one row per vertex.
+    :param labels: The labels (known target or not) of the vertices.
+    :param chunk_size: The maximum number of vertices scored at once.
+    :return: An array with the probabilities of class 0 (not a target) and class 1 (target) for every vertex.
+    """
+    classifier = _get_classifier()
+    classifier.fit(embedding, labels)
+    return np.concatenate([
+        probs
+        for _, probs in _iter_prediction_probs(classifier, embedding, chunk_size)
+    ])
+
+
+def get_top_prediction_probs(
+    embedding: np.ndarray,
+    labels: np.ndarray,
+    k: int,
+    chunk_size: int = DEFAULT_SCORING_CHUNK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Train a classifier on all vertices and get the vertices that are most likely to be targets.
+
+    The vertices are scored in chunks and only the best candidates are kept in a heap, so the memory used does not
+    depend on the number of vertices. Ties are broken by the lowest vertex index.
+
+    :param embedding: The embedding, with one row per vertex.
+    :param labels: The labels (known target or not) of the vertices.
+    :param k: The number of vertices to keep.
+    :param chunk_size: The maximum number of vertices scored at once.
+    :return: A 2-tuple of the indices of the top vertices, by decreasing probability of being a target, and an
+     array with their probabilities of class 0 (not a target) and class 1 (target).
+    """
+    if k < 1:
+        raise ValueError(f'Invalid number of top vertices: {k}')
+
+    classifier = _get_classifier()
+    classifier.fit(embedding, labels)
+
+    heap: List[Tuple[float, int, float]] = []
+    for start, probs in _iter_prediction_probs(classifier, embedding, chunk_size):
+        # Sort by decreasing probability, then by increasing index, so that ties keep the lowest indices
+        candidates = np.lexsort((np.arange(len(probs)), -probs[:, 1]))[:k]
+        for i in candidates.tolist():
+            item = (float(probs[i, 1]), -(start + i), float(probs[i, 0]))
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    top = sorted(heap, reverse=True)
+    indices = np.array([-index for _, index, _ in top], dtype=np.int64)
+    top_probs = np.array([(prob_0, prob_1) for prob_1, _, prob_0 in top], dtype=np.float64).reshape(-1, 2)
+    return indices, top_probs
+
+
+def _iter_prediction_probs(
+    classifier: LogisticRegression,
+    embedding: np.ndarray,
+    chunk_size: int,
+) -> Iterable[Tuple[int, np.ndarray]]:
+    """Get the class probabilities of the vertices in chunks.
+
+    :return: An iterable of 2-tuples of the index of the first vertex of a chunk and the probabilities of its vertices.
+    """
+    for start in range(0, len(embedding), chunk_size):
+        yield start, classifier.predict_proba(embedding[start:start + chunk_size])
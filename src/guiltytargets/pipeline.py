@@ -2,20 +2,30 @@
 
 """Pipeline for GuiltyTargets."""
 
-from typing import List, Tuple
+import logging
+from typing import List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from .constants import gat2vec_config
+from .embedding import Gat2VecInput, get_gat2vec_input, train_gat2vec
+from .embedding_cache import EmbeddingCache, get_embedding_cache_key
+from .evaluation import DEFAULT_SCORING_CHUNK_SIZE, evaluate_cv, get_prediction_probs, get_top_prediction_probs
 from .gat2vec import Classification, Gat2Vec, gat2vec_paths
-from .ppi_network_annotation import AttributeNetwork, LabeledNetwork, Network, generate_ppi_network, parse_dge
+from .ppi_network_annotation import (
+    AttributeNetwork, GeneIndex, LabeledNetwork, Network, generate_ppi_network, parse_dge,
+)
 from .ppi_network_annotation.parsers import parse_gene_list
+from .utils import log_memory_usage
 
 __all__ = [
     'run',
     'rank_targets',
 ]
 
+logger = logging.getLogger(__name__)
+
 
 def run(
     input_directory,
@@ -33,26 +43,37 @@ def run(
     base_mean_header,
     entrez_delimiter,
     ppi_edge_min_confidence,
+    use_ppi_graph_cache: bool = False,
+    gene_index_path: Optional[str] = None,
 ) -> None:
     """Run the GuiltyTargets pipeline."""
-    gene_list = parse_dge(
-        dge_path=dge_path,
-        entrez_id_header=entrez_id_header,
-        log2_fold_change_header=log2_fold_change_header,
-        adj_p_header=adj_p_header,
-        entrez_delimiter=entrez_delimiter,
-        base_mean_header=base_mean_header,
-    )
-    network = generate_ppi_network(
-        ppi_graph_path=ppi_graph_path,
-        dge_list=gene_list,
-        max_adj_p=max_adj_p,
-        max_log2_fold_change=max_log2_fold_change,
-        min_log2_fold_change=min_log2_fold_change,
-        ppi_edge_min_confidence=ppi_edge_min_confidence,
-    )
+    gene_index = None if gene_index_path is None else GeneIndex(gene_index_path)
+    try:
+        log_memory_usage('before annotating the network')
+        gene_list = parse_dge(
+            dge_path=dge_path,
+            entrez_id_header=entrez_id_header,
+            log2_fold_change_header=log2_fold_change_header,
+            adj_p_header=adj_p_header,
+            entrez_delimiter=entrez_delimiter,
+            base_mean_header=base_mean_header,
+            gene_index=gene_index,
+        )
+        network = generate_ppi_network(
+            ppi_graph_path=ppi_graph_path,
+            dge_list=gene_list,
+            max_adj_p=max_adj_p,
+            max_log2_fold_change=max_log2_fold_change,
+            min_log2_fold_change=min_log2_fold_change,
+            ppi_edge_min_confidence=ppi_edge_min_confidence,
+            use_ppi_graph_cache=use_ppi_graph_cache,
+        )
+        log_memory_usage('after annotating the network')
 
-    targets = parse_gene_list(targets_path, network.graph)
+        targets = parse_gene_list(targets_path, network.graph, gene_index=gene_index)
+    finally:
+        if gene_index is not None:
+            gene_index.close()
 
     auc_df, probs_df = rank_targets(
         directory=input_directory,
@@ -60,6 +81,22 @@ def run(
         network=network,
     )
 
+    write_results(auc_df, probs_df, auc_output_path=auc_output_path, probs_output_path=probs_output_path)
+
+
+def write_results(
+    auc_df: pd.DataFrame,
+    probs_df: pd.DataFrame,
+    auc_output_path: str,
+    probs_output_path: str,
+) -> None:
+    """Write the evaluation and the rankings of the pipeline.
+
+    :param auc_df: The evaluation dataframe.
+    :param probs_df: The probabilities dataframe.
+    :param auc_output_path: The path of the evaluation output file.
+    :param probs_output_path: The path of the rankings output file.
+    """
     probs_df.to_csv(
         probs_output_path,
         sep="\t",
@@ -93,14 +130,23 @@ def rank_targets(
     network: Network,
     targets: List[str],
     directory: str,
+    in_memory: Optional[bool] = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Rank proteins based on their likelihood of being targets.
 
     :param network: The PPI network annotated with differential gene expression data.
     :param targets: A list of targets.
     :param directory: Home directory for Gat2Vec.
+    :param in_memory: Passes the graphs and labels to the embedding and classification as arrays instead of writing
+     GAT2VEC input files to ``directory`` if True. Defaults to the ``in_memory`` option of the Gat2Vec configuration.
     :return: A 2-tuple of the auc dataframe and the probabilities dataframe?
     """
+    if in_memory is None:
+        in_memory = gat2vec_config.in_memory
+
+    if in_memory:
+        return rank_targets_in_memory(network=network, targets=targets)
+
     write_gat2vec_input_files(network=network, targets=targets, home_dir=directory)
 
     g2v = Gat2Vec(directory, directory, label=False, tr=gat2vec_config.training_ratio)
@@ -119,6 +165,81 @@ def rank_targets(
     return auc_df, probs_df
 
 
+def rank_targets_in_memory(
+    network: Network,
+    targets: List[str],
+    structure_walks: Optional[np.ndarray] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Rank proteins without writing the GAT2VEC input files.
+
+    :param network: The PPI network annotated with differential gene expression data.
+    :param targets: A list of targets.
+    :param structure_walks: Precomputed walks on the structural graph of the network, shared by several runs.
+    :return: A 2-tuple of the auc dataframe and the probabilities dataframe
+    """
+    inputs = get_gat2vec_input(network, targets)
+    embedding = get_embedding(inputs, structure_walks=structure_walks)
+
+    auc_df, timings_df = evaluate_cv(
+        embedding,
+        inputs.labels,
+        gat2vec_config.training_ratio,
+        seed=gat2vec_config.seed,
+        n_jobs=gat2vec_config.evaluation_num_jobs,
+        return_timings=True,
+    )
+    for training_ratio, (fit_time, score_time) in timings_df.groupby('TR')[['fit_time', 'score_time']].sum().iterrows():
+        logger.info(f'Evaluation with training ratio {training_ratio}: {fit_time:.2f}s fitting, {score_time:.2f}s scoring')
+    probs_df = get_in_memory_rankings(
+        embedding,
+        inputs.labels,
+        network,
+        top_k=gat2vec_config.ranking_top_k,
+        chunk_size=gat2vec_config.ranking_chunk_size,
+    )
+
+    return auc_df, probs_df
+
+
+def get_embedding(inputs: Gat2VecInput, structure_walks: Optional[np.ndarray] = None) -> np.ndarray:
+    """Learn the embedding of the in-memory mode, or reuse it from the embedding cache if it is configured.
+
+    :param inputs: The inputs of GAT2VEC.
+    :param structure_walks: Precomputed walks on the structural graph, generated with the same parameters.
+    :return: The embedding, with one row per vertex.
+    """
+    parameters = dict(
+        num_walks=gat2vec_config.num_walks,
+        walk_length=gat2vec_config.walk_length,
+        dimension=gat2vec_config.dimension,
+        window_size=gat2vec_config.window_size,
+        seed=gat2vec_config.seed,
+        engine=gat2vec_config.walk_engine,
+        chunk_size=gat2vec_config.walk_chunk_size,
+    )
+
+    cache = cache_key = None
+    if gat2vec_config.embedding_cache_directory is not None and gat2vec_config.seed is not None:
+        cache = EmbeddingCache(gat2vec_config.embedding_cache_directory, gat2vec_config.embedding_cache_max_size)
+        cache_key = get_embedding_cache_key(inputs, parameters)
+        embedding = cache.get(cache_key)
+        if embedding is not None:
+            return embedding
+
+    embedding = train_gat2vec(
+        inputs,
+        num_workers=gat2vec_config.num_workers,
+        structure_walks=structure_walks,
+        **parameters,
+    )
+    log_memory_usage('after learning the embedding')
+
+    if cache is not None:
+        cache.put(cache_key, embedding)
+
+    return embedding
+
+
 def get_rankings(
     classifier: Classification,
     embedding: pd.DataFrame,
@@ -136,3 +257,33 @@ def get_rankings(
         attribute_name='name',
     )
     return probs_df
+
+
+def get_in_memory_rankings(
+    embedding: np.ndarray,
+    labels: np.ndarray,
+    network: Network,
+    top_k: Optional[int] = None,
+    chunk_size: int = DEFAULT_SCORING_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """Get the predicted rankings from an in-memory embedding.
+
+    :param embedding: The embedding, with one row per vertex.
+    :param labels: The labels (known target or not) of the vertices.
+    :param network: PPI network with annotations
+    :param top_k: Only keeps the given number of most likely targets, by decreasing probability, if not None.
+    :param chunk_size: The maximum number of vertices scored at once.
+    :return: The probabilities of both classes, the Entrez identifier and the symbol of the vertices, indexed by
+     vertex index.
+    """
+    if top_k is None:
+        indices = np.arange(len(embedding))
+        probs = get_prediction_probs(embedding, labels, chunk_size=chunk_size)
+    else:
+        indices, probs = get_top_prediction_probs(embedding, labels, top_k, chunk_size=chunk_size)
+
+    probs_df = pd.DataFrame(probs, index=indices)
+    probs_df['Entrez'] = network.get_attribute_array('name')[indices]
+    if 'symbol' in network.graph.vs.attributes():
+        probs_df['Symbol'] = network.get_attribute_array('symbol')[indices]
+    return probs_df
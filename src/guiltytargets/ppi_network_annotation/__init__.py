@@ -2,5 +2,8 @@
 
 """For annotating a protein protein interaction network with differential gene expression."""
 
-from .model import AttributeNetwork, FilteredNetwork, Gene, LabeledNetwork, Network  # noqa: F401
+from .gene_index import GeneIndex  # noqa: F401
+from .model import (  # noqa: F401
+    AttributeNetwork, FilteredNetwork, Gene, GeneTable, LabeledNetwork, Network, SubgraphView,
+)
 from .pipeline import generate_ppi_network, parse_dge  # noqa: F401
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""Read and write named numpy arrays in a single, memory-mappable binary file.
+
+The file starts with a magic string, followed by the length of a JSON header and the header itself. The header
+describes the dtype, shape and offset of every array and carries free-form metadata. The raw array buffers follow,
+each aligned to 64 bytes so they can be memory-mapped without copying.
+"""
+
+import json
+import os
+import struct
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+__all__ = [
+    'allocate_array',
+    'read_arrays',
+    'write_arrays',
+]
+
+MAGIC = b'GTARRAY1'
+_ALIGNMENT = 64
+_LENGTH_FORMAT = '<Q'
+_PREAMBLE_SIZE = len(MAGIC) + struct.calcsize(_LENGTH_FORMAT)
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _get_header(
+    descriptions: Mapping[str, Tuple[np.dtype, Tuple[int, ...]]],
+    metadata: Optional[Mapping[str, Any]],
+) -> Tuple[Dict[str, Any], bytes, int]:
+    """Get the header of a file with arrays of the given dtypes and shapes, its bytes and the start of the data."""
+    header = {'metadata': dict(metadata or {}), 'arrays': {}}
+    offset = 0
+    for name, (dtype, shape) in descriptions.items():
+        if dtype.hasobject:
+            raise ValueError(f'Can not write object array: {name}')
+        header['arrays'][name] = {
+            'dtype': dtype.str,
+            'shape': list(shape),
+            'offset': offset,
+        }
+        offset = _align(offset + dtype.itemsize * int(np.prod(shape)))
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    return header, header_bytes, _align(_PREAMBLE_SIZE + len(header_bytes))
+
+
+def _write_preamble(file, header_bytes: bytes) -> None:
+    file.write(MAGIC)
+    file.write(struct.pack(_LENGTH_FORMAT, len(header_bytes)))
+    file.write(header_bytes)
+
+
+def write_arrays(
+    path: str,
+    arrays: Mapping[str, np.ndarray],
+    metadata: Optional[Mapping[str, Any]] = None,
+) -> None:
+    """Write named arrays and metadata to a binary file.
+
+    The file is first written next to the destination and then moved into place, so readers never see a partially
+    written file.
+
+    :param path: The path of the output file.
+    :param arrays: A mapping from names to numpy arrays. Object arrays are not supported.
+    :param metadata: JSON-serializable metadata stored in the header.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    header, header_bytes, data_start = _get_header(
+        {name: (array.dtype, array.shape) for name, array in arrays.items()},
+        metadata,
+    )
+
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    try:
+        with open(tmp_path, 'wb') as file:
+            _write_preamble(file, header_bytes)
+            for name, array in arrays.items():
+                file.seek(data_start + header['arrays'][name]['offset'])
+                file.write(array.tobytes())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def allocate_array(
+    path: str,
+    name: str,
+    shape: Tuple[int, ...],
+    dtype,
+    metadata: Optional[Mapping[str, Any]] = None,
+) -> np.ndarray:
+    """Create a file with a single array of zeros and return the array as a writable memory map.
+
+    This allows writing an array that does not fit in memory piece by piece. Unlike :func:`write_arrays`, the file is
+    written in place, so it should only be read with :func:`read_arrays` once the array is filled and flushed.
+
+    :param path: The path of the output file.
+    :param name: The name of the array.
+    :param shape: The shape of the array.
+    :param dtype: The dtype of the array.
+    :param metadata: JSON-serializable metadata stored in the header.
+    :return: The array, memory-mapped in read-write mode.
+    """
+    dtype = np.dtype(dtype)
+    shape = tuple(shape)
+    header, header_bytes, data_start = _get_header({name: (dtype, shape)}, metadata)
+    nbytes = dtype.itemsize * int(np.prod(shape))
+
+    with open(path, 'wb') as file:
+        _write_preamble(file, header_bytes)
+        file.truncate(data_start + nbytes)
+
+    if nbytes == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r+', offset=data_start, shape=shape)
+
+
+def read_arrays(path: str, mmap: bool = True) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Read named arrays and metadata from a binary file written by :func:`write_arrays`.
+
+    :param path: The path of the input file.
+    :param mmap: If true, the arrays are read-only memory maps of the file instead of copies in memory.
+    :return: A 2-tuple of the mapping from names to arrays and the metadata.
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'Not a GuiltyTargets array file: {path}')
+        (header_length,) = struct.unpack(_LENGTH_FORMAT, file.read(struct.calcsize(_LENGTH_FORMAT)))
+        header = json.loads(file.read(header_length).decode('utf-8'))
+
+    data_start = _align(_PREAMBLE_SIZE + header_length)
+    arrays = {}
+    for name, description in header['arrays'].items():
+        dtype = np.dtype(description['dtype'])
+        shape = tuple(description['shape'])
+        offset = data_start + description['offset']
+        if 0 in shape:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        elif mmap:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        else:
+            with open(path, 'rb') as file:
+                file.seek(offset)
+                arrays[name] = np.fromfile(file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+    return arrays, header['metadata']
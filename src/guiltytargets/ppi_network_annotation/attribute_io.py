@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""Encode graph attributes as numpy arrays, so that they can be written with :func:`array_io.write_arrays`.
+
+Every attribute is stored as one or more columns, depending on the kind of its values:
+
+- ``bool``, ``int`` and ``float`` values are stored as one array of the corresponding dtype.
+- ``str`` values are stored as one fixed-width unicode array, which can be memory-mapped.
+- ``str_list`` values, which are lists of strings or None, are stored as the flattened strings, the offsets of every
+  list in them and a mask of the missing lists.
+"""
+
+import numbers
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+__all__ = [
+    'ATTRIBUTE_KINDS',
+    'decode_attribute',
+    'encode_attribute',
+]
+
+#: The kinds of attributes that can be encoded
+ATTRIBUTE_KINDS = ('bool', 'int', 'float', 'str', 'str_list')
+
+
+def _is_str_list(value) -> bool:
+    return value is None or (isinstance(value, list) and all(isinstance(element, str) for element in value))
+
+
+def _get_kind(values: Sequence) -> str:
+    if all(isinstance(value, (bool, np.bool_)) for value in values):
+        return 'bool'
+    if all(isinstance(value, numbers.Integral) and not isinstance(value, (bool, np.bool_)) for value in values):
+        return 'int'
+    if all(isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_)) for value in values):
+        return 'float'
+    if all(isinstance(value, str) for value in values):
+        return 'str'
+    if all(_is_str_list(value) for value in values):
+        return 'str_list'
+    raise ValueError(f'Unsupported attribute values. Supported kinds are {", ".join(ATTRIBUTE_KINDS)}')
+
+
+def encode_attribute(values: Sequence) -> Tuple[str, Dict[str, np.ndarray]]:
+    """Encode the values of an attribute as arrays.
+
+    Integers and floats of the same attribute are all encoded as floats.
+
+    :param values: The values of the attribute, in vertex or edge order.
+    :return: A 2-tuple of the kind of the attribute and its arrays by column name.
+    """
+    kind = _get_kind(values)
+
+    if kind == 'bool':
+        return kind, {'values': np.array(values, dtype=bool)}
+    if kind == 'int':
+        return kind, {'values': np.array(values, dtype=np.int64)}
+    if kind == 'float':
+        return kind, {'values': np.array(values, dtype=np.float64)}
+    if kind == 'str':
+        return kind, {'values': np.array(values, dtype=str)}
+
+    lengths = [0 if value is None else len(value) for value in values]
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return kind, {
+        'values': np.array([element for value in values if value is not None for element in value], dtype=str),
+        'offsets': offsets,
+        'missing': np.array([value is None for value in values], dtype=bool),
+    }
+
+
+def decode_attribute(kind: str, arrays: Mapping[str, np.ndarray]) -> List:
+    """Decode the values of an attribute from the arrays of :func:`encode_attribute`.
+
+    :param kind: The kind of the attribute.
+    :param arrays: The arrays of the attribute by column name.
+    :return: The values of the attribute.
+    """
+    if kind in {'bool', 'int', 'float', 'str'}:
+        return arrays['values'].tolist()
+
+    if kind != 'str_list':
+        raise ValueError(f'Invalid attribute kind: {kind}. Valid kinds are {", ".join(ATTRIBUTE_KINDS)}')
+
+    values = arrays['values'].tolist()
+    offsets = arrays['offsets'].tolist()
+    return [
+        None if missing else values[start:stop]
+        for missing, start, stop in zip(arrays['missing'].tolist(), offsets[:-1], offsets[1:])
+    ]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""Detect compressed input files by their extension and decompress them as a stream.
+
+Files ending in ``.gz``, ``.bz2`` and ``.xz`` are read with the standard library. Files ending in ``.zst`` require
+``zstandard``, which is installed with ``pip install guiltytargets[zstd]``.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+from typing import IO, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = [
+    'COMPRESSION_EXTENSIONS',
+    'get_compression',
+    'open_file',
+    'split_compression_extension',
+]
+
+#: Compressions of input files by file extension, named as in :func:`pandas.read_csv`
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.zst': 'zstd',
+}
+
+
+def split_compression_extension(path: str) -> Tuple[str, Optional[str]]:
+    """Split the compression extension off a path.
+
+    :param path: The path to a file, which may be compressed.
+    :return: A 2-tuple of the path without its compression extension and the compression, or None if the path does
+     not end in a compression extension.
+    """
+    root, extension = os.path.splitext(path)
+    compression = COMPRESSION_EXTENSIONS.get(extension.lower())
+    if compression is None:
+        return path, None
+    return root, compression
+
+
+def get_compression(path: str) -> Optional[str]:
+    """Get the compression of a file from its extension.
+
+    :param path: The path to a file, which may be compressed.
+    :return: The compression, which can be passed to :func:`pandas.read_csv`, or None if the file is not compressed.
+    :raises ImportError: If the file is compressed with zstd and ``zstandard`` is not installed.
+    """
+    compression = split_compression_extension(path)[1]
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError(f'zstandard is required to read {path}. Install it with pip install guiltytargets[zstd]')
+    return compression
+
+
+def open_file(path: str, mode: str = 'rb', encoding: Optional[str] = None) -> IO:
+    """Open a file, decompressing it as a stream if its extension is a compression extension.
+
+    :param path: The path to a file, which may be compressed.
+    :param mode: Either ``rb`` or ``rt``.
+    :param encoding: The encoding of the file in text mode.
+    :return: A file object of the decompressed content.
+    """
+    if mode not in {'rb', 'rt'}:
+        raise ValueError(f'Invalid mode: {mode}. Compressed files can only be read')
+
+    compression = get_compression(path)
+    if compression is None:
+        return open(path, mode, encoding=encoding)
+    if compression == 'gzip':
+        return gzip.open(path, mode, encoding=encoding)
+    if compression == 'bz2':
+        return bz2.open(path, mode, encoding=encoding)
+    if compression == 'xz':
+        return lzma.open(path, mode, encoding=encoding)
+
+    file = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    if mode == 'rt':
+        return io.TextIOWrapper(file, encoding=encoding)
+    return file
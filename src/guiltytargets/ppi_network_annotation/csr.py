@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the class CSRGraph, a compressed sparse row view of an undirected graph."""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from igraph import Graph
+
+from .array_io import read_arrays, write_arrays
+
+__all__ = [
+    'CSRGraph',
+]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CSRGraph:
+    """Encapsulate an undirected graph as compressed sparse row arrays.
+
+    Every edge is stored in the rows of both of its endpoints, so the neighbours of vertex ``i`` are
+    ``indices[indptr[i]:indptr[i + 1]]``, in the same order as :meth:`igraph.Graph.get_adjlist`. The igraph edge
+    identifier of every entry is kept in ``edge_ids`` so that the original graph can be rebuilt exactly.
+    """
+
+    #: Vertex names, in vertex order
+    names: np.ndarray
+
+    #: Row offsets, of length number of vertices + 1
+    indptr: np.ndarray
+
+    #: Neighbour of every entry
+    indices: np.ndarray
+
+    #: Edge identifier of every entry
+    edge_ids: np.ndarray
+
+    #: Edge weight of every entry, if the graph is weighted
+    weights: Optional[np.ndarray] = None
+
+    @property
+    def num_vertices(self) -> int:
+        """Get the number of vertices."""
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self) -> int:
+        """Get the number of edges."""
+        return len(self.indices) // 2
+
+    @classmethod
+    def from_edges(
+        cls,
+        names: Sequence[str],
+        sources: np.ndarray,
+        targets: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+    ) -> 'CSRGraph':
+        """Build the CSR arrays from an edge list.
+
+        :param names: Vertex names, in vertex order.
+        :param sources: Source vertex index of every edge.
+        :param targets: Target vertex index of every edge.
+        :param weights: Optional weight of every edge.
+        :return: The graph in CSR form.
+        """
+        num_vertices = len(names)
+        num_edges = len(sources)
+
+        rows = np.concatenate([sources, targets]).astype(np.int64, copy=False)
+        columns = np.concatenate([targets, sources]).astype(np.int64, copy=False)
+        edge_ids = np.tile(np.arange(num_edges, dtype=np.int64), 2)
+
+        order = np.lexsort((edge_ids, columns, rows))
+        indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_vertices), out=indptr[1:])
+
+        if weights is not None:
+            weights = np.tile(np.asarray(weights, dtype=np.float64), 2)[order]
+
+        return cls(
+            names=np.asarray(names, dtype=str),
+            indptr=indptr,
+            indices=columns[order],
+            edge_ids=edge_ids[order],
+            weights=weights,
+        )
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> 'CSRGraph':
+        """Build the CSR arrays from an undirected igraph graph.
+
+        :param graph: An undirected graph with vertex names and optionally edge weights.
+        :return: The graph in CSR form.
+        """
+        edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+        weights = graph.es['weight'] if 'weight' in graph.es.attributes() else None
+        return cls.from_edges(graph.vs['name'], edges[:, 0], edges[:, 1], weights)
+
+    def get_edges(self) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """Get the edge list, in edge identifier order.
+
+        :return: A 3-tuple of the sources, targets and weights (or None) of the edges.
+        """
+        _, first = np.unique(self.edge_ids, return_index=True)
+        rows = np.repeat(np.arange(self.num_vertices, dtype=np.int64), np.diff(self.indptr))
+        weights = None if self.weights is None else np.asarray(self.weights[first])
+        return rows[first], np.asarray(self.indices[first]), weights
+
+    def to_graph(self) -> Graph:
+        """Build an undirected igraph graph identical to the one the arrays were built from.
+
+        :return: The graph.
+        """
+        sources, targets, weights = self.get_edges()
+        graph = Graph(n=self.num_vertices, edges=np.column_stack([sources, targets]), directed=False)
+        graph.vs['name'] = self.names.tolist()
+        if weights is not None:
+            graph.es['weight'] = weights.tolist()
+        return graph
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """Get the arrays of the graph by name, as stored by :meth:`save`."""
+        arrays = {
+            'names': self.names,
+            'indptr': self.indptr,
+            'indices': self.indices,
+            'edge_ids': self.edge_ids,
+        }
+        if self.weights is not None:
+            arrays['weights'] = self.weights
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> 'CSRGraph':
+        """Build the graph from arrays returned by :meth:`get_arrays`.
+
+        :param arrays: A mapping from names to arrays, which may contain other arrays too.
+        :return: The graph in CSR form.
+        """
+        return cls(
+            names=arrays['names'],
+            indptr=arrays['indptr'],
+            indices=arrays['indices'],
+            edge_ids=arrays['edge_ids'],
+            weights=arrays.get('weights'),
+        )
+
+    def save(self, path: str, metadata: Optional[Mapping[str, Any]] = None) -> None:
+        """Save the arrays to a binary file.
+
+        :param path: The path of the output file.
+        :param metadata: JSON-serializable metadata stored with the arrays.
+        """
+        write_arrays(path, self.get_arrays(), metadata)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Tuple['CSRGraph', Mapping[str, Any]]:
+        """Load the arrays from a binary file written by :meth:`save`.
+
+        :param path: The path of the input file.
+        :param mmap: If true, the arrays are memory-mapped instead of read into memory.
+        :return: A 2-tuple of the graph in CSR form and the metadata stored with it.
+        """
+        arrays, metadata = read_arrays(path, mmap=mmap)
+        return cls.from_arrays(arrays), metadata
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""An offline index of gene identifiers, to map between Entrez, HGNC symbols, HGNC, Ensembl and UniProt identifiers.
+
+The index is an SQLite database built from the HGNC complete set, which can be downloaded from
+https://www.genenames.org/download/statistics-and-files/. The mappings of every namespace are loaded once as data
+frames, so that whole columns of identifiers are mapped with vectorized lookups. Every mapping goes through the Entrez
+identifiers, which are the identifiers of the genes in the networks.
+"""
+
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable
+
+import pandas as pd
+
+from .compression import get_compression
+
+__all__ = [
+    'ENTREZ_NAMESPACE',
+    'GENE_INDEX_NAMESPACES',
+    'GeneIndex',
+]
+
+logger = logging.getLogger(__name__)
+
+#: Namespace of the Entrez identifiers, to which the identifiers of all other namespaces are mapped
+ENTREZ_NAMESPACE = 'entrez'
+
+#: Namespaces of the identifiers that are mapped to Entrez, in the order they are tried
+GENE_INDEX_NAMESPACES = ('hgnc', 'ensembl', 'symbol', 'uniprot')
+
+#: Columns of the HGNC complete set by namespace
+HGNC_COLUMNS = {
+    'hgnc': 'hgnc_id',
+    'symbol': 'symbol',
+    'ensembl': 'ensembl_gene_id',
+    'uniprot': 'uniprot_ids',
+}
+
+#: Delimiter of the columns of the HGNC complete set with several identifiers
+HGNC_DELIMITER = '|'
+
+#: Number of lines of the HGNC complete set that are read at once
+HGNC_CHUNK_SIZE = 10_000
+
+
+class GeneIndex:
+    """Map gene identifiers to and from Entrez identifiers with an SQLite database, without network requests."""
+
+    def __init__(self, path: str) -> None:
+        """Open an index built with :meth:`GeneIndex.build`.
+
+        :param path: The path of the SQLite database.
+        """
+        self.path = os.path.expanduser(path)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        self.connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+        self._mappings: Dict[str, pd.Series] = {}
+        self._reverse_mappings: Dict[str, pd.Series] = {}
+
+    @classmethod
+    def build(cls, hgnc_path: str, path: str) -> 'GeneIndex':
+        """Build an index from the HGNC complete set.
+
+        :param hgnc_path: The path to the tab-separated HGNC complete set, which may be compressed.
+        :param path: The path of the SQLite database that is written. An existing database is replaced.
+        :return: The index.
+        """
+        path = os.path.expanduser(path)
+        tmp_path = f'{path}.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        chunks = pd.read_csv(
+            hgnc_path,
+            sep='\t',
+            usecols=['entrez_id', *HGNC_COLUMNS.values()],
+            dtype=str,
+            # Only empty cells are missing values, not symbols such as NA
+            keep_default_na=False,
+            na_values=[''],
+            compression=get_compression(hgnc_path),
+            chunksize=HGNC_CHUNK_SIZE,
+        )
+        connection = sqlite3.connect(tmp_path)
+        try:
+            with connection:
+                connection.execute('CREATE TABLE identifiers (namespace TEXT, identifier TEXT, entrez_id TEXT)')
+                for chunk in chunks:
+                    chunk = chunk[chunk['entrez_id'].notna()]
+                    for namespace, column in HGNC_COLUMNS.items():
+                        identifiers = chunk[column].str.split(HGNC_DELIMITER, regex=False)
+                        df = pd.DataFrame({'identifier': identifiers, 'entrez_id': chunk['entrez_id']})
+                        df = df.explode('identifier').dropna()
+                        connection.executemany(
+                            'INSERT INTO identifiers VALUES (?, ?, ?)',
+                            ((namespace, identifier, entrez_id) for identifier, entrez_id in df.itertuples(index=False)),
+                        )
+                connection.execute('CREATE INDEX identifiers_namespace ON identifiers (namespace)')
+        finally:
+            connection.close()
+
+        os.replace(tmp_path, path)
+        logger.info(f'Built gene index {path} from {hgnc_path}')
+        return cls(path)
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+    def get_mapping(self, namespace: str) -> pd.Series:
+        """Get the Entrez identifiers of the identifiers of a namespace.
+
+        Identifiers that map to several Entrez identifiers are left out, since they are ambiguous.
+
+        :param namespace: One of :data:`GENE_INDEX_NAMESPACES`.
+        :return: The Entrez identifiers, indexed by the identifiers of the namespace.
+        """
+        if namespace not in HGNC_COLUMNS:
+            raise ValueError(f'Invalid namespace: {namespace}. Valid namespaces are {", ".join(HGNC_COLUMNS)}')
+
+        if namespace not in self._mappings:
+            df = pd.read_sql_query(
+                'SELECT DISTINCT identifier, entrez_id FROM identifiers WHERE namespace = ?',
+                self.connection,
+                params=(namespace,),
+            )
+            df = df.drop_duplicates('identifier', keep=False)
+            self._mappings[namespace] = df.set_index('identifier')['entrez_id']
+
+        return self._mappings[namespace]
+
+    def get_reverse_mapping(self, namespace: str) -> pd.Series:
+        """Get the identifiers of a namespace of the Entrez identifiers.
+
+        Entrez identifiers with several identifiers in the namespace, such as several UniProt identifiers, get the
+        first one, which is the primary one in the HGNC complete set.
+
+        :param namespace: One of :data:`GENE_INDEX_NAMESPACES`.
+        :return: The identifiers of the namespace, indexed by the Entrez identifiers.
+        """
+        if namespace not in self._reverse_mappings:
+            mapping = self.get_mapping(namespace)
+            self._reverse_mappings[namespace] = pd.Series(
+                mapping.index,
+                index=mapping.to_numpy(),
+            ).groupby(level=0).first()
+        return self._reverse_mappings[namespace]
+
+    def to_entrez(self, identifiers: pd.Series, namespaces: Iterable[str] = GENE_INDEX_NAMESPACES) -> pd.Series:
+        """Map identifiers to Entrez identifiers.
+
+        Identifiers that only have digits are already Entrez identifiers and are kept. The others are looked up in
+        every namespace in turn, until they are found.
+
+        :param identifiers: Identifiers as strings.
+        :param namespaces: The namespaces in which the identifiers are looked up, in order.
+        :return: The Entrez identifiers, with the index of ``identifiers``. Identifiers that are not found are missing.
+        """
+        identifiers = identifiers.astype(str)
+        entrez_ids = identifiers.where(identifiers.str.fullmatch(r'\d+'))
+        for namespace in namespaces:
+            missing = entrez_ids.isna()
+            if not missing.any():
+                break
+            entrez_ids[missing] = identifiers[missing].map(self.get_mapping(namespace))
+        return entrez_ids
+
+    def from_entrez(self, entrez_ids: pd.Series, namespace: str) -> pd.Series:
+        """Map Entrez identifiers to the identifiers of a namespace.
+
+        :param entrez_ids: Entrez identifiers as strings.
+        :param namespace: One of :data:`GENE_INDEX_NAMESPACES`.
+        :return: The identifiers, with the index of ``entrez_ids``. Identifiers that are not found are missing.
+        """
+        return entrez_ids.astype(str).map(self.get_reverse_mapping(namespace))
+
+    def get_symbols(self, entrez_ids: pd.Series) -> pd.Series:
+        """Get the HGNC symbols of Entrez identifiers.
+
+        :param entrez_ids: Entrez identifiers as strings.
+        :return: The symbols, with the index of ``entrez_ids``. Identifiers without a symbol are missing.
+        """
+        return self.from_entrez(entrez_ids, 'symbol')
+
+    def map(self, identifiers: pd.Series, source: str, target: str) -> pd.Series:  # noqa: A003
+        """Map identifiers from one namespace to another, through their Entrez identifiers.
+
+        :param identifiers: Identifiers of the source namespace as strings.
+        :param source: :data:`ENTREZ_NAMESPACE` or one of :data:`GENE_INDEX_NAMESPACES`.
+        :param target: :data:`ENTREZ_NAMESPACE` or one of :data:`GENE_INDEX_NAMESPACES`.
+        :return: The identifiers of the target namespace, with the index of ``identifiers``. Identifiers that are not
+         found are missing.
+        """
+        entrez_ids = identifiers.astype(str)
+        if source != ENTREZ_NAMESPACE:
+            entrez_ids = entrez_ids.map(self.get_mapping(source))
+        if target == ENTREZ_NAMESPACE:
+            return entrez_ids
+        return entrez_ids.map(self.get_reverse_mapping(target))
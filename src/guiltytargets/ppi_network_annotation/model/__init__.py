@@ -5,5 +5,7 @@
 from .attribute_network import AttributeNetwork  # noqa: F401
 from .filtered_network import FilteredNetwork  # noqa: F401
 from .gene import Gene  # noqa: F401
+from .gene_table import GeneTable  # noqa: F401
 from .labeled_network import LabeledNetwork  # noqa: F401
 from .network import Network  # noqa: F401
+from .subgraph import SubgraphView  # noqa: F401
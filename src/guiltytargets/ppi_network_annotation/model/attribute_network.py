@@ -4,6 +4,9 @@
 
 import logging
 from collections import defaultdict
+from typing import Tuple
+
+import numpy as np
 
 from .network import Network
 
@@ -35,6 +38,17 @@ class AttributeNetwork:
             for k, v in att_mappings.items():
                 print("{} {}".format(k, " ".join(str(e) for e in v)), file=file)
 
+    def get_attribute_edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the edges of the bipartite attribute graph.
+
+        :return: A 2-tuple of the vertex indices and the enumerated attributes they are connected to.
+        """
+        sources, targets = [], []
+        for vertex, attributes in self.get_attribute_mappings().items():
+            sources.extend([vertex] * len(attributes))
+            targets.extend(attributes)
+        return np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+
     def get_attribute_mappings(self):
         """Get a dictionary of mappings between vertices and enumerated attributes.
 
@@ -6,8 +6,12 @@ import logging
 
 import numpy as np
 from igraph import Graph
+from joblib import Parallel, delayed, effective_n_jobs
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 
 from .network import Network
+from .subgraph import SubgraphView
 
 __all__ = [
     'FilteredNetwork',
@@ -26,21 +30,27 @@ class FilteredNetwork:
         """
         self.graph = network.graph
 
+    def get_upregulated_genes_view(self) -> SubgraphView:
+        """Get a view of the graph of up-regulated genes, without building it.
+
+        :return: A view of the graph of up-regulated genes.
+        """
+        return SubgraphView(self.graph, self.graph.vs.select(up_regulated_ne=False).indices, drop_isolated=True)
+
     def get_upregulated_genes_network(self) -> Graph:
         """Get the graph of up-regulated genes.
 
         :return Graph: Graph of up-regulated genes.
         """
         logger.info("In get_upregulated_genes_network()")
+        return self.get_upregulated_genes_view().to_graph()
 
-        deg_graph = self.graph.copy()  # deep copy graph
-        not_diff_expr = self.graph.vs(up_regulated_eq=False)
+    def get_downregulated_genes_view(self) -> SubgraphView:
+        """Get a view of the graph of down-regulated genes, without building it.
 
-        # delete genes which are not differentially expressed or have no connections to others
-        deg_graph.delete_vertices(not_diff_expr.indices)
-        deg_graph.delete_vertices(deg_graph.vs.select(_degree_eq=0))
-
-        return deg_graph
+        :return: A view of the graph of down-regulated genes.
+        """
+        return SubgraphView(self.graph, self.graph.vs.select(down_regulated_ne=False).indices, drop_isolated=True)
 
     def get_downregulated_genes_network(self) -> Graph:
         """Get the graph of down-regulated genes.
@@ -48,25 +58,23 @@ class FilteredNetwork:
         :return Graph: Graph of down-regulated genes.
         """
         logger.info("In get_downregulated_genes_network()")
-
-        deg_graph = self.graph.copy()  # deep copy graph
-        not_diff_expr = self.graph.vs(down_regulated_eq=False)
-
-        # delete genes which are not differentially expressed or have no connections to others
-        deg_graph.delete_vertices(not_diff_expr.indices)
-        deg_graph.delete_vertices(deg_graph.vs.select(_degree_eq=0))
-
-        return deg_graph
+        return self.get_downregulated_genes_view().to_graph()
 
     def get_shortest_paths_graph(
         self,
         genes_to_keep: list = None,
         keep_isolated_nodes: bool = False,
+        n_jobs: int = 1,
     ):
         """Get the shortest paths graph between differentially expressed + special genes.
 
+        The edges are marked from the shortest path tree of one Dijkstra search per relevant gene. Every pair of
+        relevant genes is only considered once, from the gene with the lowest index. If several paths between a pair
+        are equally short, the one that is kept may differ from the one of :meth:`igraph.Graph.get_shortest_paths`.
+
         :genes_to_keep list: A list of special genes.
         :keep_isolated_nodes bool: Removes the vertices with no neighbors when False.
+        :n_jobs int: The number of processes that run the searches. -1 uses all processors.
         :return Graph: The shortest paths graph between special genes.
         """
         logger.info("In get_shortest_paths_graph()")
@@ -81,24 +89,90 @@ class FilteredNetwork:
             genes_to_keep_ind = self.graph.vs.select(name_in=genes_to_keep).indices
             relevant_gene_ind = set(relevant_gene_ind).union(set(genes_to_keep_ind))
 
-        # Calculate the shortest paths between relevant genes and save the edges
-        # that reside in shortest paths to a set
-        shortest_path_edges = set()
-        for ind in relevant_gene_ind:
-            shortest_paths = sp_graph.get_shortest_paths(
-                ind,
-                to=relevant_gene_ind,
-                weights='weight',
-            )
-            for path in shortest_paths:
-                for i in range(len(path) - 1):
-                    eid = sp_graph.get_eid(path[i], path[i + 1])
-                    shortest_path_edges.add(eid)
+        # Calculate the shortest paths between relevant genes and keep the edges
+        # that reside in shortest paths
+        shortest_path_edges = _get_shortest_path_edges(
+            sp_graph,
+            np.array(sorted(relevant_gene_ind), dtype=np.int64),
+            n_jobs=n_jobs,
+        )
 
         # get and remove irrelevant edges
-        irrelevant_edges = set(sp_graph.es.indices) - shortest_path_edges
-        sp_graph.delete_edges(irrelevant_edges)
+        irrelevant_edges = np.setdiff1d(np.arange(sp_graph.ecount()), shortest_path_edges)
+        sp_graph.delete_edges(irrelevant_edges.tolist())
         if not keep_isolated_nodes:
             sp_graph.delete_vertices(sp_graph.vs.select(_degree_eq=0))
 
         return sp_graph
+
+
+def _get_shortest_path_edges(graph: Graph, sources: np.ndarray, n_jobs: int = 1) -> np.ndarray:
+    """Get the edges on the shortest paths between all pairs of the given vertices.
+
+    :param graph: An undirected graph with non-negative edge weights in the weight attribute.
+    :param sources: The sorted indices of the vertices.
+    :param n_jobs: The number of processes that run the searches.
+    :return: The identifiers of the edges on the shortest paths.
+    """
+    num_vertices = graph.vcount()
+    edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    weights = np.asarray(graph.es['weight'], dtype=np.float64)
+
+    # keep the lightest edge between every pair of distinct vertices, which is the one a shortest path uses
+    low, high = edges.min(axis=1), edges.max(axis=1)
+    keys = low * num_vertices + high
+    order = np.lexsort((np.arange(len(keys)), weights, keys))
+    order = order[low[order] != high[order]]
+    pair_keys, first = np.unique(keys[order], return_index=True)
+    pair_edges = order[first]
+
+    rows, columns = pair_keys // num_vertices, pair_keys % num_vertices
+    matrix = csr_matrix(
+        (np.tile(weights[pair_edges], 2), (np.concatenate([rows, columns]), np.concatenate([columns, rows]))),
+        shape=(num_vertices, num_vertices),
+    )
+
+    # the last source has no pairs left, since every pair is searched from its first vertex
+    batches = np.array_split(np.arange(len(sources) - 1), max(1, 4 * effective_n_jobs(n_jobs)))
+    marked_keys = Parallel(n_jobs=n_jobs)(
+        delayed(_get_shortest_path_keys)(matrix, sources, batch[0], batch[-1] + 1)
+        for batch in batches
+        if len(batch)
+    )
+    if not marked_keys:
+        return np.empty(0, dtype=np.int64)
+
+    return pair_edges[np.searchsorted(pair_keys, np.unique(np.concatenate(marked_keys)))]
+
+
+def _get_shortest_path_keys(matrix: csr_matrix, sources: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Get the vertex pairs of the edges on the shortest paths from some of the sources to the following sources.
+
+    :param matrix: The symmetric weighted adjacency matrix.
+    :param sources: The sorted indices of all sources.
+    :param start: The position of the first source of the batch.
+    :param stop: The position after the last source of the batch.
+    :return: The keys ``low * number of vertices + high`` of the vertex pairs of the edges.
+    """
+    num_vertices = matrix.shape[0]
+    _, predecessors = dijkstra(matrix, directed=True, indices=sources[start:stop], return_predecessors=True)
+
+    keys = []
+    for position, predecessor in enumerate(predecessors, start=start):
+        source = sources[position]
+        visited = np.zeros(num_vertices, dtype=bool)
+
+        # walk up the shortest path tree from the reachable targets until the source
+        frontier = sources[position + 1:]
+        frontier = frontier[predecessor[frontier] >= 0]
+        visited[frontier] = True
+        while len(frontier):
+            parents = predecessor[frontier]
+            keys.append(np.minimum(parents, frontier) * num_vertices + np.maximum(parents, frontier))
+            parents = np.unique(parents)
+            frontier = parents[(parents != source) & ~visited[parents]]
+            visited[frontier] = True
+
+    if not keys:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(keys)
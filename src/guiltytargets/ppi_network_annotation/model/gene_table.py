@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the class GeneTable."""
+
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .gene import Gene
+
+__all__ = [
+    'GeneTable',
+]
+
+
+class GeneTable:
+    """Encapsulate genes and their attributes as columns.
+
+    The table behaves like a read-only list of :class:`Gene` objects for older callers, but the objects are only
+    built the first time they are accessed.
+    """
+
+    #: The columns of the table, named after the fields of :class:`Gene`
+    columns = ['entrez_id', 'log2_fold_change', 'padj', 'symbol']
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        """Initialize the table.
+
+        :param df: A data frame with the columns in :data:`GeneTable.columns`. The symbol column is optional.
+        """
+        if 'symbol' not in df.columns:
+            df = df.assign(symbol='')
+
+        self.df = pd.DataFrame({
+            'entrez_id': df['entrez_id'].astype(str).to_numpy(dtype=object),
+            'log2_fold_change': df['log2_fold_change'].to_numpy(dtype=np.float64),
+            'padj': df['padj'].to_numpy(dtype=np.float64),
+            'symbol': df['symbol'].fillna('').astype(str).to_numpy(dtype=object),
+        })
+        self._genes: Optional[List[Gene]] = None
+
+    @classmethod
+    def from_genes(cls, genes: Iterable[Gene]) -> 'GeneTable':
+        """Build a table from Gene objects.
+
+        :param genes: An iterable of Gene objects.
+        :return: A table with one row per gene.
+        """
+        if isinstance(genes, GeneTable):
+            return genes
+
+        genes = list(genes)
+        return cls(pd.DataFrame(
+            [
+                (gene.entrez_id, gene.log2_fold_change, gene.padj, gene.symbol)
+                for gene in genes
+            ],
+            columns=cls.columns,
+        ))
+
+    @property
+    def entrez_ids(self) -> np.ndarray:
+        """Get the Entrez Gene identifiers."""
+        return self.df['entrez_id'].to_numpy()
+
+    @property
+    def log2_fold_changes(self) -> np.ndarray:
+        """Get the log2 fold changes."""
+        return self.df['log2_fold_change'].to_numpy()
+
+    @property
+    def padjs(self) -> np.ndarray:
+        """Get the adjusted p-values."""
+        return self.df['padj'].to_numpy()
+
+    @property
+    def symbols(self) -> np.ndarray:
+        """Get the gene symbols."""
+        return self.df['symbol'].to_numpy()
+
+    @property
+    def genes(self) -> List[Gene]:
+        """Get the rows as Gene objects, building them on first access."""
+        if self._genes is None:
+            self._genes = [
+                Gene(
+                    entrez_id=entrez_id,
+                    log2_fold_change=log2_fold_change,
+                    padj=padj,
+                    symbol=symbol,
+                )
+                for entrez_id, log2_fold_change, padj, symbol in zip(
+                    self.entrez_ids,
+                    self.log2_fold_changes.tolist(),
+                    self.padjs.tolist(),
+                    self.symbols,
+                )
+            ]
+        return self._genes
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.df)
+
+    def __iter__(self) -> Iterator[Gene]:  # noqa: D105
+        return iter(self.genes)
+
+    def __getitem__(self, item):  # noqa: D105
+        return self.genes[item]
+
+    def __repr__(self) -> str:  # noqa: D105
+        return f'GeneTable({len(self)} genes)'
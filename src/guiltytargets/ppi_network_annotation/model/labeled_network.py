@@ -4,6 +4,8 @@
 
 import logging
 
+import numpy as np
+
 from .network import Network
 
 __all__ = [
@@ -46,3 +48,13 @@ class LabeledNetwork:
         label_mappings = {i: 1 for i in target_ind}
         label_mappings.update({i: 0 for i in rest_ind})
         return label_mappings
+
+    def get_index_label_array(self, targets) -> np.ndarray:
+        """Get the labels(known target/not) in vertex order.
+
+        :param targets: List of known targets
+        :return: Array with 1 for known targets and 0 for the rest
+        """
+        labels = np.zeros(len(self.graph.vs), dtype=np.int64)
+        labels[self.graph.vs.select(name_in=targets).indices] = 1
+        return labels
@@ -3,11 +3,15 @@
 """This module contains the class NeighborhoodNetwork."""
 
 import logging
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 
+import numpy as np
+import pandas as pd
 from igraph import Graph, Vertex
+from scipy.sparse import csr_matrix
 
 from .network import Network
+from .subgraph import SubgraphView
 
 __all__ = [
     'NeighborhoodNetwork',
@@ -15,6 +19,9 @@ __all__ = [
 
 logger = logging.getLogger(__name__)
 
+#: The measures of the overlap of two neighborhoods
+OVERLAP_METRICS = ('count', 'jaccard')
+
 
 class NeighborhoodNetwork:
     """Mimic encapsulation of a neighborhood network."""
@@ -24,7 +31,18 @@ class NeighborhoodNetwork:
 
         :param network: A PPI network
         """
+        self.network = network
         self.graph = network.graph
+        self._adjacency_matrix: Optional[csr_matrix] = None
+
+    def get_neighborhood_view(self, node_name: str, order: int = 1) -> SubgraphView:
+        """Get a view of the neighborhood graph of a node, without building it.
+
+        :param node_name: Node whose neighborhood graph is requested.
+        :return: A view of the neighborhood graph.
+        """
+        node = self.graph.vs.find(name=node_name)
+        return SubgraphView(self.graph, self.graph.neighborhood(node, order=order))
 
     def get_neighborhood_network(self, node_name: str, order: int = 1) -> Graph:
         """Get the neighborhood graph of a node.
@@ -33,10 +51,7 @@ class NeighborhoodNetwork:
         :return Graph: Neighborhood graph
         """
         logger.info("In get_neighborhood_graph()")
-        neighbors = list(self.get_neighbor_names(node_name, order))
-        neighbor_network = self.graph.copy()
-        neighbor_network.delete_vertices(self.graph.vs.select(name_notin=neighbors))
-        return neighbor_network
+        return self.get_neighborhood_view(node_name, order).to_graph()
 
     def get_neighbor_names(self, node_name: str, order: int = 1) -> list:
         """Get the names of all neighbors of a node, and the node itself.
@@ -51,6 +66,101 @@ class NeighborhoodNetwork:
         names.append(node_name)
         return list(names)
 
+    def get_neighborhood_matrix(self, node_names: Iterable[str], order: int = 1) -> csr_matrix:
+        """Get the neighborhoods of many nodes at once.
+
+        The neighborhoods are found with a breadth-first search from all nodes at the same time, as products of a
+        sparse matrix of the current frontiers with the adjacency matrix of the graph.
+
+        :param node_names: Nodes whose neighborhoods are requested.
+        :param order: The maximum distance of the neighbors from a node.
+        :return: A sparse boolean matrix with one row per node and one column per vertex of the graph, which is True
+         for the vertices in the neighborhood of the node, including the node itself.
+        """
+        indices = self._get_indices(node_names)
+        adjacency_matrix = self.get_adjacency_matrix()
+
+        neighborhoods = csr_matrix(
+            (np.ones(len(indices), dtype=bool), (np.arange(len(indices)), indices)),
+            shape=(len(indices), adjacency_matrix.shape[0]),
+        )
+        for _ in range(order):
+            neighborhoods = neighborhoods + neighborhoods @ adjacency_matrix
+        neighborhoods.sort_indices()
+        return neighborhoods
+
+    def get_neighborhood_views(self, node_names: Iterable[str], order: int = 1) -> Dict[str, SubgraphView]:
+        """Get views of the neighborhood graphs of many nodes at once, without building them.
+
+        :param node_names: Nodes whose neighborhood graphs are requested.
+        :param order: The maximum distance of the neighbors from a node.
+        :return: A dictionary from node names to views of their neighborhood graphs.
+        """
+        node_names = list(node_names)
+        neighborhoods = self.get_neighborhood_matrix(node_names, order)
+        return {
+            node_name: SubgraphView(self.graph, neighborhoods.indices[neighborhoods.indptr[i]:neighborhoods.indptr[i + 1]])
+            for i, node_name in enumerate(node_names)
+        }
+
+    def get_neighborhood_networks(self, node_names: Iterable[str], order: int = 1) -> Dict[str, Graph]:
+        """Get the neighborhood graphs of many nodes at once.
+
+        :param node_names: Nodes whose neighborhood graphs are requested.
+        :param order: The maximum distance of the neighbors from a node.
+        :return: A dictionary from node names to their neighborhood graphs.
+        """
+        return {
+            node_name: view.to_graph()
+            for node_name, view in self.get_neighborhood_views(node_names, order).items()
+        }
+
+    def get_neighbor_names_of_nodes(self, node_names: Iterable[str], order: int = 1) -> Dict[str, List[str]]:
+        """Get the names of all neighbors of many nodes at once, and the nodes themselves.
+
+        :param node_names: Nodes whose neighbor names are requested.
+        :param order: The maximum distance of the neighbors from a node.
+        :return: A dictionary from node names to the names of the vertices in their neighborhood, in vertex order.
+        """
+        node_names = list(node_names)
+        neighborhoods = self.get_neighborhood_matrix(node_names, order)
+        names = self.network.get_attribute_array('name')
+        return {
+            node_name: names[neighborhoods.indices[neighborhoods.indptr[i]:neighborhoods.indptr[i + 1]]].tolist()
+            for i, node_name in enumerate(node_names)
+        }
+
+    def get_adjacency_matrix(self) -> csr_matrix:
+        """Get the boolean adjacency matrix of the graph, without self-loops.
+
+        The matrix is built once and reused, so it does not reflect later changes to the graph.
+
+        :return: A symmetric sparse boolean matrix.
+        """
+        if self._adjacency_matrix is None:
+            num_vertices = self.graph.vcount()
+            edges = np.array(self.graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+            edges = edges[edges[:, 0] != edges[:, 1]]
+            adjacency_matrix = csr_matrix(
+                (
+                    np.ones(2 * len(edges), dtype=bool),
+                    (np.concatenate([edges[:, 0], edges[:, 1]]), np.concatenate([edges[:, 1], edges[:, 0]])),
+                ),
+                shape=(num_vertices, num_vertices),
+            )
+            adjacency_matrix.sum_duplicates()
+            self._adjacency_matrix = adjacency_matrix
+        return self._adjacency_matrix
+
+    def _get_indices(self, node_names: Iterable[str]) -> np.ndarray:
+        """Get the indices of nodes, and fail if any of them is not in the graph."""
+        node_names = list(node_names)
+        indices = self.network.get_vertex_indices(node_names)
+        if (indices < 0).any():
+            missing = [name for name, index in zip(node_names, indices) if index < 0]
+            raise ValueError(f'Nodes not in the graph: {", ".join(missing)}')
+        return indices
+
     def get_neighborhood_overlap(self, node1: Vertex, node2: Vertex, connection_type: Optional[str] = None):
         """Get the intersection of two nodes's neighborhoods.
 
@@ -60,13 +170,58 @@ class NeighborhoodNetwork:
         :param connection_type: One of direct or second-degree. Defaults to direct.
         :return: Overlap of the nodes' neighborhoods.
         """
-        if connection_type is None or connection_type == "direct":
-            order = 1
-        elif connection_type == "second-degree":
-            order = 2
-        else:
-            raise Exception(f"Invalid option: {connection_type}. Valid options are direct and second-degree")
-
+        order = _get_order(connection_type)
         neighbors1 = self.graph.neighborhood(node1, order=order)
         neighbors2 = self.graph.neighborhood(node2, order=order)
         return set(neighbors1).intersection(neighbors2)
+
+    def get_neighborhood_overlaps(
+        self,
+        row_names: Iterable[str],
+        column_names: Iterable[str],
+        connection_type: Optional[str] = None,
+        metric: str = 'count',
+        block_size: int = 1000,
+    ) -> pd.DataFrame:
+        """Get the overlaps of the neighborhoods of all pairs of row and column nodes.
+
+        The overlaps are the products of the sparse neighborhood matrices of the row and column nodes, which are
+        computed for blocks of rows at a time so that only the dense result has to fit in memory.
+
+        :param row_names: The nodes of the rows, for example the known targets.
+        :param column_names: The nodes of the columns, for example the candidates.
+        :param connection_type: One of direct or second-degree. Defaults to direct.
+        :param metric: Either count, the size of the intersection of the neighborhoods, or jaccard, the size of the
+         intersection divided by the size of the union.
+        :param block_size: The number of rows computed at once.
+        :return: A data frame of the overlaps, with the row nodes as index and the column nodes as columns.
+        """
+        if metric not in OVERLAP_METRICS:
+            raise ValueError(f'Invalid metric: {metric}. Valid metrics are {", ".join(OVERLAP_METRICS)}')
+
+        order = _get_order(connection_type)
+        row_names, column_names = list(row_names), list(column_names)
+        rows = self.get_neighborhood_matrix(row_names, order).astype(np.int64)
+        columns = self.get_neighborhood_matrix(column_names, order).astype(np.int64).T.tocsc()
+
+        overlaps = np.empty((len(row_names), len(column_names)), dtype=np.float64 if metric == 'jaccard' else np.int64)
+        row_sizes = np.diff(rows.indptr)
+        column_sizes = np.diff(columns.indptr)
+        for start in range(0, len(row_names), block_size):
+            stop = start + block_size
+            counts = (rows[start:stop] @ columns).toarray()
+            if metric == 'jaccard':
+                # every neighborhood contains its node, so the union is never empty
+                counts = counts / (row_sizes[start:stop, np.newaxis] + column_sizes[np.newaxis, :] - counts)
+            overlaps[start:stop] = counts
+
+        return pd.DataFrame(overlaps, index=row_names, columns=column_names)
+
+
+def _get_order(connection_type: Optional[str]) -> int:
+    """Get the maximum distance of the neighbors for a type of connection."""
+    if connection_type is None or connection_type == "direct":
+        return 1
+    if connection_type == "second-degree":
+        return 2
+    raise Exception(f"Invalid option: {connection_type}. Valid options are direct and second-degree")
@@ -3,12 +3,17 @@
 """This module contains the class Network."""
 
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
-from igraph import Graph, Vertex, VertexSeq
+import pandas as pd
+from igraph import Graph, VertexSeq
 
 from .gene import Gene
+from .gene_table import GeneTable
+from ..array_io import read_arrays, write_arrays
+from ..attribute_io import decode_attribute, encode_attribute
+from ..csr import CSRGraph
 
 __all__ = [
     'Network',
@@ -16,6 +21,12 @@ __all__ = [
 
 logger = logging.getLogger(__name__)
 
+#: Format of the files written by :meth:`Network.save`
+NETWORK_FILE_FORMAT = 'guiltytargets.network'
+
+#: Version of the files written by :meth:`Network.save`
+NETWORK_FILE_VERSION = 1
+
 
 class Network:
     """Encapsulate a PPI network with differential gene expression and disease association annotation."""
@@ -26,6 +37,7 @@ class Network:
         max_adj_p: Optional[float] = None,
         max_l2fc: Optional[float] = None,
         min_l2fc: Optional[float] = None,
+        copy: bool = True,
     ) -> None:
         """Initialize the network object.
 
@@ -33,17 +45,21 @@ class Network:
         :param max_adj_p: Maximum value for adjusted p-value, used for calculating differential expression
         :param max_l2fc: Maximum value for log2 fold change, used for calculating down regulation
         :param min_l2fc: Minimum value for log2 fold change, used for calculating up regulation
+        :param copy: Annotates a copy of the graph if True. Otherwise the network takes ownership of the graph and
+         annotates it in place, which saves a copy when the caller does not use the graph anymore.
         """
         logger.info("Initializing Network")
 
         self.max_adj_p = max_adj_p or 0.05
         self.max_l2fc = max_l2fc or -1.0
         self.min_l2fc = min_l2fc or +1.0
-        self.graph = ppi_graph.copy()  # create deep copy of the graph
+        self.graph = ppi_graph.copy() if copy else ppi_graph
+        self._vertex_index: Optional[pd.Series] = None
+        self._attribute_arrays: Dict[str, np.ndarray] = {}
 
     def set_up_network(
         self,
-        genes: List[Gene],
+        genes: Union[GeneTable, List[Gene]],
         gene_filter: bool = False,
         disease_associations: Optional[Dict] = None,
     ) -> None:
@@ -51,12 +67,13 @@ class Network:
 
          Filter genes out if requested and add attributes to the vertices.
 
-        :param genes: A list of Gene objects.
+        :param genes: A table or a list of Gene objects.
         :param gene_filter: Removes all genes that are not in list <genes> if True.
         :param disease_associations: Diseases associated with genes.
         """
+        genes = GeneTable.from_genes(genes)
         if gene_filter:
-            self.filter_genes([gene.entrez_id for gene in genes])
+            self.filter_genes(genes.entrez_ids.tolist())
         self._add_vertex_attributes(genes, disease_associations)
         self.print_summary("Graph of all genes")
 
@@ -68,74 +85,147 @@ class Network:
         logger.info("In filter_genes()")
         irrelevant_genes = self.graph.vs.select(name_notin=relevant_entrez)
         self.graph.delete_vertices(irrelevant_genes)
+        self._vertex_index = None
+        self._attribute_arrays.clear()
+
+    def get_vertex_indices(self, names: Iterable[str]) -> np.ndarray:
+        """Get the indices of the vertices with the given names.
+
+        The mapping from names to indices is built once and reused until the vertices change.
+
+        :param names: Names of the vertices.
+        :return: The index of the first vertex with each name, or -1 if there is no such vertex.
+        """
+        if self._vertex_index is None:
+            vertex_names = pd.Index(self.graph.vs['name'])
+            self._vertex_index = pd.Series(
+                np.arange(len(vertex_names)),
+                index=vertex_names,
+            )[~vertex_names.duplicated()]
+
+        indexer = self._vertex_index.index.get_indexer(pd.Index(list(names)))
+        return np.where(indexer >= 0, self._vertex_index.to_numpy()[indexer], -1)
 
     def _add_vertex_attributes(
         self,
-        genes: List[Gene],
+        genes: GeneTable,
         disease_associations: Optional[dict] = None,
     ) -> None:
         """Add attributes to vertices.
 
-        :param genes: A list of genes containing attribute information.
+        :param genes: A table of genes containing attribute information.
         """
         self._set_default_vertex_attributes()
         self._add_vertex_attributes_by_genes(genes)
 
-        # compute up-regulated and down-regulated genes
-        up_regulated = self.get_upregulated_genes()
-        down_regulated = self.get_downregulated_genes()
-
-        # set the attributes for up-regulated and down-regulated genes
-        self.graph.vs(up_regulated.indices)["diff_expressed"] = True
-        self.graph.vs(up_regulated.indices)["up_regulated"] = True
-        self.graph.vs(down_regulated.indices)["diff_expressed"] = True
-        self.graph.vs(down_regulated.indices)["down_regulated"] = True
+        # compute and set the attributes for up-regulated and down-regulated genes
+        self.update_differential_expression()
 
         # add disease associations
         self._add_disease_associations(disease_associations)
-
-        logger.info("Number of all differentially expressed genes is: {}".
-                    format(len(up_regulated) + len(down_regulated)))
+        self._attribute_arrays.clear()
 
     def _set_default_vertex_attributes(self) -> None:
         """Assign default values on attributes to all vertices."""
-        self.graph.vs["l2fc"] = 0
+        self.graph.vs["l2fc"] = 0.0
         self.graph.vs["padj"] = 0.5
         self.graph.vs["symbol"] = self.graph.vs["name"]
         self.graph.vs["diff_expressed"] = False
         self.graph.vs["up_regulated"] = False
         self.graph.vs["down_regulated"] = False
 
-    def _add_vertex_attributes_by_genes(self, genes: List[Gene]) -> None:
+    def _add_vertex_attributes_by_genes(self, genes: GeneTable) -> None:
         """Assign values to attributes on vertices.
 
-        :param genes: A list of Gene objects from which values will be extracted.
+        The genes are aligned to the vertices in one join and every attribute is assigned as a whole list.
+        If several genes have the same identifier, the last one wins.
+
+        :param genes: A table of genes from which values will be extracted.
         """
-        for gene in genes:
-            try:
-                vertex = self.graph.vs.find(name=str(gene.entrez_id)).index
-                self.graph.vs[vertex]['l2fc'] = gene.log2_fold_change
-                self.graph.vs[vertex]['symbol'] = gene.symbol
-                self.graph.vs[vertex]['padj'] = gene.padj
-            except ValueError:
-                pass
+        df = genes.df.drop_duplicates('entrez_id', keep='last')
+        indices = self.get_vertex_indices(df['entrez_id'])
+        found = indices >= 0
+        indices = indices[found]
+
+        for attribute_name, column in (('l2fc', 'log2_fold_change'), ('symbol', 'symbol'), ('padj', 'padj')):
+            values = np.array(self.graph.vs[attribute_name], dtype=object)
+            # Python scalars rather than numpy scalars, which is what the graph holds after a round trip to a file
+            values[indices] = df[column].to_numpy()[found].tolist()
+            self.graph.vs[attribute_name] = values.tolist()
 
     def _add_disease_associations(self, disease_associations: dict) -> None:
         """Add disease association annotation to the network.
 
+        The targets are mapped to vertices through the name index and the attribute is assigned as a whole list.
+
         :param disease_associations: Dictionary of disease-gene associations.
         """
-        if disease_associations is not None:
-            for target_id, disease_id_list in disease_associations.items():
-                if target_id in self.graph.vs["name"]:
-                    self.graph.vs.find(name=target_id)["associated_diseases"] = disease_id_list
+        if not disease_associations:
+            return
+
+        target_ids = list(disease_associations)
+        indices = self.get_vertex_indices(target_ids)
+        found = np.flatnonzero(indices >= 0)
+        if len(found) == 0:
+            return
+
+        if "associated_diseases" in self.graph.vs.attributes():
+            associated_diseases = self.graph.vs["associated_diseases"]
+        else:
+            associated_diseases = [None] * len(self.graph.vs)
+
+        for i in found:
+            associated_diseases[indices[i]] = disease_associations[target_ids[i]]
+        self.graph.vs["associated_diseases"] = associated_diseases
+
+    def update_differential_expression(
+        self,
+        max_adj_p: Optional[float] = None,
+        max_l2fc: Optional[float] = None,
+        min_l2fc: Optional[float] = None,
+    ) -> None:
+        """Classify the vertices as up-regulated, down-regulated or differentially expressed.
+
+        The thresholds are applied to all vertices in one vectorized pass, so this is cheap enough to be called
+        repeatedly with different thresholds on the same network.
+
+        :param max_adj_p: New maximum value for adjusted p-value. Keeps the current value if None.
+        :param max_l2fc: New maximum value for log2 fold change. Keeps the current value if None.
+        :param min_l2fc: New minimum value for log2 fold change. Keeps the current value if None.
+        """
+        if max_adj_p is not None:
+            self.max_adj_p = max_adj_p
+        if max_l2fc is not None:
+            self.max_l2fc = max_l2fc
+        if min_l2fc is not None:
+            self.min_l2fc = min_l2fc
+
+        up_regulated, down_regulated = self._get_regulation_masks()
+        self.graph.vs["diff_expressed"] = (up_regulated | down_regulated).tolist()
+        self.graph.vs["up_regulated"] = up_regulated.tolist()
+        self.graph.vs["down_regulated"] = down_regulated.tolist()
+        self._attribute_arrays.clear()
+
+        logger.info("Number of all differentially expressed genes is: {}".
+                    format(up_regulated.sum() + down_regulated.sum()))
+
+    def _get_regulation_masks(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get boolean masks of the up-regulated and down-regulated vertices.
+
+        :return: A 2-tuple of the masks of up-regulated and down-regulated vertices.
+        """
+        padj = np.asarray(self.graph.vs['padj'], dtype=np.float64)
+        l2fc = np.asarray(self.graph.vs['l2fc'], dtype=np.float64)
+        significant = padj < self.max_adj_p
+        return significant & (l2fc > self.min_l2fc), significant & (l2fc < self.max_l2fc)
 
     def get_upregulated_genes(self) -> VertexSeq:
         """Get genes that are up-regulated.
 
         :return: Up-regulated genes.
         """
-        up_regulated = self.graph.vs.select(self._is_upregulated_gene)
+        up_regulated, _ = self._get_regulation_masks()
+        up_regulated = self.graph.vs(np.flatnonzero(up_regulated).tolist())
         logger.info(f"No. of up-regulated genes after laying on network: {len(up_regulated)}")
         return up_regulated
 
@@ -144,19 +234,11 @@ class Network:
 
         :return: Down-regulated genes.
         """
-        down_regulated = self.graph.vs.select(self._is_downregulated_gene)
+        _, down_regulated = self._get_regulation_masks()
+        down_regulated = self.graph.vs(np.flatnonzero(down_regulated).tolist())
         logger.info(f"No. of down-regulated genes after laying on network: {len(down_regulated)}")
         return down_regulated
 
-    def _is_significantly_differentiated(self, v: Vertex) -> bool:
-        return v.attributes()['padj'] < self.max_adj_p
-
-    def _is_upregulated_gene(self, v: Vertex) -> bool:
-        return self._is_significantly_differentiated(v) and v.attributes()['l2fc'] > self.min_l2fc
-
-    def _is_downregulated_gene(self, v: Vertex) -> bool:
-        return self._is_significantly_differentiated(v) and v.attributes()['l2fc'] < self.max_l2fc
-
     def print_summary(self, heading: str) -> None:
         """Print the summary of a graph.
 
@@ -198,6 +280,19 @@ class Network:
         """
         return self.graph.get_adjlist()
 
+    def get_attribute_array(self, attribute_name: str) -> np.ndarray:
+        """Get the values of an attribute of all vertices as an array, in vertex order.
+
+        The array is built once and reused until the vertices or their attributes are changed by this object, so it
+        must not be modified.
+
+        :param attribute_name: The name of the attribute.
+        :return: The attribute values.
+        """
+        if attribute_name not in self._attribute_arrays:
+            self._attribute_arrays[attribute_name] = np.array(self.graph.vs[attribute_name])
+        return self._attribute_arrays[attribute_name]
+
     def get_attribute_from_indices(self, indices: list, attribute_name: str):
         """Get attribute values for the requested indices.
 
@@ -205,4 +300,71 @@ class Network:
         :param attribute_name: The name of the attribute.
         :return: A list of attribute values for the requested indices.
         """
-        return list(np.array(self.graph.vs[attribute_name])[indices])
+        return list(self.get_attribute_array(attribute_name)[indices])
+
+    def save(self, path: str) -> None:
+        """Save the annotated network to a binary file.
+
+        The edges are stored in CSR form and every vertex and edge attribute as columns of numpy arrays, see
+        :mod:`guiltytargets.ppi_network_annotation.attribute_io`.
+
+        :param path: The path of the output file.
+        """
+        edges = np.array(self.graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+        arrays = CSRGraph.from_edges(self.graph.vs['name'], edges[:, 0], edges[:, 1]).get_arrays()
+        metadata = {
+            'format': NETWORK_FILE_FORMAT,
+            'version': NETWORK_FILE_VERSION,
+            'max_adj_p': self.max_adj_p,
+            'max_l2fc': self.max_l2fc,
+            'min_l2fc': self.min_l2fc,
+            'graph_attributes': {name: self.graph[name] for name in self.graph.attributes()},
+        }
+
+        for prefix, sequence in (('vertex', self.graph.vs), ('edge', self.graph.es)):
+            kinds = metadata[f'{prefix}_attributes'] = {}
+            for name in sequence.attributes():
+                if prefix == 'vertex' and name == 'name':
+                    continue
+                try:
+                    kinds[name], columns = encode_attribute(sequence[name])
+                except ValueError as e:
+                    raise ValueError(f'Can not save {prefix} attribute {name}: {e}') from e
+                for column, array in columns.items():
+                    arrays[f'{prefix}:{name}:{column}'] = array
+
+        write_arrays(path, arrays, metadata)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'Network':
+        """Load an annotated network from a binary file written by :meth:`save`.
+
+        :param path: The path of the input file.
+        :param mmap: If true, the arrays are memory-mapped instead of read into memory before building the graph.
+        :return: The network.
+        """
+        arrays, metadata = read_arrays(path, mmap=mmap)
+        if metadata.get('format') != NETWORK_FILE_FORMAT:
+            raise ValueError(f'Not a saved network: {path}')
+        if metadata['version'] != NETWORK_FILE_VERSION:
+            raise ValueError(f'Unsupported network file version {metadata["version"]}: {path}')
+
+        graph = CSRGraph.from_arrays(arrays).to_graph()
+        for name, value in metadata['graph_attributes'].items():
+            graph[name] = value
+        for prefix, sequence in (('vertex', graph.vs), ('edge', graph.es)):
+            for name, kind in metadata[f'{prefix}_attributes'].items():
+                columns = {
+                    key.rsplit(':', 1)[1]: array
+                    for key, array in arrays.items()
+                    if key.rsplit(':', 1)[0] == f'{prefix}:{name}'
+                }
+                sequence[name] = decode_attribute(kind, columns)
+
+        return cls(
+            graph,
+            max_adj_p=metadata['max_adj_p'],
+            max_l2fc=metadata['max_l2fc'],
+            min_l2fc=metadata['min_l2fc'],
+            copy=False,
+        )
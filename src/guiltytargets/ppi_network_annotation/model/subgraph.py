@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the class SubgraphView."""
+
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List
+
+import numpy as np
+from igraph import Graph
+
+__all__ = [
+    'SubgraphView',
+    'induced_subgraph',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def induced_subgraph(graph: Graph, vertices: Iterable[int], drop_isolated: bool = False) -> Graph:
+    """Build the subgraph induced by a set of vertices.
+
+    The subgraph is created from scratch by igraph, so the cost scales with the size of the subgraph rather than with
+    the size of the graph. The vertices keep their relative order, and the vertices and edges keep their attributes, as
+    if all other vertices had been deleted from a copy of the graph. Only the order of the edges may differ.
+
+    :param graph: The graph.
+    :param vertices: Indices of the vertices of the subgraph.
+    :param drop_isolated: Removes the vertices without edges in the subgraph if True.
+    :return: The induced subgraph.
+    """
+    vertices = np.unique(np.asarray(list(vertices), dtype=np.int64))
+    subgraph = graph.induced_subgraph(vertices.tolist(), implementation='create_from_scratch')
+
+    if drop_isolated:
+        subgraph.delete_vertices(subgraph.vs.select(_degree_eq=0))
+
+    return subgraph
+
+
+@dataclass
+class SubgraphView:
+    """Encapsulate a subgraph as the indices of its vertices in a graph, without building it."""
+
+    #: The graph the vertices belong to
+    graph: Graph
+
+    #: Indices of the vertices of the subgraph
+    vertices: np.ndarray
+
+    #: Removes the vertices without edges in the subgraph when it is built if True
+    drop_isolated: bool = False
+
+    def __post_init__(self) -> None:  # noqa: D105
+        self.vertices = np.unique(np.asarray(self.vertices, dtype=np.int64))
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.vertices)
+
+    @property
+    def names(self) -> List[str]:
+        """Get the names of the vertices, before removing the vertices without edges."""
+        return self.graph.vs[self.vertices.tolist()]['name']
+
+    def to_graph(self) -> Graph:
+        """Build the subgraph.
+
+        :return: The subgraph induced by the vertices.
+        """
+        return induced_subgraph(self.graph, self.vertices, drop_isolated=self.drop_isolated)
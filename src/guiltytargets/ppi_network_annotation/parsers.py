@@ -2,17 +2,32 @@
 
 """Parser methods to read the input files."""
 
+import functools
+import hashlib
+import io
 import logging
+import operator
 import os
-from collections import defaultdict
-from typing import List, Set
+from typing import List, Optional, Set
 
 import igraph
+import numpy as np
 import pandas as pd
 
-from .model.gene import Gene
+try:
+    import pyarrow.dataset as pyarrow_dataset
+except ImportError:  # pragma: no cover
+    pyarrow_dataset = None
+
+from .compression import get_compression, open_file
+from .csr import CSRGraph
+from .gene_index import GeneIndex
+from .model.gene_table import GeneTable
 
 __all__ = [
+    'get_ppi_graph_cache_key',
+    'COLUMNAR_FORMATS',
+    'parse_columnar',
     'parse_csv',
     'parse_disease_associations',
     'parse_disease_ids',
@@ -23,29 +38,200 @@ __all__ = [
 
 logger = logging.getLogger(__name__)
 
+#: File extension of compiled PPI graph caches
+PPI_GRAPH_CACHE_EXTENSION = '.gtgraph'
+
+#: Version of the compiled PPI graph cache, part of the cache key
+PPI_GRAPH_CACHE_VERSION = 1
+
+#: Default number of lines of a PPI edgelist that are read at once
+DEFAULT_PPI_CHUNK_SIZE = 100_000
+
+#: Columnar file formats of differential expression files, by file extension
+COLUMNAR_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+}
+
 
-def parse_ppi_graph(path: str, min_edge_weight: float = 0.0) -> igraph.Graph:
+def parse_ppi_graph(
+    path: str,
+    min_edge_weight: float = 0.0,
+    simplify: bool = False,
+    use_cache: bool = False,
+    chunk_size: int = DEFAULT_PPI_CHUNK_SIZE,
+) -> igraph.Graph:
     """Build an undirected graph of gene interactions from edgelist file.
 
-    :param path: The path to the edgelist file. This file has two columns, and is tab separated.
+    The edgelist is read in chunks, and only the edges with a weight of at least ``min_edge_weight`` are kept as
+    integer arrays, so the peak memory scales with the kept edges and the number of genes rather than with the size of
+    the file. The graph is the same as reading the whole edgelist with igraph and removing the edges and vertices
+    afterwards.
+
+    If ``use_cache`` is true, the parsed graph is compiled to a binary file next to the edgelist, keyed on the content
+    of the edgelist, ``min_edge_weight`` and ``simplify``. Later calls with the same key memory-map the compiled file
+    instead of parsing the text again.
+
+    :param path: The path to the edgelist file. This file has two columns, and is tab separated. It may be compressed
+     with gzip, bz2, xz or zstd, as detected from its extension.
     :param min_edge_weight: Cutoff to keep/remove the edges, default is 0, but could also be 0.63.
+    :param simplify: Removes self-loops and multiple edges if True.
+    :param use_cache: Reads and writes the compiled graph cache if True.
+    :param chunk_size: The number of lines of the edgelist that are read at once.
     :return: Protein-protein interaction graph
     """
     logger.info("In parse_ppi_graph()")
     path = os.path.expanduser(path)
+
+    cache_path = None
+    if use_cache:
+        cache_key = get_ppi_graph_cache_key(path, min_edge_weight, simplify)
+        cache_path = f'{path}.{cache_key[:16]}{PPI_GRAPH_CACHE_EXTENSION}'
+        graph = _read_ppi_graph_cache(cache_path, cache_key)
+        if graph is not None:
+            return graph
+
     try:
-        graph = igraph.read(path, format="ncol", directed=False, names=True)
+        graph = _read_ppi_graph(path, min_edge_weight, simplify=simplify, chunk_size=chunk_size)
     except Exception:
         logger.warning(f'Could not read {path}')
         raise
-    graph.delete_edges(graph.es.select(weight_lt=min_edge_weight))
-    graph.delete_vertices(graph.vs.select(_degree=0))
     logger.info(f"Loaded PPI network.\n"
                 f"Number of proteins: {len(graph.vs)}\n"
                 f"Number of interactions: {len(graph.es)}\n")
+
+    if cache_path is not None:
+        _write_ppi_graph_cache(cache_path, cache_key, graph)
+
+    return graph
+
+
+def _read_ppi_graph(path: str, min_edge_weight: float, simplify: bool, chunk_size: int) -> igraph.Graph:
+    """Read an edgelist in chunks, keeping only the edges with a weight of at least ``min_edge_weight``.
+
+    Gene names are interned in order of first appearance in the whole file, as :func:`igraph.read` does, and the
+    vertices without kept edges are removed afterwards. If ``simplify`` is true, self-loops and duplicate edges are
+    already dropped per chunk, but the vertices of kept self-loops are kept, as when simplifying afterwards.
+    """
+    vertex_ids = {}
+    sources, targets, weights, loop_vertices = [], [], [], []
+    has_weights = False
+
+    chunks = pd.read_csv(
+        path,
+        sep=r'\s+',
+        header=None,
+        names=['source', 'target', 'weight'],
+        compression=get_compression(path),
+        dtype={'source': str, 'target': str, 'weight': np.float64},
+        # Gene names such as NA are not missing values, but a missing weight column is
+        keep_default_na=False,
+        na_values={'weight': ['']},
+        chunksize=chunk_size,
+    )
+    for chunk in chunks:
+        endpoints = np.column_stack([chunk['source'].to_numpy(), chunk['target'].to_numpy()]).ravel()
+        codes, uniques = pd.factorize(endpoints)
+        chunk_ids = np.array(
+            [vertex_ids.setdefault(name, len(vertex_ids)) for name in uniques.tolist()],
+            dtype=np.int64,
+        )
+        edges = chunk_ids[codes].reshape(-1, 2)
+
+        chunk_weights = chunk['weight'].to_numpy()
+        if not np.isnan(chunk_weights).all():
+            has_weights = True
+            keep = chunk_weights >= min_edge_weight
+            edges, chunk_weights = edges[keep], chunk_weights[keep]
+
+        if simplify:
+            loops = edges[:, 0] == edges[:, 1]
+            loop_vertices.append(edges[loops, 0])
+            edges = np.unique(np.sort(edges[~loops], axis=1), axis=0)
+        else:
+            weights.append(chunk_weights)
+        sources.append(edges[:, 0])
+        targets.append(edges[:, 1])
+
+    sources = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int64)
+    targets = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+
+    # Drop the vertices without edges, keeping the order of the others. Self-loops count towards the degree.
+    names = np.array(list(vertex_ids), dtype=object)
+    del vertex_ids
+    kept_vertices = np.zeros(len(names), dtype=bool)
+    kept_vertices[sources] = True
+    kept_vertices[targets] = True
+    for vertices in loop_vertices:
+        kept_vertices[vertices] = True
+    new_ids = np.cumsum(kept_vertices) - 1
+    sources, targets = new_ids[sources], new_ids[targets]
+
+    if simplify:
+        # Duplicates can still span chunks
+        edges = np.unique(np.column_stack([sources, targets]), axis=0)
+        sources, targets, has_weights = edges[:, 0], edges[:, 1], False
+
+    graph = igraph.Graph(
+        n=int(kept_vertices.sum()),
+        edges=np.column_stack([sources, targets]).tolist(),
+        directed=False,
+    )
+    graph.vs['name'] = names[kept_vertices].tolist()
+    if has_weights:
+        graph.es['weight'] = np.concatenate(weights).tolist()
+
     return graph
 
 
+def get_ppi_graph_cache_key(path: str, min_edge_weight: float, simplify: bool) -> str:
+    """Get the key of the compiled cache of a PPI graph.
+
+    :param path: The path to the edgelist file.
+    :param min_edge_weight: Cutoff used to remove the edges.
+    :param simplify: Whether self-loops and multiple edges are removed.
+    :return: A hexadecimal digest of the file content and the parsing parameters.
+    """
+    content_hash = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            content_hash.update(block)
+
+    key = f'{PPI_GRAPH_CACHE_VERSION}:{content_hash.hexdigest()}:{min_edge_weight!r}:{simplify}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _read_ppi_graph_cache(cache_path: str, cache_key: str) -> Optional[igraph.Graph]:
+    """Read a compiled PPI graph, or return None if there is no valid cache."""
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        csr_graph, metadata = CSRGraph.load(cache_path)
+    except (OSError, ValueError):
+        logger.warning(f'Could not read PPI graph cache {cache_path}')
+        return None
+
+    if metadata.get('key') != cache_key:
+        logger.warning(f'Ignoring PPI graph cache with a different key: {cache_path}')
+        return None
+
+    logger.info(f'Loaded PPI network from {cache_path}')
+    return csr_graph.to_graph()
+
+
+def _write_ppi_graph_cache(cache_path: str, cache_key: str, graph: igraph.Graph) -> None:
+    """Write a compiled PPI graph, without failing if the directory is not writable."""
+    try:
+        CSRGraph.from_graph(graph).save(cache_path, metadata={'key': cache_key})
+    except OSError:
+        logger.warning(f'Could not write PPI graph cache {cache_path}')
+    else:
+        logger.info(f'Wrote PPI graph cache to {cache_path}')
+
+
 def parse_excel(
     file_path: str,
     entrez_id_header,
@@ -53,16 +239,23 @@ def parse_excel(
     adjusted_p_value_header,
     entrez_delimiter,
     base_mean_header=None,
-) -> List[Gene]:
-    """Read an excel file on differential expression values as Gene objects.
+    gene_index: Optional[GeneIndex] = None,
+) -> GeneTable:
+    """Read an excel file on differential expression values as a table of genes.
 
     :param file_path: The path to the differential expression file to be parsed.
     :param config.Params params: An object that includes paths, cutoffs and other information.
-    :return list: A list of Gene objects.
+    :param gene_index: An index to map the gene identifiers to Entrez identifiers and to add their symbols.
+    :return: A table of genes.
     """
     logger.info("In parse_excel()")
 
-    df = pd.read_excel(file_path)
+    if get_compression(file_path) is None:
+        df = pd.read_excel(file_path)
+    else:
+        # Excel files need random access, so the decompressed content is kept in memory
+        with open_file(file_path) as file:
+            df = pd.read_excel(io.BytesIO(file.read()))
 
     return _handle_dataframe(
         df,
@@ -71,6 +264,7 @@ def parse_excel(
         adjusted_p_value_name=adjusted_p_value_header,
         entrez_delimiter=entrez_delimiter,
         base_mean=base_mean_header,
+        gene_index=gene_index,
     )
 
 
@@ -82,16 +276,24 @@ def parse_csv(
     entrez_delimiter,
     base_mean_header=None,
     sep=",",
-) -> List[Gene]:
-    """Read a csv file on differential expression values as Gene objects.
+    gene_index: Optional[GeneIndex] = None,
+) -> GeneTable:
+    """Read a csv file on differential expression values as a table of genes.
 
     :param str file_path: The path to the differential expression file to be parsed.
     :param config.Params params: An object that includes paths, cutoffs and other information.
-    :return list: A list of Gene objects.
+    :param gene_index: An index to map the gene identifiers to Entrez identifiers and to add their symbols.
+    :return: A table of genes.
     """
     logger.info("In parse_csv()")
 
-    df = pd.read_csv(file_path, sep=sep)
+    columns = _get_dge_columns(entrez_id_header, log_fold_change_header, adjusted_p_value_header, base_mean_header)
+    df = pd.read_csv(
+        file_path,
+        sep=sep,
+        usecols=lambda column: column in columns,
+        compression=get_compression(file_path),
+    )
 
     return _handle_dataframe(
         df,
@@ -100,9 +302,68 @@ def parse_csv(
         adjusted_p_value_name=adjusted_p_value_header,
         entrez_delimiter=entrez_delimiter,
         base_mean=base_mean_header,
+        gene_index=gene_index,
     )
 
 
+def parse_columnar(
+    file_path: str,
+    entrez_id_header,
+    log_fold_change_header,
+    adjusted_p_value_header,
+    entrez_delimiter,
+    base_mean_header=None,
+    file_format: str = 'parquet',
+    gene_index: Optional[GeneIndex] = None,
+) -> GeneTable:
+    """Read a Parquet or Feather file on differential expression values as a table of genes.
+
+    Only the columns of the given headers are read, and rows with a missing value in any of them are filtered out
+    while reading, so that large files with per-sample columns are not loaded in full. This requires ``pyarrow``.
+
+    :param file_path: The path to the differential expression file to be parsed.
+    :param file_format: The format of the file, either ``parquet`` or ``feather``.
+    :param gene_index: An index to map the gene identifiers to Entrez identifiers and to add their symbols.
+    :return: A table of genes.
+    """
+    logger.info("In parse_columnar()")
+
+    if pyarrow_dataset is None:
+        raise ImportError(f'pyarrow is required to read {file_path}. Install it with pip install guiltytargets[arrow]')
+    if get_compression(file_path) is not None:
+        raise ValueError(f'{file_format} files are compressed internally and cannot be read compressed: {file_path}')
+
+    dataset = pyarrow_dataset.dataset(file_path, format=file_format)
+    columns = [
+        column
+        for column in _get_dge_columns(
+            entrez_id_header, log_fold_change_header, adjusted_p_value_header, base_mean_header,
+        )
+        if column != base_mean_header or column in dataset.schema.names
+    ]
+    is_valid = [pyarrow_dataset.field(column).is_valid() for column in columns]
+    table = dataset.to_table(columns=columns, filter=functools.reduce(operator.and_, is_valid))
+    df = table.to_pandas()
+
+    return _handle_dataframe(
+        df,
+        entrez_id_name=entrez_id_header,
+        log2_fold_change_name=log_fold_change_header,
+        adjusted_p_value_name=adjusted_p_value_header,
+        entrez_delimiter=entrez_delimiter,
+        base_mean=base_mean_header,
+        gene_index=gene_index,
+    )
+
+
+def _get_dge_columns(entrez_id_header, log_fold_change_header, adjusted_p_value_header, base_mean_header) -> List[str]:
+    """Get the columns of a differential expression file that are used."""
+    columns = [entrez_id_header, log_fold_change_header, adjusted_p_value_header]
+    if base_mean_header is not None:
+        columns.append(base_mean_header)
+    return columns
+
+
 def _handle_dataframe(
     df: pd.DataFrame,
     entrez_id_name,
@@ -110,61 +371,82 @@ def _handle_dataframe(
     adjusted_p_value_name,
     entrez_delimiter,
     base_mean=None,
-) -> List[Gene]:
-    """Convert data frame on differential expression values as Gene objects.
+    gene_index: Optional[GeneIndex] = None,
+) -> GeneTable:
+    """Convert data frame on differential expression values to a table of genes.
+
+    Rows with missing values are dropped, the value columns are coerced to floats and rows with several Entrez
+    identifiers are split into one row per identifier, all with vectorized operations. If a gene index is given, the
+    identifiers are mapped to Entrez identifiers, the genes that can not be mapped are dropped and the symbols of the
+    genes are added.
 
     :param df: Data frame with columns showing values on differential
     expression.
     :param cfp: An object that includes paths, cutoffs and other information.
-    :return list: A list of Gene objects.
+    :return: A table of genes.
     """
     logger.info("In _handle_df()")
 
     if base_mean is not None and base_mean in df.columns:
         df = df[pd.notnull(df[base_mean])]
 
-    df = df[pd.notnull(df[entrez_id_name])]
-    df = df[pd.notnull(df[log2_fold_change_name])]
-    df = df[pd.notnull(df[adjusted_p_value_name])]
-
-    # try:
-    #     import bio2bel_hgnc
-    # except ImportError:
-    #     logger.debug('skipping mapping')
-    # else:
-    #     manager = bio2bel_hgnc.Manager()
-    #     # TODO @cthoyt
-
-    return [
-        Gene(
-            entrez_id=entrez_id,
-            log2_fold_change=data[log2_fold_change_name],
-            padj=data[adjusted_p_value_name],
-        )
-        for _, data in df.iterrows()
-        for entrez_id in str(data[entrez_id_name]).split(entrez_delimiter)
-    ]
+    df = pd.DataFrame({
+        'entrez_id': df[entrez_id_name],
+        'log2_fold_change': pd.to_numeric(df[log2_fold_change_name], errors='coerce'),
+        'padj': pd.to_numeric(df[adjusted_p_value_name], errors='coerce'),
+    }).dropna()
+
+    df['entrez_id'] = _entrez_ids_to_str(df['entrez_id']).str.split(entrez_delimiter, regex=False)
+    df = df.explode('entrez_id', ignore_index=True)
+
+    if gene_index is not None:
+        df['entrez_id'] = gene_index.to_entrez(df['entrez_id'])
+        df = df.dropna(subset=['entrez_id']).reset_index(drop=True)
+        df['symbol'] = gene_index.get_symbols(df['entrez_id'])
+
+    return GeneTable(df)
 
 
-def parse_gene_list(path: str, graph: igraph.Graph, anno_type: str = "name") -> List:
+def _entrez_ids_to_str(entrez_ids: pd.Series) -> pd.Series:
+    """Convert Entrez identifiers to strings, without a trailing ``.0`` if they were read as floats."""
+    if pd.api.types.is_float_dtype(entrez_ids) and (entrez_ids % 1 == 0).all():
+        entrez_ids = entrez_ids.astype(np.int64)
+    return entrez_ids.astype(str)
+
+
+def parse_gene_list(
+    path: str,
+    graph: igraph.Graph,
+    anno_type: str = "name",
+    gene_index: Optional[GeneIndex] = None,
+) -> List:
     """Parse a list of genes and return them if they are in the network.
 
     :param path: The path of input file.
     :param graph: The graph with genes as nodes.
     :param anno_type: The type of annotation with two options:name-Entrez ID, symbol-HGNC symbol.
+    :param gene_index: An index to map the genes to Entrez identifiers. If given, the genes can have identifiers
+     of any namespace of the index and are looked up by their Entrez identifier in the network.
     :return: A list of genes, all of which are in the network.
     """
     # read the file
-    genes = pd.read_csv(path, header=None)[0].tolist()
+    if gene_index is None:
+        genes = pd.read_csv(path, header=None, compression=get_compression(path))[0]
+    else:
+        # Identifiers of any namespace are read as they are, so that symbols such as NA are not missing values
+        genes = pd.read_csv(path, header=None, dtype=str, keep_default_na=False, compression=get_compression(path))[0]
 
     # get those genes which are in the network
-    if anno_type == "name":
+    if anno_type not in {"name", "symbol"}:
+        raise Exception(f"The type can either be name or symbol, {anno_type} is not supported")
+    elif gene_index is not None:
+        entrez_ids = gene_index.to_entrez(genes).dropna()
+        ind = graph.vs.select(name_in=entrez_ids.tolist()).indices
+    elif anno_type == "name":
         genes = [str(int(gene)) for gene in genes]
         ind = graph.vs.select(name_in=genes).indices
-    elif anno_type == "symbol":
-        ind = graph.vs.select(symbol_in=genes).indices
     else:
-        raise Exception(f"The type can either be name or symbol, {anno_type} is not supported")
+        ind = graph.vs.select(symbol_in=genes.tolist()).indices
 
     genes = graph.vs[ind][anno_type]
     return genes
@@ -180,7 +462,7 @@ def parse_disease_ids(path: str) -> Set[str]:
         logger.info("Couldn't find the disease identifiers file. Returning empty list.")
         return set()
 
-    df = pd.read_csv(path, names=["ID"])
+    df = pd.read_csv(path, names=["ID"], compression=get_compression(path))
     return set(df["ID"].tolist())
 
 
@@ -195,12 +477,19 @@ def parse_disease_associations(path: str, excluded_disease_ids: set):
         logger.info("Couldn't find the disease associations file. Returning empty list.")
         return {}
 
-    disease_associations = defaultdict(list)
-
-    with open(path) as input_file:
-        for line in input_file:
-            target_id, disease_id = line.strip().split(" ")
-            if disease_id not in excluded_disease_ids:
-                disease_associations[target_id].append(disease_id)
+    try:
+        df = pd.read_csv(
+            path,
+            sep=" ",
+            header=None,
+            names=["target_id", "disease_id"],
+            dtype=str,
+            compression=get_compression(path),
+            # Identifiers such as NA are not missing values
+            keep_default_na=False,
+        )
+    except pd.errors.EmptyDataError:
+        return {}
 
-    return dict(disease_associations)
+    df = df[~df["disease_id"].isin(list(excluded_disease_ids))]
+    return df.groupby("target_id", sort=False)["disease_id"].agg(list).to_dict()
@@ -3,11 +3,18 @@
 """Functions to easily set up the network."""
 
 import logging
-from typing import List, Optional
+import os
+from typing import List, Optional, Union
 
+from .compression import split_compression_extension
+from .gene_index import GeneIndex
 from .model.gene import Gene
+from .model.gene_table import GeneTable
 from .model.network import Network
-from .parsers import parse_csv, parse_disease_associations, parse_disease_ids, parse_excel, parse_ppi_graph
+from .parsers import (
+    COLUMNAR_FORMATS, parse_columnar, parse_csv, parse_disease_associations, parse_disease_ids, parse_excel,
+    parse_ppi_graph,
+)
 
 __all__ = [
     'generate_ppi_network',
@@ -19,21 +26,27 @@ logger = logging.getLogger(__name__)
 
 def generate_ppi_network(
     ppi_graph_path: str,
-    dge_list: List[Gene],
+    dge_list: Union[GeneTable, List[Gene]],
     max_adj_p: float,
     max_log2_fold_change: float,
     min_log2_fold_change: float,
     ppi_edge_min_confidence: Optional[float] = None,
     current_disease_ids_path: Optional[str] = None,
     disease_associations_path: Optional[str] = None,
+    use_ppi_graph_cache: bool = False,
 ) -> Network:
     """Generate the protein-protein interaction network.
 
+    :param use_ppi_graph_cache: Reuses a compiled binary cache of the simplified PPI graph if True.
     :return Network: Protein-protein interaction network with information on differential expression.
     """
     # Compilation of a protein-protein interaction (PPI) graph (HIPPIE)
-    protein_interactions = parse_ppi_graph(ppi_graph_path, ppi_edge_min_confidence)
-    protein_interactions = protein_interactions.simplify()
+    protein_interactions = parse_ppi_graph(
+        ppi_graph_path,
+        ppi_edge_min_confidence,
+        simplify=True,
+        use_cache=use_ppi_graph_cache,
+    )
 
     if disease_associations_path is not None and current_disease_ids_path is not None:
         current_disease_ids = parse_disease_ids(current_disease_ids_path)
@@ -42,12 +55,14 @@ def generate_ppi_network(
     else:
         disease_associations = None
 
-    # Build an undirected weighted graph with the remaining interactions based on Entrez gene IDs
+    # Build an undirected weighted graph with the remaining interactions based on Entrez gene IDs.
+    # The parsed graph is not used anywhere else, so the network annotates it without a copy.
     network = Network(
         protein_interactions,
         max_adj_p=max_adj_p,
         max_l2fc=max_log2_fold_change,
         min_l2fc=min_log2_fold_change,
+        copy=False,
     )
     network.set_up_network(dge_list, disease_associations=disease_associations)
 
@@ -61,18 +76,22 @@ def parse_dge(
     adj_p_header: str,
     entrez_delimiter: str,
     base_mean_header: Optional[str] = None,
-) -> List[Gene]:
+    gene_index: Optional[GeneIndex] = None,
+) -> GeneTable:
     """Parse a differential expression file.
 
-    :param dge_path: Path to the file.
+    :param dge_path: Path to the file. The format is detected from its extension, after a compression extension.
     :param entrez_id_header: Header for the Entrez identifier column
     :param log2_fold_change_header: Header for the log2 fold change column
     :param adj_p_header: Header for the adjusted p-value column
     :param entrez_delimiter: Delimiter between Entrez ids.
     :param base_mean_header: Header for the base mean column.
-    :return: A list of genes.
+    :param gene_index: An index to map the gene identifiers to Entrez identifiers and to add their symbols.
+    :return: A table of genes, which can also be used as a list of :class:`Gene` objects.
     """
-    if dge_path.endswith('.xlsx'):
+    extension = os.path.splitext(split_compression_extension(dge_path)[0])[1]
+
+    if extension == '.xlsx':
         return parse_excel(
             dge_path,
             entrez_id_header=entrez_id_header,
@@ -80,9 +99,10 @@ def parse_dge(
             adjusted_p_value_header=adj_p_header,
             entrez_delimiter=entrez_delimiter,
             base_mean_header=base_mean_header,
+            gene_index=gene_index,
         )
 
-    if dge_path.endswith('.csv'):
+    if extension == '.csv':
         return parse_csv(
             dge_path,
             entrez_id_header=entrez_id_header,
@@ -90,9 +110,10 @@ def parse_dge(
             adjusted_p_value_header=adj_p_header,
             entrez_delimiter=entrez_delimiter,
             base_mean_header=base_mean_header,
+            gene_index=gene_index,
         )
 
-    if dge_path.endswith('.tsv'):
+    if extension == '.tsv':
         return parse_csv(
             dge_path,
             entrez_id_header=entrez_id_header,
@@ -100,7 +121,20 @@ def parse_dge(
             adjusted_p_value_header=adj_p_header,
             entrez_delimiter=entrez_delimiter,
             base_mean_header=base_mean_header,
+            gene_index=gene_index,
             sep="\t",
         )
 
+    if extension in COLUMNAR_FORMATS:
+        return parse_columnar(
+            dge_path,
+            entrez_id_header=entrez_id_header,
+            log_fold_change_header=log2_fold_change_header,
+            adjusted_p_value_header=adj_p_header,
+            entrez_delimiter=entrez_delimiter,
+            base_mean_header=base_mean_header,
+            gene_index=gene_index,
+            file_format=COLUMNAR_FORMATS[extension],
+        )
+
     raise ValueError(f'Unsupported extension: {dge_path}')
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""An on-disk cache of the known drug targets of diseases and of their Entrez identifiers.
+
+Downloading the targets of many diseases repeats the same OpenTargets and MyGene lookups, so both are stored in an
+SQLite database. Every entry has the time it was stored and is ignored once it is older than the time to live of the
+cache, so that the targets are downloaded again from time to time.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Mapping, Optional
+
+__all__ = [
+    'TargetCache',
+]
+
+logger = logging.getLogger(__name__)
+
+#: Default time to live of the cached entries, in seconds
+DEFAULT_TARGET_CACHE_TTL = 30 * 24 * 60 * 60
+
+#: Maximum number of identifiers in one query, below the SQLite limit on the number of parameters
+_MAX_QUERY_SIZE = 500
+
+
+class TargetCache:
+    """Store the targets of diseases and the Entrez identifiers of Ensembl genes in an SQLite database."""
+
+    def __init__(self, path: str, ttl: Optional[float] = DEFAULT_TARGET_CACHE_TTL) -> None:
+        """Initialize the cache.
+
+        :param path: The path of the SQLite database. It is created if it does not exist.
+        :param ttl: The time to live of the entries in seconds. Entries never expire if None.
+        """
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.connection = sqlite3.connect(self.path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS disease_targets '
+                '(disease_id TEXT PRIMARY KEY, ensembl_ids TEXT NOT NULL, updated REAL NOT NULL)',
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS entrez_ids '
+                '(ensembl_id TEXT PRIMARY KEY, entrez_ids TEXT NOT NULL, updated REAL NOT NULL)',
+            )
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+    def _get_min_updated(self) -> float:
+        return float('-inf') if self.ttl is None else time.time() - self.ttl
+
+    def get_disease_targets(self, disease_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """Get the cached Ensembl identifiers of the known drug targets of diseases.
+
+        :param disease_ids: Identifiers of the diseases.
+        :return: The Ensembl identifiers of the targets by disease identifier, for the diseases that are cached and
+         not expired.
+        """
+        return self._get('disease_targets', 'disease_id', 'ensembl_ids', disease_ids)
+
+    def put_disease_targets(self, disease_targets: Mapping[str, List[str]]) -> None:
+        """Store the Ensembl identifiers of the known drug targets of diseases.
+
+        :param disease_targets: The Ensembl identifiers of the targets by disease identifier.
+        """
+        self._put('disease_targets', disease_targets)
+
+    def get_entrez_ids(self, ensembl_ids: Iterable[str]) -> Dict[str, List[str]]:
+        """Get the cached Entrez identifiers of Ensembl genes.
+
+        :param ensembl_ids: Ensembl identifiers.
+        :return: The Entrez identifiers by Ensembl identifier, for the genes that are cached and not expired. Genes
+         without Entrez identifiers have an empty list, so that they are not looked up again.
+        """
+        return self._get('entrez_ids', 'ensembl_id', 'entrez_ids', ensembl_ids)
+
+    def put_entrez_ids(self, entrez_ids: Mapping[str, List[str]]) -> None:
+        """Store the Entrez identifiers of Ensembl genes.
+
+        :param entrez_ids: The Entrez identifiers by Ensembl identifier.
+        """
+        self._put('entrez_ids', entrez_ids)
+
+    def _get(self, table: str, key_column: str, value_column: str, keys: Iterable[str]) -> Dict[str, List[str]]:
+        keys = list(dict.fromkeys(keys))
+        min_updated = self._get_min_updated()
+        rv = {}
+        for start in range(0, len(keys), _MAX_QUERY_SIZE):
+            batch = keys[start:start + _MAX_QUERY_SIZE]
+            rows = self.connection.execute(
+                f'SELECT {key_column}, {value_column} FROM {table} '  # noqa: S608
+                f'WHERE updated >= ? AND {key_column} IN ({", ".join("?" * len(batch))})',
+                [min_updated, *batch],
+            )
+            rv.update((key, json.loads(value)) for key, value in rows)
+        return rv
+
+    def _put(self, table: str, values: Mapping[str, List[str]]) -> None:
+        updated = time.time()
+        with self.connection:
+            self.connection.executemany(
+                f'INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)',  # noqa: S608
+                [(key, json.dumps(value), updated) for key, value in values.items()],
+            )
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""Utilities for GuiltyTargets."""
+
+import logging
+import os
+import sys
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover, not available on Windows
+    resource = None
+
+__all__ = [
+    'get_memory_usage',
+    'get_peak_memory_usage',
+    'format_memory_usage',
+    'log_memory_usage',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def get_memory_usage() -> Optional[int]:
+    """Get the current resident set size of the current process.
+
+    :return: The resident set size in bytes, or None if it is not available on this platform.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def get_peak_memory_usage() -> Optional[int]:
+    """Get the peak resident set size of the current process so far.
+
+    :return: The peak resident set size in bytes, or None if it is not available on this platform.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def format_memory_usage(num_bytes: Optional[int]) -> str:
+    """Format a number of bytes for logging.
+
+    :param num_bytes: A number of bytes, or None if it is not known.
+    :return: The number of mebibytes, or "unknown".
+    """
+    if num_bytes is None:
+        return 'unknown'
+    return f'{num_bytes / 2 ** 20:.1f} MiB'
+
+
+def log_memory_usage(stage: str) -> None:
+    """Log the current and the peak resident set size of the current process.
+
+    :param stage: A description of the stage of the pipeline, such as "after annotating the network".
+    """
+    logger.info(
+        f'Memory usage {stage}: {format_memory_usage(get_memory_usage())}, '
+        f'peak {format_memory_usage(get_peak_memory_usage())}',
+    )
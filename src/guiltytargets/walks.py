@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+
+"""Truncated random walks over graphs in compressed sparse row form.
+
+The walks follow DeepWalk, which GAT2VEC uses for both the structural and the attribute graph: the graph is
+unweighted, without self-loops or multiple edges, every node starts ``num_walks`` walks (in a new random order for
+every pass), and every step moves to a neighbour chosen uniformly at random. A walk stops early at a node without
+neighbours.
+
+Walks are returned as a 2-dimensional array with one row per walk, padded with -1 after walks that stopped early.
+They can be generated by one of several engines with the same statistics:
+
+- ``python`` advances one walker one step at a time.
+- ``numpy`` advances all walkers in lockstep, one vectorized step at a time.
+- ``numba`` runs a jitted kernel, if :mod:`numba` is installed.
+
+Walks are generated in chunks, which can be consumed as a stream by :func:`iter_random_walks`. Any engine can be run
+on several worker processes. The graph arrays are then placed in shared memory, so that the workers do not each
+receive a pickled copy.
+"""
+
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ppi_network_annotation.csr import CSRGraph
+
+try:
+    import numba
+except ImportError:  # pragma: no cover
+    numba = None
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover, Python < 3.8
+    shared_memory = None
+
+__all__ = [
+    'WALK_ENGINES',
+    'Adjacency',
+    'iter_random_walks',
+    'iter_walks',
+    'random_walks',
+]
+
+logger = logging.getLogger(__name__)
+
+#: The available engines for generating random walks
+WALK_ENGINES = ('python', 'numpy', 'numba')
+
+#: The default maximum number of walks generated at once
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+@dataclass
+class Adjacency:
+    """Encapsulate an unweighted, undirected graph as compressed sparse row arrays."""
+
+    #: Row offsets, of length number of nodes + 1
+    indptr: np.ndarray
+
+    #: Sorted, unique neighbours of every node
+    indices: np.ndarray
+
+    @property
+    def num_nodes(self) -> int:
+        """Get the number of nodes."""
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_edges(cls, num_nodes: int, sources: np.ndarray, targets: np.ndarray) -> 'Adjacency':
+        """Build the adjacency of an undirected graph, dropping self-loops and multiple edges.
+
+        :param num_nodes: The number of nodes.
+        :param sources: Source node of every edge.
+        :param targets: Target node of every edge.
+        :return: The symmetric adjacency.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        not_loop = sources != targets
+        rows = np.concatenate([sources[not_loop], targets[not_loop]])
+        columns = np.concatenate([targets[not_loop], sources[not_loop]])
+
+        pairs = np.unique(rows * num_nodes + columns)
+        rows, columns = np.divmod(pairs, num_nodes)
+
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+        return cls(indptr=indptr, indices=columns)
+
+    @classmethod
+    def from_csr_graph(cls, csr_graph: CSRGraph) -> 'Adjacency':
+        """Build the adjacency of a graph in CSR form, dropping self-loops, multiple edges and weights.
+
+        :param csr_graph: A graph in CSR form.
+        :return: The symmetric adjacency.
+        """
+        rows = np.repeat(np.arange(csr_graph.num_vertices, dtype=np.int64), np.diff(csr_graph.indptr))
+        return cls.from_edges(csr_graph.num_vertices, rows, csr_graph.indices)
+
+    def get_neighbors(self, node: int) -> np.ndarray:
+        """Get the neighbours of a node.
+
+        :param node: The index of the node.
+        :return: The sorted indices of its neighbours.
+        """
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+
+def random_walks(
+    adjacency: Adjacency,
+    num_walks: int,
+    walk_length: int,
+    start_nodes: Optional[Sequence[int]] = None,
+    seed: Optional[int] = None,
+    engine: str = 'numpy',
+    num_workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> np.ndarray:
+    """Generate truncated random walks.
+
+    :param adjacency: The graph to walk on.
+    :param num_walks: The number of walks started from every start node.
+    :param walk_length: The maximum number of nodes in a walk, including the start node.
+    :param start_nodes: The nodes from which walks are started. Defaults to all nodes.
+    :param seed: Seed of the random number generator.
+    :param engine: One of :data:`WALK_ENGINES`.
+    :param num_workers: The number of worker processes.
+    :param chunk_size: The maximum number of walks generated at once.
+    :return: An array with one walk of node indices per row, padded with -1.
+    """
+    chunks = list(iter_random_walks(
+        adjacency,
+        num_walks,
+        walk_length,
+        start_nodes=start_nodes,
+        seed=seed,
+        engine=engine,
+        num_workers=num_workers,
+        chunk_size=chunk_size,
+    ))
+    if not chunks:
+        return np.empty((0, walk_length), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def iter_random_walks(
+    adjacency: Adjacency,
+    num_walks: int,
+    walk_length: int,
+    start_nodes: Optional[Sequence[int]] = None,
+    seed: Optional[int] = None,
+    engine: str = 'numpy',
+    num_workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterable[np.ndarray]:
+    """Generate truncated random walks as a stream of chunks.
+
+    Each pass over the start nodes is split into chunks of at most ``chunk_size`` walks. The order of every pass and
+    the walks of every chunk get their own random number generators spawned from ``seed``, so a given seed always
+    gives the same walks, whatever the number of workers. At most two chunks per worker are buffered, so the memory
+    used by the stream does not depend on ``num_walks``.
+
+    :param adjacency: The graph to walk on.
+    :param num_walks: The number of walks started from every start node.
+    :param walk_length: The maximum number of nodes in a walk, including the start node.
+    :param start_nodes: The nodes from which walks are started. Defaults to all nodes.
+    :param seed: Seed of the random number generator.
+    :param engine: One of :data:`WALK_ENGINES`.
+    :param num_workers: The number of worker processes.
+    :param chunk_size: The maximum number of walks in a chunk.
+    :return: An iterable of arrays with one walk of node indices per row, padded with -1.
+    """
+    if engine not in WALK_ENGINES:
+        raise ValueError(f'Invalid walk engine: {engine}. Valid engines are {", ".join(WALK_ENGINES)}')
+    if engine == 'numba' and numba is None:
+        raise ImportError('The numba walk engine requires numba to be installed')
+
+    start_nodes = np.arange(adjacency.num_nodes) if start_nodes is None else np.asarray(start_nodes)
+    tasks = _iter_walk_tasks(start_nodes, num_walks, np.random.SeedSequence(seed), chunk_size)
+
+    if num_workers <= 1:
+        for starts, seed_sequence in tasks:
+            yield _walks(adjacency, starts, walk_length, np.random.default_rng(seed_sequence), engine)
+    else:
+        yield from _iter_parallel_walks(adjacency, tasks, walk_length, engine, num_workers)
+
+
+def _iter_walk_tasks(
+    start_nodes: np.ndarray,
+    num_walks: int,
+    seed_sequence: np.random.SeedSequence,
+    chunk_size: int,
+) -> Iterable[Tuple[np.ndarray, np.random.SeedSequence]]:
+    """Iterate over the start nodes and seeds of the chunks of walks, one pass at a time."""
+    num_chunks = max(1, -(-len(start_nodes) // chunk_size))
+    for pass_seed_sequence in seed_sequence.spawn(num_walks):
+        order_seed_sequence, walk_seed_sequence = pass_seed_sequence.spawn(2)
+        starts = np.random.default_rng(order_seed_sequence).permutation(start_nodes).astype(np.int64)
+        yield from zip(np.array_split(starts, num_chunks), walk_seed_sequence.spawn(num_chunks))
+
+
+def _walks(
+    adjacency: Adjacency,
+    starts: np.ndarray,
+    walk_length: int,
+    rng: np.random.Generator,
+    engine: str,
+) -> np.ndarray:
+    """Generate the walks from the given start nodes with one of the engines."""
+    if engine == 'python':
+        return _python_walks(adjacency, starts, walk_length, rng)
+    if engine == 'numpy':
+        return _numpy_walks(adjacency, starts, walk_length, rng)
+    return _numba_walks(adjacency.indptr, adjacency.indices, starts, walk_length, rng.integers(np.iinfo(np.int32).max))
+
+
+def _iter_parallel_walks(
+    adjacency: Adjacency,
+    tasks: Iterable[Tuple[np.ndarray, np.random.SeedSequence]],
+    walk_length: int,
+    engine: str,
+    num_workers: int,
+) -> Iterable[np.ndarray]:
+    """Generate the chunks of walks on a pool of worker processes that share the graph arrays."""
+    if shared_memory is None:
+        raise RuntimeError('Generating walks with several workers requires Python 3.8 or later')
+
+    blocks = []
+    try:
+        descriptions = {}
+        for name, array in (('indptr', adjacency.indptr), ('indices', adjacency.indices)):
+            block, descriptions[name] = _create_shared_array(array.shape, np.int64)
+            blocks.append(block)
+            _attach_shared_array(block, descriptions[name])[:] = array
+
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_initialize_walk_worker,
+            initargs=(descriptions,),
+        ) as executor:
+            pending = deque()
+            for starts, seed_sequence in tasks:
+                pending.append(executor.submit(_walk_worker, starts, walk_length, seed_sequence, engine))
+                if len(pending) >= 2 * num_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+_SharedArrayDescription = Tuple[str, Tuple[int, ...], str]
+
+#: The graph of the worker process, attached to shared memory by :func:`_initialize_walk_worker`
+_worker_adjacency: Optional[Adjacency] = None
+
+#: The shared memory blocks of the worker process, kept open for the lifetime of the process
+_worker_blocks: List['shared_memory.SharedMemory'] = []
+
+
+def _create_shared_array(shape: Tuple[int, ...], dtype) -> Tuple['shared_memory.SharedMemory', _SharedArrayDescription]:
+    """Create a block of shared memory for an array and get the description that workers use to attach to it."""
+    dtype = np.dtype(dtype)
+    size = max(1, int(np.prod(shape)) * dtype.itemsize)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    return block, (block.name, tuple(shape), dtype.str)
+
+
+def _attach_shared_array(block: 'shared_memory.SharedMemory', description: _SharedArrayDescription) -> np.ndarray:
+    """Get an array backed by a block of shared memory."""
+    _, shape, dtype = description
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _initialize_walk_worker(descriptions: Dict[str, _SharedArrayDescription]) -> None:
+    """Attach the worker process to the graph arrays in shared memory."""
+    global _worker_adjacency
+    arrays = {}
+    for name, description in descriptions.items():
+        block = shared_memory.SharedMemory(name=description[0])
+        _worker_blocks.append(block)
+        arrays[name] = _attach_shared_array(block, description)
+    _worker_adjacency = Adjacency(indptr=arrays['indptr'], indices=arrays['indices'])
+
+
+def _walk_worker(
+    starts: np.ndarray,
+    walk_length: int,
+    seed_sequence: np.random.SeedSequence,
+    engine: str,
+) -> np.ndarray:
+    """Generate one chunk of walks on the graph of the worker process."""
+    return _walks(_worker_adjacency, starts, walk_length, np.random.default_rng(seed_sequence), engine)
+
+
+def _python_walks(adjacency: Adjacency, starts: np.ndarray, walk_length: int, rng: np.random.Generator):
+    """Generate the walks one walker and one step at a time."""
+    walks = np.full((len(starts), walk_length), -1, dtype=np.int64)
+    if walk_length == 0:
+        return walks
+
+    degrees = np.diff(adjacency.indptr)
+    for i, node in enumerate(starts.tolist()):
+        walk = [node]
+        while len(walk) < walk_length and degrees[walk[-1]] > 0:
+            neighbors = adjacency.get_neighbors(walk[-1])
+            walk.append(int(neighbors[rng.integers(len(neighbors))]))
+        walks[i, :len(walk)] = walk
+
+    return walks
+
+
+def _numpy_walks(adjacency: Adjacency, starts: np.ndarray, walk_length: int, rng: np.random.Generator):
+    """Generate the walks by advancing all walkers in lockstep."""
+    walks = np.full((len(starts), walk_length), -1, dtype=np.int64)
+    if walk_length == 0:
+        return walks
+
+    degrees = np.diff(adjacency.indptr)
+    walkers = np.arange(len(starts))
+    current = starts
+    walks[:, 0] = current
+
+    for step in range(1, walk_length):
+        current_degrees = degrees[current]
+        alive = current_degrees > 0
+        if not alive.all():
+            walkers, current, current_degrees = walkers[alive], current[alive], current_degrees[alive]
+        if len(walkers) == 0:
+            break
+
+        offsets = rng.integers(current_degrees)
+        current = adjacency.indices[adjacency.indptr[current] + offsets]
+        walks[walkers, step] = current
+
+    return walks
+
+
+def _walk_kernel(indptr, indices, starts, walk_length, seed):  # pragma: no cover
+    """Generate the walks in a loop that numba compiles to machine code."""
+    np.random.seed(seed)
+    walks = np.full((len(starts), walk_length), -1, dtype=np.int64)
+    for i in range(len(starts)):
+        if walk_length == 0:
+            break
+        current = starts[i]
+        walks[i, 0] = current
+        for step in range(1, walk_length):
+            degree = indptr[current + 1] - indptr[current]
+            if degree == 0:
+                break
+            current = indices[indptr[current] + np.random.randint(0, degree)]
+            walks[i, step] = current
+    return walks
+
+
+_numba_walks = _walk_kernel if numba is None else numba.njit(cache=True, nogil=True)(_walk_kernel)
+
+
+def iter_walks(walks: np.ndarray, max_node: Optional[int] = None) -> Iterable[List[str]]:
+    """Iterate over walks as lists of string tokens, as needed by the skip-gram model.
+
+    :param walks: An array with one walk per row, padded with -1.
+    :param max_node: If given, nodes with an index greater or equal to it are left out of the walks.
+    :return: An iterable of walks, each a list of node indices as strings.
+    """
+    num_tokens = int(walks.max(initial=-1)) + 1
+    if max_node is not None:
+        num_tokens = min(num_tokens, max_node)
+    tokens = np.array([str(node) for node in range(num_tokens)], dtype=object)
+
+    for walk in walks:
+        yield tokens[walk[(walk >= 0) & (walk < num_tokens)]].tolist()
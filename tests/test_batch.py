@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the batch mode."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from guiltytargets.batch import BatchJob, parse_manifest, run_batch
+
+
+class BatchTest(unittest.TestCase):
+    """Test running several datasets against the same PPI network."""
+
+    def setUp(self):
+        """Write a PPI network, two datasets and a manifest to a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        num_genes = 40
+
+        self.ppi_graph_path = self._get_path('ppi.edgelist')
+        with open(self.ppi_graph_path, 'w') as file:
+            for source in range(1, num_genes + 1):
+                for target in rng.choice(np.arange(1, num_genes + 1), 3, replace=False):
+                    if source != target:
+                        print(source, target, 0.9, sep='\t', file=file)
+
+        for dataset in range(2):
+            pd.DataFrame({
+                'Gene.ID': np.arange(1, num_genes + 1),
+                'logFC': rng.normal(0, 2, num_genes),
+                'adj.P.Val': rng.uniform(0, 0.1, num_genes),
+            }).to_csv(self._get_path(f'dge{dataset}.tsv'), sep='\t', index=False)
+            targets = rng.choice(np.arange(1, num_genes + 1), 10, replace=False)
+            pd.Series(targets).to_csv(self._get_path(f'targets{dataset}.txt'), header=False, index=False)
+
+        self.manifest_path = self._get_path('manifest.tsv')
+        pd.DataFrame({
+            'dge_path': ['dge0.tsv', 'dge1.tsv', 'missing.tsv'],
+            'targets_path': ['targets0.txt', 'targets1.txt', 'targets0.txt'],
+            'output_directory': ['out0', 'out1', 'out2'],
+        }).to_csv(self.manifest_path, sep='\t', index=False)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def _get_path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_parse_manifest(self):
+        """Test that relative paths are resolved against the given directories."""
+        jobs = parse_manifest(self.manifest_path, output_directory='/results')
+        self.assertEqual(3, len(jobs))
+        self.assertEqual(BatchJob(self._get_path('dge0.tsv'), self._get_path('targets0.txt'), '/results/out0'), jobs[0])
+
+    def _run_batch(self, jobs, **kwargs):
+        return run_batch(
+            jobs,
+            ppi_graph_path=self.ppi_graph_path,
+            max_adj_p=0.05,
+            max_log2_fold_change=-1.0,
+            min_log2_fold_change=1.0,
+            entrez_id_header='Gene.ID',
+            log2_fold_change_header='logFC',
+            adj_p_header='adj.P.Val',
+            base_mean_header=None,
+            entrez_delimiter='///',
+            ppi_edge_min_confidence=0.0,
+            **kwargs,
+        )
+
+    def _check_results(self, jobs, failures):
+        self.assertEqual([jobs[2]], [job for job, _ in failures])
+        for job in jobs[:2]:
+            rankings = pd.read_csv(os.path.join(job.output_directory, 'rankings.tsv'), sep='\t')
+            self.assertEqual(40, len(rankings))
+            self.assertTrue(os.path.exists(os.path.join(job.output_directory, 'auc_g2v.tsv')))
+
+    def test_run_batch(self):
+        """Test that every dataset gets its results and that a failing dataset does not stop the others."""
+        jobs = parse_manifest(self.manifest_path)
+        # The jobs run in this process on the graph that was already parsed
+        with mock.patch('guiltytargets.batch.CSRGraph.load', side_effect=AssertionError):
+            failures = self._run_batch(jobs)
+        self._check_results(jobs, failures)
+
+    def test_run_batch_processes(self):
+        """Test that the jobs also get their results in worker processes."""
+        jobs = parse_manifest(self.manifest_path, output_directory=self._get_path('processes'))
+        self._check_results(jobs, self._run_batch(jobs, num_processes=2))
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the download of HIPPIE, against a local HTTP server, and of the targets of diseases."""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from guiltytargets.download import (
+    DOWNLOAD_METADATA_EXTENSION, PARTIAL_DOWNLOAD_EXTENSION, download_hippie, download_targets_for_disease,
+    download_targets_for_diseases,
+)
+from guiltytargets.ppi_network_annotation import generate_ppi_network
+from guiltytargets.ppi_network_annotation.parsers import PPI_GRAPH_CACHE_EXTENSION
+from guiltytargets.target_cache import TargetCache
+
+HIPPIE_LINES = [
+    ('AL1A1_HUMAN', '216', 'AL1A1_HUMAN', '216', '0.76', 'experiments:in vivo'),
+    ('ITA7_HUMAN', '3679', 'ACHA_HUMAN', '1134', '0.73', 'experiments:in vivo,Two-hybrid'),
+    ('NEB1_HUMAN', '55607', 'ACTG_HUMAN', '71', '0.65', 'experiments:in vitro'),
+    ('SRGN_HUMAN', '5552', 'CD44_HUMAN', '960', '0.63', 'experiments:in vivo'),
+]
+
+
+def _get_content(lines):
+    return ''.join('\t'.join(line) + '\n' for line in lines).encode('utf-8')
+
+
+class _HippieHandler(BaseHTTPRequestHandler):
+    """Serve the content of the server with validators, conditional requests and range requests."""
+
+    def do_GET(self):  # noqa: N802
+        server = self.server
+        server.requests.append(dict(self.headers))
+
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        content, status = server.content, 200
+        range_header = self.headers.get('Range')
+        if range_header is not None and self.headers.get('If-Range') == server.etag:
+            start = int(range_header[len('bytes='):].rstrip('-'))
+            content, status = server.content[start:], 206
+
+        self.send_response(status)
+        self.send_header('ETag', server.etag)
+        self.send_header('Content-Length', str(len(content)))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{len(server.content) - 1}/{len(server.content)}')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # noqa: A002
+        """Do not log the requests."""
+
+
+class DownloadHippieTest(unittest.TestCase):
+    """Test the streaming, resumable and conditional download of HIPPIE."""
+
+    def setUp(self):
+        """Start a local HTTP server and create a temporary directory."""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _HippieHandler)
+        self._set_content(HIPPIE_LINES)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hippie.txt'
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'hippie.edgelist')
+
+    def tearDown(self):
+        """Stop the server and remove the temporary directory."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def _set_content(self, lines):
+        self.server.content = _get_content(lines)
+        self.server.etag = f'"{hashlib.sha256(self.server.content).hexdigest()[:16]}"'
+        self.server.requests = []
+
+    def _get_cache_files(self):
+        return [name for name in os.listdir(self.directory.name) if name.endswith(PPI_GRAPH_CACHE_EXTENSION)]
+
+    def _read_edges(self):
+        with open(self.path) as file:
+            return [tuple(line.rstrip('\n').split('\t')) for line in file]
+
+    def test_download(self):
+        """Test that the file is projected, cached and only downloaded again when it changed."""
+        download_hippie(url=self.url, path=self.path, min_edge_weight=0.7)
+        self.assertEqual([(line[1], line[3], line[4]) for line in HIPPIE_LINES], self._read_edges())
+        self.assertEqual(
+            [f'hippie.edgelist{DOWNLOAD_METADATA_EXTENSION}'],
+            [name for name in os.listdir(self.directory.name) if name.endswith(DOWNLOAD_METADATA_EXTENSION)],
+        )
+        cache_files = self._get_cache_files()
+        self.assertEqual(1, len(cache_files))
+        with self.assertLogs('guiltytargets.ppi_network_annotation.parsers', level='INFO') as logs:
+            generate_ppi_network(self.path, [], 0.05, -1.0, 1.0, ppi_edge_min_confidence=0.7, use_ppi_graph_cache=True)
+        self.assertIn(f'Loaded PPI network from {os.path.join(self.directory.name, cache_files[0])}', logs.output[-1])
+        self.assertEqual(cache_files, self._get_cache_files())
+
+        self.server.requests = []
+        download_hippie(url=self.url, path=self.path)
+        self.assertEqual(self.server.etag, self.server.requests[0]['If-None-Match'])
+        self.assertEqual([(line[1], line[3], line[4]) for line in HIPPIE_LINES], self._read_edges())
+
+        self.server.requests = []
+        download_hippie(url=self.url, path=self.path, sha256=hashlib.sha256(self.server.content).hexdigest().upper())
+        self.assertEqual(self.server.etag, self.server.requests[0]['If-None-Match'])
+
+        self._set_content(HIPPIE_LINES[:2])
+        download_hippie(url=self.url, path=self.path)
+        self.assertEqual([(line[1], line[3], line[4]) for line in HIPPIE_LINES[:2]], self._read_edges())
+        self.assertEqual([], self._get_cache_files())
+
+    def test_truncated(self):
+        """Test that an edgelist that was truncated since it was written is downloaded again."""
+        sha256 = hashlib.sha256(self.server.content).hexdigest()
+        download_hippie(url=self.url, path=self.path, sha256=sha256)
+        with open(self.path, 'r+') as file:
+            file.truncate(10)
+
+        self.server.requests = []
+        with self.assertLogs('guiltytargets.download', level='WARNING'):
+            download_hippie(url=self.url, path=self.path, sha256=sha256)
+        self.assertNotIn('If-None-Match', self.server.requests[0])
+        self.assertEqual([(line[1], line[3], line[4]) for line in HIPPIE_LINES], self._read_edges())
+
+        with open(f'{self.path}{DOWNLOAD_METADATA_EXTENSION}') as file:
+            metadata = json.load(file)
+        del metadata['sha256']
+        with open(f'{self.path}{DOWNLOAD_METADATA_EXTENSION}', 'w') as file:
+            json.dump(metadata, file)
+        self.assertEqual(self.path, download_hippie(url=self.url, path=self.path, sha256=sha256))
+
+    def test_offline(self):
+        """Test that a previous download is used when the server can not be reached."""
+        download_hippie(url=self.url, path=self.path)
+        self.server.shutdown()
+        self.server.server_close()
+
+        with self.assertLogs('guiltytargets.download', level='WARNING'):
+            self.assertEqual(self.path, download_hippie(url=self.url, path=self.path, timeout=5))
+        self.assertEqual([(line[1], line[3], line[4]) for line in HIPPIE_LINES], self._read_edges())
+
+        os.remove(f'{self.path}{DOWNLOAD_METADATA_EXTENSION}')
+        with self.assertRaises(OSError):
+            download_hippie(url=self.url, path=self.path, timeout=5)
+
+    def test_resume(self):
+        """Test that a partial download is resumed with a range request."""
+        partial_path = f'{self.path}{PARTIAL_DOWNLOAD_EXTENSION}'
+        with open(partial_path, 'wb') as file:
+            file.write(self.server.content[:50])
+        with open(f'{partial_path}{DOWNLOAD_METADATA_EXTENSION}', 'w') as file:
+            json.dump({'url': self.url, 'etag': self.server.etag, 'last_modified': None}, file)
+
+        download_hippie(url=self.url, path=self.path, sha256=hashlib.sha256(self.server.content).hexdigest())
+        self.assertEqual('bytes=50-', self.server.requests[0]['Range'])
+        self.assertEqual([(line[1], line[3], line[4]) for line in HIPPIE_LINES], self._read_edges())
+        self.assertFalse(os.path.exists(partial_path))
+
+    def test_invalid_checksum(self):
+        """Test that a download with a different checksum is rejected."""
+        with self.assertRaises(ValueError):
+            download_hippie(url=self.url, path=self.path, sha256='0' * 64)
+        self.assertEqual([], os.listdir(self.directory.name))
+
+
+DISEASE_TARGETS = {
+    'EFO_0000249': ['ENSG01', 'ENSG02', 'ENSG03'],
+    'EFO_0000270': ['ENSG03', 'ENSG04'],
+}
+
+ENTREZ_IDS = {
+    'ENSG01': [348],
+    'ENSG02': [],
+    'ENSG03': [351, 352],
+    'ENSG04': [4137],
+}
+
+
+class _Associations(list):
+    def filter(self, datatype):  # noqa: A003
+        return [association for association in self if association['datatype'] == datatype]
+
+
+class _OpenTargetsClient:
+    """Answer association queries from :data:`DISEASE_TARGETS`."""
+
+    def __init__(self):
+        self.queries = []
+
+    def get_associations_for_disease(self, disease_id, fields):
+        self.queries.append(disease_id)
+        associations = _Associations(
+            {'target': {'id': ensembl_id}, 'datatype': 'known_drug'}
+            for ensembl_id in DISEASE_TARGETS[disease_id]
+        )
+        associations.append({'target': {'id': 'ENSG99'}, 'datatype': 'literature'})
+        return associations
+
+
+class _MyGeneInfo:
+    """Answer gene queries from :data:`ENTREZ_IDS`."""
+
+    def __init__(self):
+        self.queries = []
+
+    def getgenes(self, ensembl_ids, fields):
+        self.queries.append(list(ensembl_ids))
+        return [
+            {'query': ensembl_id, 'entrezgene': entrez_id}
+            for ensembl_id in ensembl_ids
+            for entrez_id in ENTREZ_IDS[ensembl_id]
+        ] + [
+            {'query': ensembl_id, 'notfound': True}
+            for ensembl_id in ensembl_ids
+            if not ENTREZ_IDS[ensembl_id]
+        ]
+
+
+class DownloadTargetsTest(unittest.TestCase):
+    """Test the batched, concurrent and cached download of the targets of diseases."""
+
+    def setUp(self):
+        """Create stand-in clients and a temporary directory."""
+        self.open_targets_client = _OpenTargetsClient()
+        self.my_gene_info = _MyGeneInfo()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, 'targets.sqlite')
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def _download(self, cache=None):
+        file = io.StringIO()
+        rv = download_targets_for_diseases(
+            DISEASE_TARGETS,
+            open_targets_client=self.open_targets_client,
+            my_gene_info=self.my_gene_info,
+            file=file,
+            cache=cache,
+            batch_size=2,
+        )
+        return rv, file.getvalue()
+
+    def test_download_targets_for_disease(self):
+        """Test the output of the targets of a single disease."""
+        file = io.StringIO()
+        download_targets_for_disease(
+            'EFO_0000270',
+            open_targets_client=self.open_targets_client,
+            my_gene_info=self.my_gene_info,
+            file=file,
+        )
+        self.assertEqual('efo\tncbigene\nEFO_0000270\t351\nEFO_0000270\t352\nEFO_0000270\t4137\n', file.getvalue())
+
+    def test_download_targets_for_diseases(self):
+        """Test that the genes are looked up once, in batches, and that cached lookups are reused until they expire."""
+        expected = {
+            'EFO_0000249': ['348', '351', '352'],
+            'EFO_0000270': ['351', '352', '4137'],
+        }
+
+        cache = TargetCache(self.cache_path)
+        rv, output = self._download(cache)
+        cache.close()
+        self.assertEqual(expected, rv)
+        self.assertEqual(7, len(output.splitlines()))
+        self.assertEqual(sorted(DISEASE_TARGETS), sorted(self.open_targets_client.queries))
+        self.assertEqual([['ENSG01', 'ENSG02'], ['ENSG03', 'ENSG04']], self.my_gene_info.queries)
+
+        cache = TargetCache(self.cache_path)
+        self.assertEqual((expected, output), self._download(cache))
+        cache.close()
+        self.assertEqual(2, len(self.open_targets_client.queries))
+        self.assertEqual(2, len(self.my_gene_info.queries))
+
+        cache = TargetCache(self.cache_path, ttl=0)
+        self.assertEqual((expected, output), self._download(cache))
+        cache.close()
+        self.assertEqual(4, len(self.open_targets_client.queries))
+        self.assertEqual(4, len(self.my_gene_info.queries))
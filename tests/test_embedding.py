@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""Module to test the in-memory inputs and random walks of the embedding."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from igraph import Graph
+
+from guiltytargets.embedding import Gat2VecInput, WalkCorpus, get_gat2vec_input
+from guiltytargets.embedding_cache import EmbeddingCache, get_embedding_cache_key
+from guiltytargets.ppi_network_annotation.model.attribute_network import AttributeNetwork
+from guiltytargets.ppi_network_annotation.model.gene import Gene
+from guiltytargets.ppi_network_annotation.model.labeled_network import LabeledNetwork
+from guiltytargets.ppi_network_annotation.model.network import Network
+from guiltytargets.walks import Adjacency, iter_walks, numba, random_walks
+
+
+class Gat2VecInputTest(unittest.TestCase):
+    """Test that the in-memory inputs match the GAT2VEC input files."""
+
+    def setUp(self):
+        """Build a small annotated network."""
+        graph = Graph()
+        graph.add_vertices(6)
+        graph.vs["name"] = [str(i) for i in range(6)]
+        graph.add_edges([(0, 1), (0, 1), (1, 2), (2, 2), (2, 3), (4, 5)])
+        graph.es["weight"] = [0.9] * 6
+
+        self.network = Network(graph)
+        self.network.set_up_network(
+            [
+                Gene(entrez_id="0", log2_fold_change=2.0, padj=0.01),
+                Gene(entrez_id="2", log2_fold_change=-2.0, padj=0.01),
+                Gene(entrez_id="4", log2_fold_change=2.0, padj=0.5),
+            ],
+            disease_associations={"1": ["EFO_1"], "3": ["EFO_1", "EFO_2"]},
+        )
+        self.targets = ["1", "4"]
+        self.inputs = get_gat2vec_input(self.network, self.targets)
+
+    def test_structure(self):
+        """Test the structural graph has the neighbours of the adjacency list, without loops and duplicates."""
+        self.assertEqual(6, self.inputs.num_vertices)
+        for vertex, neighbors in enumerate(self.network.get_adjlist()):
+            expected = sorted(set(neighbors) - {vertex})
+            self.assertEqual(expected, self.inputs.structure.get_neighbors(vertex).tolist())
+
+    def test_attributes(self):
+        """Test the attribute graph links the vertices and attributes of the attribute adjacency list."""
+        att_mappings = AttributeNetwork(self.network).get_attribute_mappings()
+        for vertex in range(6):
+            self.assertEqual(sorted(att_mappings[vertex]), self.inputs.attributes.get_neighbors(vertex).tolist())
+            for attribute in att_mappings[vertex]:
+                self.assertIn(vertex, self.inputs.attributes.get_neighbors(attribute).tolist())
+
+    def test_labels(self):
+        """Test the labels are the ones of the label file, in vertex order."""
+        label_mappings = LabeledNetwork(self.network).get_index_labels(self.targets)
+        self.assertEqual([label_mappings[i] for i in range(6)], self.inputs.labels.tolist())
+
+    def test_walk_corpus(self):
+        """Test that the corpus streams the same walks on every iteration and for the same seed."""
+        corpus = WalkCorpus(self.inputs, num_walks=3, walk_length=4, chunk_size=5)
+        walks = list(corpus)
+        self.assertEqual(2 * 3 * 6, len(walks))
+        self.assertEqual(walks, list(corpus))
+        self.assertTrue(all(int(token) < 6 for walk in walks for token in walk))
+
+        seeded = WalkCorpus(self.inputs, num_walks=3, walk_length=4, seed=corpus.seed, chunk_size=5)
+        self.assertEqual(walks, list(seeded))
+
+        materialized = corpus.materialize()
+        self.assertEqual(np.int32, materialized.attribute_walks.dtype)
+        self.assertEqual(walks, list(materialized))
+        self.assertEqual(len(walks), len(materialized))
+
+        counts = {}
+        for walk in walks:
+            for token in walk:
+                counts[token] = counts.get(token, 0) + 1
+        self.assertEqual(counts, materialized.get_token_counts())
+
+
+class EmbeddingCacheTest(unittest.TestCase):
+    """Test the on-disk embedding cache."""
+
+    def setUp(self):
+        """Create a temporary cache directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.embedding = np.arange(12, dtype=np.float32).reshape(6, 2)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def test_key(self):
+        """Test that the key depends on the graphs and parameters, but not on the labels."""
+        adjacency = Adjacency.from_edges(3, [0, 1], [1, 2])
+        attributes = Adjacency.from_edges(4, [0], [3])
+        inputs = Gat2VecInput(adjacency, attributes, np.array([1, 0, 0]))
+        key = get_embedding_cache_key(inputs, {'seed': 1})
+
+        self.assertEqual(key, get_embedding_cache_key(Gat2VecInput(adjacency, attributes, np.zeros(3)), {'seed': 1}))
+        self.assertNotEqual(key, get_embedding_cache_key(inputs, {'seed': 2}))
+        self.assertNotEqual(key, get_embedding_cache_key(Gat2VecInput(adjacency, adjacency, np.zeros(3)), {'seed': 1}))
+
+    def test_round_trip(self):
+        """Test that a cached embedding is read back."""
+        cache = EmbeddingCache(self.directory.name)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', self.embedding)
+        np.testing.assert_array_equal(self.embedding, cache.get('a'))
+
+    def test_eviction(self):
+        """Test that the least recently used embeddings are removed over the size limit."""
+        cache = EmbeddingCache(self.directory.name)
+        for timestamp, key in enumerate('abc'):
+            cache.put(key, self.embedding)
+            os.utime(cache.get_path(key), (timestamp, timestamp))
+        cache.get('a')
+
+        cache.max_size = 2 * os.path.getsize(cache.get_path('a'))
+        cache.evict()
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+class RandomWalksTest(unittest.TestCase):
+    """Test that the walk engines generate walks with the same statistics."""
+
+    def setUp(self):
+        """Build a small graph with a hub, a path and an isolated node."""
+        sources = [0, 0, 0, 0, 1, 4, 5]
+        targets = [1, 2, 3, 4, 2, 5, 6]
+        self.adjacency = Adjacency.from_edges(8, sources, targets)
+        self.edges = set(zip(sources, targets)) | set(zip(targets, sources))
+
+    def _check_engine(self, engine):
+        walks = random_walks(self.adjacency, num_walks=500, walk_length=10, seed=5, engine=engine)
+        self.assertEqual((8 * 500, 10), walks.shape)
+        for walk in walks:
+            walk = walk[walk >= 0]
+            self.assertTrue(all((a, b) in self.edges for a, b in zip(walk[:-1], walk[1:])))
+
+        # every node starts the same number of walks, and only the isolated node stops early
+        self.assertEqual([500] * 8, np.bincount(walks[:, 0]).tolist())
+        self.assertEqual({1}, set((walks[walks[:, 0] == 7] >= 0).sum(axis=1).tolist()))
+        self.assertTrue((walks[walks[:, 0] != 7] >= 0).all())
+
+        visits = np.bincount(walks[walks >= 0], minlength=8) / (walks >= 0).sum()
+        return visits
+
+    def test_engines(self):
+        """Test the python, numpy and numba engines."""
+        expected = self._check_engine('python')
+        for engine in ('numpy', 'numba') if numba is not None else ('numpy',):
+            with self.subTest(engine=engine):
+                np.testing.assert_allclose(expected, self._check_engine(engine), atol=0.01)
+
+    def test_deterministic(self):
+        """Test that the same seed gives the same walks."""
+        np.testing.assert_array_equal(
+            random_walks(self.adjacency, num_walks=3, walk_length=5, seed=1),
+            random_walks(self.adjacency, num_walks=3, walk_length=5, seed=1),
+        )
+
+    def test_parallel_deterministic(self):
+        """Test that the same seed and number of workers give the same walks."""
+        walks = random_walks(self.adjacency, num_walks=50, walk_length=5, seed=1, num_workers=2)
+        self.assertEqual((8 * 50, 5), walks.shape)
+        self.assertEqual([50] * 8, np.bincount(walks[:, 0]).tolist())
+        np.testing.assert_array_equal(
+            walks,
+            random_walks(self.adjacency, num_walks=50, walk_length=5, seed=1, num_workers=2),
+        )
+
+    def test_iter_walks(self):
+        """Test that walks are turned into tokens without padding and without the excluded nodes."""
+        walks = np.array([[0, 5, 1, -1], [2, 3, 2, 6]])
+        self.assertEqual([['0', '1'], ['2', '3', '2']], list(iter_walks(walks, max_node=5)))
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the evaluation of in-memory embeddings."""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from guiltytargets.evaluation import evaluate_cv, get_prediction_probs, get_top_prediction_probs
+
+
+class EvaluateCVTest(unittest.TestCase):
+    """Test the cross-validation of a classifier of known targets."""
+
+    def setUp(self):
+        """Build an embedding in which the targets are shifted away from the other vertices."""
+        rng = np.random.default_rng(0)
+        self.labels = np.zeros(100, dtype=int)
+        self.labels[:20] = 1
+        self.embedding = rng.normal(size=(100, 4)) + self.labels[:, np.newaxis]
+
+    def test_parallel(self):
+        """Test that the results do not depend on the number of jobs."""
+        auc_df = evaluate_cv(self.embedding, self.labels, (0.3, 0.5), n_splits=3, seed=1)
+        self.assertEqual(['TR', 'accuracy', 'f1micro', 'f1macro', 'auc'], auc_df.columns.tolist())
+        self.assertEqual([0.3] * 3 + [0.5] * 3, auc_df['TR'].tolist())
+
+        parallel_auc_df, timings_df = evaluate_cv(
+            self.embedding, self.labels, (0.3, 0.5), n_splits=3, seed=1, n_jobs=2, return_timings=True,
+        )
+        pd.testing.assert_frame_equal(auc_df, parallel_auc_df)
+        self.assertEqual([0, 1, 2] * 2, timings_df['split'].tolist())
+        self.assertTrue((timings_df[['fit_time', 'score_time']] >= 0).all().all())
+
+
+class PredictionProbsTest(unittest.TestCase):
+    """Test the chunked scoring of all vertices."""
+
+    def setUp(self):
+        """Build an embedding in which the targets are shifted away from the other vertices."""
+        rng = np.random.default_rng(1)
+        self.labels = np.zeros(50, dtype=int)
+        self.labels[:10] = 1
+        self.embedding = rng.normal(size=(50, 3)) + self.labels[:, np.newaxis]
+
+    def test_top_k(self):
+        """Test that the chunked top-k scoring keeps the vertices with the highest probabilities."""
+        probs = get_prediction_probs(self.embedding, self.labels)
+        np.testing.assert_allclose(probs, get_prediction_probs(self.embedding, self.labels, chunk_size=7))
+
+        indices, top_probs = get_top_prediction_probs(self.embedding, self.labels, k=5, chunk_size=7)
+        self.assertEqual(np.argsort(-probs[:, 1], kind='stable')[:5].tolist(), indices.tolist())
+        np.testing.assert_allclose(probs[indices], top_probs)
+
+    def test_top_k_ties(self):
+        """Test that ties, also across chunks, are broken by the lowest vertex index."""
+        features = np.zeros((21, 1))
+        features[[6, 8, 11, 12, 13, 15, 16]] = 1.0
+        labels = features[:, 0].astype(int)
+
+        indices, _ = get_top_prediction_probs(features, labels, k=3, chunk_size=7)
+        self.assertEqual([6, 8, 11], indices.tolist())
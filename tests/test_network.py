@@ -2,14 +2,19 @@
 
 """Module to test network module under model package."""
 
+import os
+import tempfile
 import unittest
 
 import numpy as np
 from igraph import Graph
 
-from guiltytargets.ppi_network_annotation.model.filtered_network import FilteredNetwork
+from guiltytargets.ppi_network_annotation.model.filtered_network import FilteredNetwork, _get_shortest_path_edges
 from guiltytargets.ppi_network_annotation.model.gene import Gene
+from guiltytargets.ppi_network_annotation.model.gene_table import GeneTable
+from guiltytargets.ppi_network_annotation.model.neighborhood_network import NeighborhoodNetwork
 from guiltytargets.ppi_network_annotation.model.network import Network
+from guiltytargets.ppi_network_annotation.model.subgraph import SubgraphView
 
 
 class NetworkTest(unittest.TestCase):
@@ -85,6 +90,91 @@ class NetworkTest(unittest.TestCase):
         n.set_up_network(self.protein_list, gene_filter=True)
         self.__check_for_graph_eq(n.graph, self.mapped_network)
 
+    def test_init_without_copy(self):
+        """Test that the network annotates the graph in place if it takes ownership of it."""
+        n = Network(self.interact_network, copy=False)
+        n.set_up_network(self.protein_list, gene_filter=True)
+        self.assertIs(self.interact_network, n.graph)
+        self.__check_for_graph_eq(self.interact_network, self.mapped_network)
+
+    def test_save_load(self):
+        """Test that a saved network is loaded with the same graph and annotations."""
+        n = Network(self.interact_network, max_adj_p=0.01)
+        n.set_up_network(self.protein_list, disease_associations={"3": ["EFO_1"], "0": ["EFO_1", "EFO_3"]})
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'network.gtnetwork')
+            n.save(path)
+            loaded = Network.load(path)
+
+        self.assertEqual(0.01, loaded.max_adj_p)
+        self.assertEqual(n.graph.get_edgelist(), loaded.graph.get_edgelist())
+        self.assertEqual(n.graph.es.attributes(), loaded.graph.es.attributes())
+        self.assertEqual(n.graph.es['weight'], loaded.graph.es['weight'])
+        self.assertEqual(sorted(n.graph.vs.attributes()), sorted(loaded.graph.vs.attributes()))
+        for attribute in n.graph.vs.attributes():
+            self.assertEqual(n.graph.vs[attribute], loaded.graph.vs[attribute])
+            self.assertEqual(
+                [type(value) for value in n.graph.vs[attribute]],
+                [type(value) for value in loaded.graph.vs[attribute]],
+                msg=attribute,
+            )
+
+    def test_add_vertex_attributes_by_genes(self):
+        """Test that the last of duplicate genes wins, genes not in the graph are ignored, and others keep defaults."""
+        n = Network(self.interact_network)
+        n._set_default_vertex_attributes()
+        n._add_vertex_attributes_by_genes(GeneTable.from_genes([
+            Gene(entrez_id="1", log2_fold_change=1.0, symbol="A", padj=0.2),
+            Gene(entrez_id="12", log2_fold_change=3.0, symbol="B", padj=0.01),
+            Gene(entrez_id="1", log2_fold_change=-2.0, symbol="C", padj=0.03),
+            Gene(entrez_id="4", log2_fold_change=0.5, symbol="D", padj=0.04),
+        ]))
+
+        self.assertEqual([0.0, -2.0, 0.0, 0.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0], n.graph.vs["l2fc"])
+        self.assertEqual([0.5, 0.03, 0.5, 0.5, 0.04, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5], n.graph.vs["padj"])
+        self.assertEqual(["0", "C", "2", "3", "D", "5", "6", "7", "8", "9", "10"], n.graph.vs["symbol"])
+
+    def test_disease_associations(self):
+        """Test the overlay of disease associations."""
+        n = Network(self.interact_network)
+        n.set_up_network(
+            self.protein_list,
+            disease_associations={"3": ["EFO_1"], "12": ["EFO_2"], "0": ["EFO_1", "EFO_3"]},
+        )
+        self.assertEqual(
+            [["EFO_1", "EFO_3"], None, None, ["EFO_1"], None, None, None, None, None, None, None],
+            n.graph.vs["associated_diseases"],
+        )
+
+    def test_update_differential_expression(self):
+        """Test re-classifying the genes with new thresholds."""
+        n = Network(
+            self.interact_network,
+            max_adj_p=0.05,
+            max_l2fc=-1,
+            min_l2fc=1,
+        )
+        n.set_up_network(self.protein_list)
+
+        n.update_differential_expression(max_adj_p=0.2, min_l2fc=0.5)
+        self.assertEqual(0.2, n.max_adj_p)
+        self.assertEqual(-1, n.max_l2fc)
+        self.assertEqual(
+            [True, True, False, True, True, False, True, False, True, False, False],
+            n.graph.vs["up_regulated"],
+        )
+        self.assertEqual(
+            [False, False, False, False, False, True, False, False, False, False, False],
+            n.graph.vs["down_regulated"],
+        )
+        self.assertEqual(
+            [True, True, False, True, True, True, True, False, True, False, False],
+            n.graph.vs["diff_expressed"],
+        )
+        self.assertEqual([0, 1, 3, 4, 6, 8], n.get_upregulated_genes().indices)
+        self.assertEqual([5], n.get_downregulated_genes().indices)
+
     def test_get_upregulated_genes_network(self):
         """Test the method to get upregulated genes network."""
         de_up = self.mapped_network.copy()
@@ -170,3 +260,106 @@ class NetworkTest(unittest.TestCase):
                 for e2 in g1.es
             )
             self.assertTrue(has_match)
+
+
+class ShortestPathsTest(unittest.TestCase):
+    """Test the shortest paths between relevant genes on a larger graph."""
+
+    def test_same_edges_as_igraph(self):
+        """Test that the edges are the ones on the shortest paths found by igraph."""
+        rng = np.random.default_rng(3)
+        graph = Graph.Erdos_Renyi(n=200, m=600)
+        graph.vs['name'] = [str(i) for i in range(200)]
+        graph.es['weight'] = rng.uniform(0, 1, graph.ecount()).tolist()
+        relevant = sorted(rng.choice(200, 30, replace=False).tolist())
+
+        expected = set()
+        for source in relevant:
+            for path in graph.get_shortest_paths(source, to=relevant, weights='weight'):
+                expected.update(graph.get_eid(u, v) for u, v in zip(path[:-1], path[1:]))
+
+        for n_jobs in (1, 2):
+            with self.subTest(n_jobs=n_jobs):
+                edges = _get_shortest_path_edges(graph, np.array(relevant), n_jobs=n_jobs)
+                self.assertEqual(expected, set(edges.tolist()))
+
+
+class InducedSubgraphTest(unittest.TestCase):
+    """Test building subgraphs without copying the whole graph."""
+
+    def test_same_as_copy_and_delete(self):
+        """Test that the subgraph has the vertices and edges left after deleting all other vertices from a copy."""
+        rng = np.random.default_rng(0)
+        graph = Graph.Erdos_Renyi(n=100, m=400)
+        graph.add_edges([(5, 5), (7, 9), (9, 7)])
+        graph.vs['name'] = [str(i) for i in range(100)]
+        graph.es['weight'] = rng.uniform(0, 1, graph.ecount()).tolist()
+
+        vertices = set(rng.choice(100, 30).tolist()) | {5, 7, 9}
+        for drop_isolated in (False, True):
+            with self.subTest(drop_isolated=drop_isolated):
+                expected = graph.copy()
+                expected.delete_vertices(set(range(100)) - vertices)
+                if drop_isolated:
+                    expected.delete_vertices(expected.vs.select(_degree_eq=0))
+
+                subgraph = SubgraphView(graph, list(vertices), drop_isolated=drop_isolated).to_graph()
+                self.assertEqual(expected.vs['name'], subgraph.vs['name'])
+                # igraph builds the edges of the subgraph in another order
+                self.assertEqual(
+                    sorted(zip(expected.get_edgelist(), expected.es['weight'])),
+                    sorted(zip(subgraph.get_edgelist(), subgraph.es['weight'])),
+                )
+
+
+class NeighborhoodNetworkTest(unittest.TestCase):
+    """Test the neighborhoods of many nodes at once."""
+
+    def setUp(self):
+        """Build a random graph with a self-loop and a multiple edge."""
+        graph = Graph.Erdos_Renyi(n=100, m=200)
+        graph.add_edges([(3, 3), (4, 6), (4, 6)])
+        graph.vs['name'] = [str(i) for i in range(100)]
+        self.graph = graph
+        self.neighborhood_network = NeighborhoodNetwork(Network(graph))
+        self.names = [str(i) for i in range(0, 100, 7)]
+
+    def test_neighborhoods(self):
+        """Test that the neighborhoods and their graphs are the ones of the single node methods."""
+        for order in (1, 2):
+            with self.subTest(order=order):
+                neighbor_names = self.neighborhood_network.get_neighbor_names_of_nodes(self.names, order)
+                networks = self.neighborhood_network.get_neighborhood_networks(self.names, order)
+                for name in self.names:
+                    expected = self.graph.vs[sorted(self.graph.neighborhood(int(name), order=order))]['name']
+                    self.assertEqual(expected, neighbor_names[name])
+
+                    network = self.neighborhood_network.get_neighborhood_network(name, order)
+                    self.assertEqual(network.vs['name'], networks[name].vs['name'])
+                    self.assertEqual(network.get_edgelist(), networks[name].get_edgelist())
+
+    def test_neighborhood_overlaps(self):
+        """Test that the overlap matrix matches the overlaps of single pairs."""
+        columns = [str(i) for i in range(0, 100, 11)]
+        for connection_type in ('direct', 'second-degree'):
+            with self.subTest(connection_type=connection_type):
+                counts = self.neighborhood_network.get_neighborhood_overlaps(
+                    self.names, columns, connection_type, block_size=4,
+                )
+                jaccard = self.neighborhood_network.get_neighborhood_overlaps(
+                    self.names, columns, connection_type, metric='jaccard', block_size=4,
+                )
+                order = 1 if connection_type == 'direct' else 2
+                for row in self.names:
+                    for column in columns:
+                        overlap = self.neighborhood_network.get_neighborhood_overlap(
+                            int(row), int(column), connection_type,
+                        )
+                        union = set(self.graph.neighborhood(int(row), order=order))
+                        union.update(self.graph.neighborhood(int(column), order=order))
+                        self.assertEqual(len(overlap), counts.loc[row, column])
+                        self.assertAlmostEqual(len(overlap) / len(union), jaccard.loc[row, column])
+
+    def test_missing_node(self):
+        """Test that a node that is not in the graph is reported."""
+        self.assertRaises(ValueError, self.neighborhood_network.get_neighborhood_matrix, ['0', 'missing'])
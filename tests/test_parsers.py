@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+
+"""Module to test the parsers of the input files."""
+
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+
+import igraph
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+from guiltytargets.ppi_network_annotation.compression import COMPRESSION_EXTENSIONS, open_file, zstandard
+from guiltytargets.ppi_network_annotation.gene_index import GeneIndex
+from guiltytargets.ppi_network_annotation.model.gene import Gene
+from guiltytargets.ppi_network_annotation.model.gene_table import GeneTable
+from guiltytargets.ppi_network_annotation.parsers import (
+    PPI_GRAPH_CACHE_EXTENSION, parse_csv, parse_disease_associations, parse_gene_list, parse_ppi_graph,
+)
+from guiltytargets.ppi_network_annotation.pipeline import parse_dge
+
+PPI_EDGES = [
+    ('1', '2', 0.9),
+    ('2', '3', 0.5),
+    ('3', '1', 0.8),
+    ('4', '4', 0.7),
+    ('5', '6', 0.2),
+    ('2', '1', 0.7),
+    ('6', '7', 0.9),
+]
+
+
+class PPIGraphCacheTest(unittest.TestCase):
+    """Test the compiled cache of parsed PPI graphs."""
+
+    def setUp(self):
+        """Write a small edgelist to a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'ppi.edgelist')
+        with open(self.path, 'w') as file:
+            for source, target, weight in PPI_EDGES:
+                print(source, target, weight, sep='\t', file=file)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def _get_cache_files(self):
+        return [name for name in os.listdir(self.directory.name) if name.endswith(PPI_GRAPH_CACHE_EXTENSION)]
+
+    def _check_for_graph_eq(self, g1, g2):
+        self.assertEqual(g1.vs['name'], g2.vs['name'])
+        self.assertEqual(g1.get_edgelist(), g2.get_edgelist())
+        self.assertEqual(g1.es.attributes(), g2.es.attributes())
+        if 'weight' in g1.es.attributes():
+            self.assertEqual(g1.es['weight'], g2.es['weight'])
+
+    def test_chunked_read(self):
+        """Test that reading the edgelist in chunks gives the same graph as filtering the graph read by igraph."""
+        for min_edge_weight in (0.0, 0.6):
+            for simplify in (False, True):
+                expected = igraph.read(self.path, format='ncol', directed=False, names=True)
+                expected.delete_edges(expected.es.select(weight_lt=min_edge_weight))
+                expected.delete_vertices(expected.vs.select(_degree=0))
+                if simplify:
+                    expected.simplify()
+
+                graph = parse_ppi_graph(self.path, min_edge_weight, simplify=simplify, chunk_size=2)
+                self._check_for_graph_eq(expected, graph)
+
+        graph = parse_ppi_graph(self.path, 0.6, simplify=True, chunk_size=2)
+        # The gene that only interacts with itself is kept without edges
+        self.assertEqual(0, graph.vs.find(name='4').degree())
+        self.assertNotIn('5', graph.vs['name'])
+        # The edge between 1 and 2 is repeated in another chunk
+        self.assertEqual(3, graph.ecount())
+
+    def test_cache_round_trip(self):
+        """Test that a cached graph is the same as the parsed one, for every key."""
+        for min_edge_weight in (0.0, 0.6):
+            for simplify in (False, True):
+                expected = parse_ppi_graph(self.path, min_edge_weight, simplify=simplify)
+                written = parse_ppi_graph(self.path, min_edge_weight, simplify=simplify, use_cache=True)
+                cached = parse_ppi_graph(self.path, min_edge_weight, simplify=simplify, use_cache=True)
+                self._check_for_graph_eq(expected, written)
+                self._check_for_graph_eq(expected, cached)
+
+        self.assertEqual(4, len(self._get_cache_files()))
+
+    def test_cache_invalidated_by_content(self):
+        """Test that changing the edgelist does not reuse the old cache."""
+        parse_ppi_graph(self.path, use_cache=True)
+        with open(self.path, 'a') as file:
+            print('8', '9', 0.9, sep='\t', file=file)
+
+        graph = parse_ppi_graph(self.path, use_cache=True)
+        self.assertIn('9', graph.vs['name'])
+        self.assertEqual(2, len(self._get_cache_files()))
+
+
+class DifferentialExpressionTest(unittest.TestCase):
+    """Test the parsing of differential expression files."""
+
+    def setUp(self):
+        """Write a small differential expression file to a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'dge.tsv')
+        pd.DataFrame({
+            'Gene.ID': ['1', '2///3', None, '4', '5'],
+            'logFC': [1.5, -2.0, 1.0, 'NA', 0.5],
+            'adj.P.Val': [0.01, 0.02, 0.03, 0.04, np.nan],
+        }).to_csv(self.path, sep='\t', index=False)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def test_parse_csv(self):
+        """Test that rows are filtered and split into one gene per Entrez identifier."""
+        gene_table = parse_csv(
+            self.path,
+            entrez_id_header='Gene.ID',
+            log_fold_change_header='logFC',
+            adjusted_p_value_header='adj.P.Val',
+            entrez_delimiter='///',
+            sep='\t',
+        )
+        self.assertIsInstance(gene_table, GeneTable)
+        self.assertEqual(['1', '2', '3'], gene_table.entrez_ids.tolist())
+        self.assertEqual([1.5, -2.0, -2.0], gene_table.log2_fold_changes.tolist())
+        self.assertEqual(
+            [
+                Gene(entrez_id='1', log2_fold_change=1.5, padj=0.01),
+                Gene(entrez_id='2', log2_fold_change=-2.0, padj=0.02),
+                Gene(entrez_id='3', log2_fold_change=-2.0, padj=0.02),
+            ],
+            list(gene_table),
+        )
+
+    def test_float_entrez_ids(self):
+        """Test that Entrez identifiers read as floats do not keep a decimal point."""
+        pd.DataFrame({
+            'Gene.ID': [1.0, np.nan, 3.0],
+            'logFC': [1.5, -2.0, 1.0],
+            'adj.P.Val': [0.01, 0.02, 0.03],
+        }).to_csv(self.path, sep='\t', index=False)
+
+        gene_table = parse_csv(
+            self.path,
+            entrez_id_header='Gene.ID',
+            log_fold_change_header='logFC',
+            adjusted_p_value_header='adj.P.Val',
+            entrez_delimiter='///',
+            sep='\t',
+        )
+        self.assertEqual(['1', '3'], gene_table.entrez_ids.tolist())
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parse_columnar(self):
+        """Test that Parquet and Feather files give the same genes as the tsv file, reading only the used columns."""
+        df = pd.DataFrame({
+            'Gene.ID': ['1', '2///3', None, '4', '5', '6'],
+            'logFC': [1.5, -2.0, 1.0, np.nan, 0.5, 3.0],
+            'adj.P.Val': [0.01, 0.02, 0.03, 0.04, np.nan, 0.05],
+            'baseMean': [10.0, 20.0, 30.0, 40.0, 50.0, np.nan],
+            'sample': ['a', 'b', 'c', 'd', 'e', 'f'],
+        })
+        df.to_csv(self.path, sep='\t', index=False)
+        parquet_path = os.path.join(self.directory.name, 'dge.parquet')
+        df.to_parquet(parquet_path)
+        feather_path = os.path.join(self.directory.name, 'dge.feather')
+        df.to_feather(feather_path)
+
+        options = dict(
+            entrez_id_header='Gene.ID',
+            log2_fold_change_header='logFC',
+            adj_p_header='adj.P.Val',
+            entrez_delimiter='///',
+            base_mean_header='baseMean',
+        )
+        expected = list(parse_dge(self.path, **options))
+        self.assertEqual(['1', '2', '3'], [gene.entrez_id for gene in expected])
+        self.assertEqual(expected, list(parse_dge(parquet_path, **options)))
+        self.assertEqual(expected, list(parse_dge(feather_path, **options)))
+
+
+class CompressedInputTest(unittest.TestCase):
+    """Test that compressed input files are read as their uncompressed content."""
+
+    def setUp(self):
+        """Write small input files to a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.extensions = [
+            extension
+            for extension, compression in COMPRESSION_EXTENSIONS.items()
+            if compression != 'zstd' or zstandard is not None
+        ]
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        for extension in self.extensions:
+            with open(f'{path}{extension}', 'wb') as file:
+                file.write(_compress(content.encode('utf-8'), COMPRESSION_EXTENSIONS[extension]))
+        return path
+
+    def test_parsers(self):
+        """Test the PPI graph, differential expression and gene list parsers on compressed files."""
+        ppi_path = self._write('ppi.edgelist', ''.join(f'{s}\t{t}\t{w}\n' for s, t, w in PPI_EDGES))
+        dge_path = self._write('dge.tsv', 'Gene.ID\tlogFC\tadj.P.Val\n1\t1.5\t0.01\n2///3\t-2.0\t0.02\n')
+        targets_path = self._write('targets.txt', '1\n3\n9\n')
+
+        graph = parse_ppi_graph(ppi_path, 0.6)
+        genes = list(parse_dge(
+            dge_path,
+            entrez_id_header='Gene.ID',
+            log2_fold_change_header='logFC',
+            adj_p_header='adj.P.Val',
+            entrez_delimiter='///',
+        ))
+        targets = parse_gene_list(targets_path, graph)
+        self.assertEqual(['1', '3'], targets)
+
+        for extension in self.extensions:
+            with self.subTest(extension=extension):
+                with open_file(f'{ppi_path}{extension}', 'rt') as file:
+                    self.assertEqual(f'{PPI_EDGES[0][0]}\t', file.read(2))
+
+                compressed_graph = parse_ppi_graph(f'{ppi_path}{extension}', 0.6)
+                self.assertEqual(graph.vs['name'], compressed_graph.vs['name'])
+                self.assertEqual(graph.get_edgelist(), compressed_graph.get_edgelist())
+                self.assertEqual(genes, list(parse_dge(
+                    f'{dge_path}{extension}',
+                    entrez_id_header='Gene.ID',
+                    log2_fold_change_header='logFC',
+                    adj_p_header='adj.P.Val',
+                    entrez_delimiter='///',
+                )))
+                self.assertEqual(targets, parse_gene_list(f'{targets_path}{extension}', graph))
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == 'gzip':
+        return gzip.compress(data)
+    if compression == 'bz2':
+        return bz2.compress(data)
+    if compression == 'xz':
+        return lzma.compress(data)
+    return zstandard.ZstdCompressor().compress(data)
+
+
+HGNC_COMPLETE_SET = pd.DataFrame({
+    'hgnc_id': ['HGNC:5', 'HGNC:37133', 'HGNC:24086', 'HGNC:7', 'HGNC:99', 'HGNC:98'],
+    'symbol': ['A1BG', 'A1BG-AS1', 'A1CF', 'A2M', 'A2M', 'NA'],
+    'name': ['alpha-1-B glycoprotein', 'A1BG antisense RNA 1', 'APOBEC1 complementation factor', 'x', 'y', 'z'],
+    'entrez_id': [1.0, 503538.0, 29974.0, 2.0, np.nan, 98.0],
+    'ensembl_gene_id': ['ENSG00000121410', 'ENSG00000268895', 'ENSG00000148584', 'ENSG00000175899', None, None],
+    'uniprot_ids': ['P04217', None, 'Q9NQ94|Q5SZQ3', 'P01023', None, None],
+})
+
+
+class GeneIndexTest(unittest.TestCase):
+    """Test the offline mapping of gene identifiers to Entrez identifiers."""
+
+    def setUp(self):
+        """Build a gene index from a small HGNC complete set."""
+        self.directory = tempfile.TemporaryDirectory()
+        hgnc_path = os.path.join(self.directory.name, 'hgnc_complete_set.txt.gz')
+        HGNC_COMPLETE_SET.to_csv(hgnc_path, sep='\t', index=False, float_format='%.0f')
+        self.gene_index = GeneIndex.build(hgnc_path, os.path.join(self.directory.name, 'genes.sqlite'))
+
+    def tearDown(self):
+        """Close the index and remove the temporary directory."""
+        self.gene_index.close()
+        self.directory.cleanup()
+
+    def test_to_entrez(self):
+        """Test that identifiers of every namespace are mapped, and unknown ones are missing."""
+        identifiers = pd.Series(['1', 'A1CF', 'HGNC:37133', 'ENSG00000175899', 'Q5SZQ3', 'A2M', 'FOO', '42'])
+        self.assertEqual(
+            ['1', '29974', '503538', '2', '29974', '2', None, '42'],
+            self.gene_index.to_entrez(identifiers).replace({np.nan: None}).tolist(),
+        )
+        self.assertEqual(
+            ['A1BG', 'A2M', None],
+            self.gene_index.get_symbols(pd.Series(['1', '2', '42'])).replace({np.nan: None}).tolist(),
+        )
+
+    def test_map(self):
+        """Test the mapping from Entrez identifiers and between the other namespaces."""
+        entrez_ids = pd.Series(['29974', '1', '42'])
+        self.assertEqual(
+            ['Q9NQ94', 'P04217', None],
+            self.gene_index.from_entrez(entrez_ids, 'uniprot').replace({np.nan: None}).tolist(),
+        )
+        self.assertEqual(
+            ['ENSG00000148584', 'ENSG00000121410', None],
+            self.gene_index.map(entrez_ids, 'entrez', 'ensembl').replace({np.nan: None}).tolist(),
+        )
+        self.assertEqual(
+            ['HGNC:24086', 'HGNC:5', None],
+            self.gene_index.map(pd.Series(['Q5SZQ3', 'P04217', 'FOO']), 'uniprot', 'hgnc').replace({np.nan: None}).tolist(),
+        )
+        self.assertEqual(
+            ['2', None],
+            self.gene_index.map(pd.Series(['P01023', 'A1BG']), 'uniprot', 'entrez').replace({np.nan: None}).tolist(),
+        )
+        with self.assertRaises(ValueError):
+            self.gene_index.map(entrez_ids, 'entrez', 'refseq')
+
+    def test_parsers(self):
+        """Test that the differential expression and target parsers normalize the identifiers."""
+        dge_path = os.path.join(self.directory.name, 'dge.tsv')
+        pd.DataFrame({
+            'Gene': ['A1BG///ENSG00000148584', 'FOO', '2'],
+            'logFC': [1.5, -2.0, 1.0],
+            'adj.P.Val': [0.01, 0.02, 0.03],
+        }).to_csv(dge_path, sep='\t', index=False)
+        gene_table = parse_csv(
+            dge_path,
+            entrez_id_header='Gene',
+            log_fold_change_header='logFC',
+            adjusted_p_value_header='adj.P.Val',
+            entrez_delimiter='///',
+            sep='\t',
+            gene_index=self.gene_index,
+        )
+        self.assertEqual(['1', '29974', '2'], gene_table.entrez_ids.tolist())
+        self.assertEqual(['A1BG', 'A1CF', 'A2M'], gene_table.symbols.tolist())
+
+        targets_path = os.path.join(self.directory.name, 'targets.txt')
+        with open(targets_path, 'w') as file:
+            print('A1CF', 'P04217', '503538', 'FOO', 'NA', sep='\n', file=file)
+        graph = igraph.Graph(n=4)
+        graph.vs['name'] = ['1', '2', '29974', '98']
+        self.assertEqual(['1', '29974', '98'], parse_gene_list(targets_path, graph, gene_index=self.gene_index))
+
+
+class DiseaseAssociationsTest(unittest.TestCase):
+    """Test the parsing of disease-drug target associations."""
+
+    def test_parse_disease_associations(self):
+        """Test that associations are grouped by target, without the excluded diseases."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'associations.txt')
+            with open(path, 'w') as file:
+                print('2 EFO_1', '1 EFO_2', '2 EFO_3', '1 EFO_1', '3 EFO_3', 'NA null', 'null NA', sep='\n', file=file)
+
+            disease_associations = parse_disease_associations(path, {'EFO_3'})
+
+        self.assertEqual(
+            {'2': ['EFO_1'], '1': ['EFO_2', 'EFO_1'], 'NA': ['null'], 'null': ['NA']},
+            disease_associations,
+        )
+        self.assertEqual(['2', '1', 'NA', 'null'], list(disease_associations))